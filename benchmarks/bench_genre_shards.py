@@ -0,0 +1,64 @@
+import argparse
+import os
+import random
+import sys
+import uuid
+from collections import Counter
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda")
+)
+
+from genre_shards import genre_partition_key
+
+# Simulates one second of skewed traffic against GSI1-Genre and reports how
+# much of it DynamoDB could absorb, given the per-partition-key ceiling of
+# 1000 write units/s (3000 read units/s for reads).
+#
+#   python benchmarks/bench_genre_shards.py --requests 20000 --skew 1.2
+
+WRITE_CAP = 1000
+READ_CAP = 3000
+
+
+def zipf_weights(n, skew):
+    return [1.0 / (rank**skew) for rank in range(1, n + 1)]
+
+
+def simulate(genres, weights, requests, shards, cap):
+    load = Counter()
+    for genre in random.choices(genres, weights=weights, k=requests):
+        load[genre_partition_key(genre, uuid.uuid4().hex, shards)] += 1
+    served = sum(min(count, cap) for count in load.values())
+    hottest = max(load.values())
+    return served, hottest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genre shard throughput model")
+    parser.add_argument("--genres", type=int, default=12)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--skew", type=float, default=1.2)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    genres = [f"genre-{n}" for n in range(args.genres)]
+    weights = zipf_weights(args.genres, args.skew)
+
+    print(
+        f"{args.requests} req/s over {args.genres} genres, zipf skew {args.skew}\n"
+    )
+    print(
+        f"{'shards':>6} {'writes/s':>9} {'hot pk':>7} "
+        f"{'random reads/s':>15} {'browse queries':>15}"
+    )
+    for shards in (1, 2, 4, 8, 16):
+        writes, hottest = simulate(genres, weights, args.requests, shards, WRITE_CAP)
+        reads, _ = simulate(genres, weights, args.requests, shards, READ_CAP)
+        # Random reads touch one shard; a browse page queries every shard
+        print(f"{shards:>6} {writes:>9} {hottest:>7} {reads:>15} {shards:>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import argparse
+import math
+import os
+import random
+import sys
+from decimal import Decimal
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda")
+)
+
+from item_format import encode_item
+from quote_items import build_item
+
+# Item size and read-unit cost of the plain (format 1) and compressed
+# (format 2) quote layouts on a synthetic corpus. Sizes follow DynamoDB's
+# accounting: attribute name bytes plus value bytes.
+#
+#   python benchmarks/bench_item_format.py --quotes 100000 --threshold 256
+
+WORDS = (
+    "the of and to in a is that for it as was with be by on not he this are "
+    "or his from at which but have an they you were her she all would there "
+    "their will when who him been has more if no out do so can what up said "
+    "about other into than its time only could new them man some these then "
+    "two first may any like now my such make over our even most me state "
+    "after also made many did must before back see through way where get "
+    "much go well your know should down work year because come people just "
+    "say each those take day good how long little own very world life hope "
+    "fear courage light dark stars heart journey truth dream wander choice"
+).split()
+
+# (share of the corpus, min chars, max chars): mostly one-liners, some
+# paragraphs, a few long passages
+LENGTHS = ((0.70, 40, 150), (0.25, 150, 400), (0.05, 400, 2000))
+
+RCU_BYTES = 4096
+
+
+def attribute_size(value):
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, bool) or value is None:
+        return 1
+    if isinstance(value, (int, Decimal)):
+        digits = len(str(abs(value)).replace(".", "").strip("0")) or 1
+        return (digits + 1) // 2 + 1
+    if isinstance(value, list):
+        return 3 + sum(attribute_size(element) + 1 for element in value)
+    raise TypeError(type(value).__name__)
+
+
+def item_size(item):
+    return sum(
+        len(name.encode("utf-8")) + attribute_size(value)
+        for name, value in item.items()
+    )
+
+
+def sentence(rng, length):
+    words = []
+    while sum(len(w) + 1 for w in words) < length:
+        words.append(rng.choice(WORDS))
+    return (" ".join(words)[:length].rstrip() + ".").capitalize()
+
+
+def corpus(quotes, seed):
+    rng = random.Random(seed)
+    shares = [share for share, _, _ in LENGTHS]
+    for i in range(quotes):
+        _, low, high = rng.choices(LENGTHS, weights=shares)[0]
+        yield build_item(
+            f"{i:08x}",
+            sentence(rng, rng.randint(low, high)),
+            f"Author number {i % 5000}",
+            rng.choice(("sci-fi", "fantasy", "history", "philosophy")),
+            f"Source title {i % 9000}",
+            f"2024-01-01T00:00:00.{i:06d}Z",
+            tags=rng.sample(("hope", "fear", "courage", "love", "time"), 2),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quote item format comparison")
+    parser.add_argument("--quotes", type=int, default=100000)
+    parser.add_argument("--threshold", type=int, default=256, help="bytes")
+    parser.add_argument("--page", type=int, default=10, help="items per query")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    plain, packed, compressed = [], [], 0
+    for item in corpus(args.quotes, args.seed):
+        encoded = encode_item(item, minimum=args.threshold)
+        plain.append(item_size(item))
+        packed.append(item_size(encoded))
+        compressed += "textZ" in encoded
+
+    def report(label, sizes):
+        total = sum(sizes)
+        # Strongly consistent GetItem rounds each item up to 4 KB
+        get_rcu = sum(math.ceil(size / RCU_BYTES) for size in sizes) / len(sizes)
+        # Query/Scan round the summed size once per page (eventually consistent)
+        pages = [sizes[i : i + args.page] for i in range(0, len(sizes), args.page)]
+        query_rcu = sum(math.ceil(sum(p) / RCU_BYTES) / 2 for p in pages) / len(pages)
+        scan_rcu = math.ceil(total / RCU_BYTES) / 2
+        print(
+            f"{label:<10} {total / len(sizes):>9.1f} B/item {total / 1e6:>9.2f} MB "
+            f"{get_rcu:>8.3f} RCU/get {query_rcu:>8.3f} RCU/page "
+            f"{scan_rcu:>12.0f} RCU/scan"
+        )
+        return total
+
+    print(f"{args.quotes} quotes, compress text >= {args.threshold} bytes\n")
+    before = report("format 1", plain)
+    after = report("format 2", packed)
+    print(
+        f"\n{compressed} items compressed ({compressed / args.quotes:.1%}); "
+        f"storage -{1 - after / before:.1%}"
+    )
+
+    long_items = [(p, q) for p, q in zip(plain, packed) if p > 1024]
+    if long_items:
+        saved = 1 - sum(q for _, q in long_items) / sum(p for p, _ in long_items)
+        print(f"items over 1 KB: {len(long_items)}, -{saved:.1%} each on average")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda")
+)
+
+from quote_items import build_item
+from storage import SqliteStorage
+
+# Loads a synthetic catalog into the embedded SQLite engine and times the
+# access patterns the handlers use. No AWS account or moto needed.
+#
+#   python benchmarks/bench_storage.py --quotes 1000000
+
+
+def timed(label, fn, repeat=1):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = time.perf_counter() - started
+    per_call = elapsed / repeat * 1000
+    print(f"{label:<34} {elapsed:>8.2f}s  {per_call:>9.3f} ms/op")
+    return result
+
+
+def catalog(quotes, genres, authors):
+    for i in range(quotes):
+        created_at = f"2024-01-01T00:00:00.{i:07d}Z"
+        yield build_item(
+            f"{i:08x}",
+            f"Synthetic quote number {i}",
+            f"author-{i % authors}",
+            f"genre-{i % genres}",
+            f"source-{i % (authors * 2)}",
+            created_at,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedded storage benchmark")
+    parser.add_argument("--quotes", type=int, default=100000)
+    parser.add_argument("--genres", type=int, default=12)
+    parser.add_argument("--authors", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--db", help="SQLite file (default: a temporary file)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "bench.db")
+    storage = SqliteStorage(path)
+    print(f"{args.quotes} quotes -> {path}\n")
+
+    def load():
+        batch = []
+        for item in catalog(args.quotes, args.genres, args.authors):
+            batch.append(item)
+            if len(batch) == args.batch:
+                storage.batch_write(puts=batch)
+                batch = []
+        if batch:
+            storage.batch_write(puts=batch)
+
+    timed("load (batch_write)", load)
+
+    ids = [f"{random.randrange(args.quotes):08x}" for _ in range(1000)]
+    timed(
+        "get x1000",
+        lambda: [storage.get(f"QUOTE#{quote_id}", "METADATA") for quote_id in ids],
+    )
+    timed(
+        "batch_get 100 keys",
+        lambda: storage.batch_get(
+            [(f"QUOTE#{quote_id}", "METADATA") for quote_id in ids[:100]]
+        ),
+        repeat=100,
+    )
+    timed(
+        "query genre page (20, newest)",
+        lambda: storage.query(
+            "GSI1-Genre", f"GENRE#genre-{random.randrange(args.genres)}", 20, False
+        ),
+        repeat=1000,
+    )
+    timed(
+        "query author page (20, projected)",
+        lambda: storage.query(
+            "GSI2-Author",
+            f"AUTHOR#author-{random.randrange(args.authors)}",
+            20,
+            False,
+            fields=["quoteId", "text"],
+        ),
+        repeat=1000,
+    )
+
+    def walk_genre():
+        start, pages = None, 0
+        while True:
+            _, start = storage.query("GSI1-Genre", "GENRE#genre-0", 100, start=start)
+            pages += 1
+            if not start:
+                return pages
+
+    pages = timed("walk one genre (100/page)", walk_genre)
+    print(f"{'':<34} {pages} pages")
+
+    def full_scan():
+        start, count = None, 0
+        while True:
+            items, start = storage.scan(1000, start, pk_prefix="QUOTE#", sk="METADATA")
+            count += len(items)
+            if not start:
+                return count
+
+    count = timed("full scan (1000/page)", full_scan)
+    print(f"{'':<34} {count} items")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import os
+import sys
+import boto3
+from boto3.dynamodb.conditions import Key
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "lambda"))
+
+from checkpoints import CHECKPOINT_EVERY, checkpoint_item, checkpoint_pk
+from genre_shards import query_genre
+from listings import scan_listings
+
+# Rebuilds the jump-to-page checkpoints for every genre and author listing.
+# createquotes_handler maintains them incrementally; run this after bulk
+# imports, deletes or a re-shard to make them exact again.
+
+
+def walk_genre(table, genre, page_size=500):
+    start = None
+    while True:
+        items, start = query_genre(
+            table,
+            genre,
+            page_size,
+            start=start,
+            ProjectionExpression="PK, SK, GSI1SK",
+        )
+        yield from items
+        if not start:
+            return
+
+
+def walk_author(table, author, page_size=500):
+    start_key = None
+    while True:
+        kwargs = {
+            "IndexName": "GSI2-Author",
+            "KeyConditionExpression": Key("GSI2PK").eq(f"AUTHOR#{author}"),
+            "Limit": page_size,
+            "ProjectionExpression": "PK, SK, GSI2SK",
+        }
+        if start_key:
+            kwargs["ExclusiveStartKey"] = start_key
+        resp = table.query(**kwargs)
+        yield from resp.get("Items", [])
+        start_key = resp.get("LastEvaluatedKey")
+        if not start_key:
+            return
+
+
+def rebuild(table, partition, items, sort_key_attr, every):
+    count = 0
+    with table.batch_writer(overwrite_by_pkeys=["PK", "SK"]) as batch:
+        # Oldest first, so offsets match the incremental writer
+        for offset, item in enumerate(items):
+            if offset % every == 0:
+                batch.put_item(
+                    Item=checkpoint_item(partition, offset, item, sort_key_attr)
+                )
+            count += 1
+        batch.put_item(
+            Item={"PK": checkpoint_pk(partition), "SK": "META", "itemCount": count}
+        )
+    return count
+
+
+def build_all(table, every=CHECKPOINT_EVERY):
+    genres, authors = scan_listings(table)
+    for genre in genres:
+        count = rebuild(
+            table, f"GENRE#{genre}", walk_genre(table, genre), "GSI1SK", every
+        )
+        print(f"GENRE#{genre}: {count} items")
+    for author in authors:
+        count = rebuild(
+            table, f"AUTHOR#{author}", walk_author(table, author), "GSI2SK", every
+        )
+        print(f"AUTHOR#{author}: {count} items")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild browse checkpoints")
+    parser.add_argument("--table", default="NovaMuseQuotes")
+    parser.add_argument("--every", type=int, default=CHECKPOINT_EVERY)
+    args = parser.parse_args()
+
+    dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+    build_all(dynamodb.Table(args.table), args.every)
@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+from collections import Counter
+import boto3
+from boto3.dynamodb.conditions import Attr
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "lambda"))
+
+from facets import FACETS_PREFIX, facet_item, facet_keys, facet_pair
+
+# Recounts the per-(genre, author) facet items from the quotes themselves.
+# The handlers keep them current incrementally; run this once to backfill
+# quotes created before facets existed, or to repair drift after bulk
+# imports. Pairs that no longer have any quotes are reset to zero.
+
+
+def scan(table, **kwargs):
+    start_key = None
+    while True:
+        if start_key:
+            kwargs["ExclusiveStartKey"] = start_key
+        resp = table.scan(**kwargs)
+        yield from resp.get("Items", [])
+        start_key = resp.get("LastEvaluatedKey")
+        if not start_key:
+            return
+
+
+def count_pairs(table):
+    return Counter(
+        (item["genre"], item["author"])
+        for item in scan(
+            table,
+            ProjectionExpression="genre, author",
+            FilterExpression=Attr("PK").begins_with("QUOTE#")
+            & Attr("SK").eq("METADATA"),
+        )
+    )
+
+
+def build(table):
+    """Rewrite every facet item; returns the number of (genre, author) pairs."""
+    counts = count_pairs(table)
+    stale = {
+        facet_pair(item)
+        for item in scan(
+            table,
+            ProjectionExpression="PK, SK",
+            FilterExpression=Attr("PK").begins_with(f"{FACETS_PREFIX}GENRE#"),
+        )
+    }
+    with table.batch_writer(overwrite_by_pkeys=["PK", "SK"]) as batch:
+        for genre, author in stale - counts.keys():
+            for key in facet_keys(genre, author):
+                batch.put_item(Item=facet_item(key, 0))
+        for (genre, author), count in counts.items():
+            for key in facet_keys(genre, author):
+                batch.put_item(Item=facet_item(key, count))
+    return len(counts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild browse facet counts")
+    parser.add_argument("--table", default="NovaMuseQuotes")
+    args = parser.parse_args()
+
+    dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+    print(f"Counted {build(dynamodb.Table(args.table))} genre/author pairs")
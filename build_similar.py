@@ -0,0 +1,294 @@
+import argparse
+import json
+import os
+import re
+import sys
+import zlib
+from datetime import timedelta
+import boto3
+import numpy as np
+from boto3.dynamodb.conditions import Attr
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "lambda"))
+
+from changes import now, oldest_since, parse_timestamp, query_changes
+from item_format import decode_item, json_default
+from similar import (
+    SIMILAR_ATTR,
+    SIMILAR_FLOOR_ATTR,
+    SIMILAR_K,
+    SIMILAR_STATE_KEY,
+    store_neighbours,
+)
+from write_path import batch_get
+
+# Precomputes the "more like this" lists served by similarquotes_handler.
+#
+# Every quote text becomes a TF-IDF vector over hashed word unigrams and
+# bigrams (fixed width, so there is no vocabulary to keep in step), and the
+# top-K neighbours by cosine similarity come from batched matrix products.
+# Runs are incremental: only quotes whose text is new or changed since the
+# last run, lists they now beat (score above the list's floor) and lists
+# naming a reworded or deleted quote are recomputed and written. Document
+# frequencies drift as the catalog grows; --full recomputes every list.
+#
+# With --cache, the texts and lists are kept in a local file between runs,
+# so an incremental run reads only the change feed and the changed quotes
+# instead of scanning the table. A cache left behind by another machine's
+# run is ignored.
+#
+#   python build_similar.py [--full] [--k 10] [--cache similar_cache.json]
+
+DIMENSIONS = 4096
+# Rows per matrix product; BATCH x quotes float32 scores at a time
+BATCH = 256
+# Weaker matches aren't worth suggesting
+MIN_SCORE = 0.05
+# Re-read this much of the change feed next time, for writes that were
+# still in flight when this run started
+SYNC_OVERLAP_SECONDS = 60
+
+TOKEN = re.compile(r"[\w']+")
+# Too common to say anything about a quote; IDF alone leaves them enough
+# weight to pair short quotes on "I" or "is"
+STOP_WORDS = frozenset(
+    """a about all am an and are as at be but by can do for from had has have he
+    her him his i if in into is it its me my no not of on or our she so that the
+    their them then there they this to us was we were what when which who will
+    with you your""".split()
+)
+QUOTE_PROJECTION = {
+    "ProjectionExpression": "quoteId, #t, textZ, fmt, #s, #f",
+    "ExpressionAttributeNames": {
+        "#t": "text",
+        "#s": SIMILAR_ATTR,
+        "#f": SIMILAR_FLOOR_ATTR,
+    },
+}
+# What the cache keeps of each quote
+CACHED_ATTRS = ("text", SIMILAR_ATTR, SIMILAR_FLOOR_ATTR)
+
+
+def features(text):
+    words = [word for word in TOKEN.findall(text.lower()) if word not in STOP_WORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def vectorize(texts, dimensions=DIMENSIONS):
+    # One L2-normalised row per text
+    counts = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for feature in features(text):
+            counts[row, zlib.crc32(feature.encode("utf-8")) % dimensions] += 1
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1
+    vectors = np.log1p(counts) * idf.astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def nearest(vectors, rows, k, batch=BATCH):
+    """Yield (row, neighbour rows, scores) for each of ``rows``, nearest
+    first, leaving out the row itself and matches below MIN_SCORE."""
+    k = min(k, len(vectors) - 1)
+    for begin in range(0, len(rows), batch):
+        chunk = np.asarray(rows[begin : begin + batch], dtype=np.int64)
+        scores = vectors[chunk] @ vectors.T
+        scores[np.arange(len(chunk)), chunk] = -1
+        if k <= 0:
+            for row in chunk:
+                yield int(row), [], []
+            continue
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        for i, row in enumerate(chunk):
+            # Best first, ties by row
+            order = top[i][np.lexsort((top[i], -scores[i, top[i]]))]
+            order = order[scores[i, order] >= MIN_SCORE]
+            yield int(row), order.tolist(), scores[i, order].tolist()
+
+
+def beaten(vectors, changed_rows, floors, batch=BATCH):
+    # Rows where some changed quote scores above the row's list floor
+    hit = np.zeros(len(vectors), dtype=bool)
+    for begin in range(0, len(changed_rows), batch):
+        chunk = np.asarray(changed_rows[begin : begin + batch], dtype=np.int64)
+        scores = vectors[chunk] @ vectors.T
+        scores[np.arange(len(chunk)), chunk] = -1
+        best = scores.max(axis=0)
+        hit |= (best > floors) & (best >= MIN_SCORE)
+    return set(np.flatnonzero(hit).tolist())
+
+
+def load_quotes(table):
+    # quoteId -> decoded item with its text and current list
+    quotes = {}
+    start_key = None
+    while True:
+        kwargs = {
+            **QUOTE_PROJECTION,
+            "FilterExpression": Attr("PK").begins_with("QUOTE#")
+            & Attr("SK").eq("METADATA"),
+        }
+        if start_key:
+            kwargs["ExclusiveStartKey"] = start_key
+        resp = table.scan(**kwargs)
+        for item in resp.get("Items", []):
+            quotes[item["quoteId"]] = decode_item(item)
+        start_key = resp.get("LastEvaluatedKey")
+        if not start_key:
+            return quotes
+
+
+def load_changed(table, changed):
+    # The changed quotes that still exist, read by key
+    keys = [{"PK": f"QUOTE#{quote_id}", "SK": "METADATA"} for quote_id in changed]
+    return {
+        item["quoteId"]: decode_item(item)
+        for item in batch_get(table, keys, **QUOTE_PROJECTION)
+    }
+
+
+def load_cache(path, synced_until):
+    # The quotes saved by the run that ended at synced_until, else None
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("syncedUntil") != synced_until:
+        return None
+    return cached["quotes"]
+
+
+def save_cache(path, quotes, synced_until):
+    cached = {
+        "syncedUntil": synced_until,
+        "quotes": {
+            quote_id: {name: quote[name] for name in CACHED_ATTRS if name in quote}
+            for quote_id, quote in quotes.items()
+        },
+    }
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(cached, f, default=json_default)
+    os.replace(f"{path}.tmp", path)
+
+
+def changed_since(table, since):
+    # Ids created, edited, reworded or deleted at or after ``since``
+    return {
+        item["quoteId"]
+        for item, _ in query_changes(table, since, ProjectionExpression="quoteId")
+    }
+
+
+def targets_for(quotes, ids, vectors, changed, k):
+    # Rewording drops a quote's list (quote_items.apply_changes), so a
+    # changed quote without a list is new or reworded; edits that kept the
+    # text don't move any scores.
+    rows = {quote_id: row for row, quote_id in enumerate(ids)}
+    reworded = {
+        quote_id
+        for quote_id in changed
+        if quote_id in rows and quotes[quote_id].get(SIMILAR_ATTR) is None
+    }
+    targets = set()
+    floors = np.zeros(len(ids), dtype=np.float32)
+    for row, quote_id in enumerate(ids):
+        listed = quotes[quote_id].get(SIMILAR_ATTR)
+        if listed is None:
+            # Never computed
+            targets.add(row)
+            continue
+        if any(other in reworded or other not in rows for other in listed):
+            # Names a quote that was reworded or no longer exists
+            targets.add(row)
+        if len(listed) >= k:
+            floors[row] = float(quotes[quote_id].get(SIMILAR_FLOOR_ATTR, 0))
+    changed_rows = sorted(rows[quote_id] for quote_id in reworded)
+    if changed_rows:
+        targets |= beaten(vectors, changed_rows, floors)
+    return sorted(targets)
+
+
+def build(
+    table,
+    full=False,
+    k=SIMILAR_K,
+    dimensions=DIMENSIONS,
+    batch=BATCH,
+    cache=None,
+):
+    """Refresh the neighbour lists; returns (lists computed, lists written)."""
+    started = now()
+    state = table.get_item(Key=SIMILAR_STATE_KEY, ConsistentRead=True).get("Item")
+    since = None if full or not state else state["syncedUntil"]
+    if since and parse_timestamp(since) < oldest_since():
+        # Tombstones from back then have expired; start over
+        since = None
+
+    quotes = load_cache(cache, since) if cache and since else None
+    if since is not None:
+        changed = changed_since(table, since)
+    if quotes is not None:
+        for quote_id in changed:
+            quotes.pop(quote_id, None)
+        quotes.update(load_changed(table, changed))
+    else:
+        quotes = load_quotes(table)
+    ids = sorted(quotes)
+    vectors = vectorize([quotes[quote_id]["text"] for quote_id in ids], dimensions)
+    if since is None:
+        targets = list(range(len(ids)))
+    else:
+        targets = targets_for(quotes, ids, vectors, changed, k)
+
+    written = 0
+    for row, neighbour_rows, scores in nearest(vectors, targets, k, batch):
+        quote = quotes[ids[row]]
+        similar = [ids[other] for other in neighbour_rows]
+        floor = scores[-1] if scores else 0.0
+        if (
+            similar == quote.get(SIMILAR_ATTR)
+            and abs(floor - float(quote.get(SIMILAR_FLOOR_ATTR, -1))) < 0.01
+        ):
+            continue
+        if store_neighbours(table, ids[row], similar, floor):
+            quote[SIMILAR_ATTR], quote[SIMILAR_FLOOR_ATTR] = similar, floor
+            written += 1
+
+    synced_until = parse_timestamp(started) - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+    synced_until = synced_until.isoformat(timespec="microseconds") + "Z"
+    table.put_item(
+        Item={
+            **SIMILAR_STATE_KEY,
+            "syncedUntil": synced_until,
+            "quoteCount": len(ids),
+        }
+    )
+    if cache:
+        save_cache(cache, quotes, synced_until)
+    return len(targets), written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh similar-quote lists")
+    parser.add_argument("--table", default="NovaMuseQuotes")
+    parser.add_argument("--full", action="store_true", help="recompute every list")
+    parser.add_argument("--k", type=int, default=SIMILAR_K)
+    parser.add_argument("--dimensions", type=int, default=DIMENSIONS)
+    parser.add_argument("--batch", type=int, default=BATCH)
+    parser.add_argument(
+        "--cache", help="keep quote texts and lists here between incremental runs"
+    )
+    args = parser.parse_args()
+
+    dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+    computed, written = build(
+        dynamodb.Table(args.table),
+        args.full,
+        args.k,
+        args.dimensions,
+        args.batch,
+        args.cache,
+    )
+    print(f"Computed {computed} lists, wrote {written}")
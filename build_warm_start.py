@@ -0,0 +1,39 @@
+import argparse
+import json
+import os
+import sys
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "lambda"))
+
+from catalog_version import VERSION_KEY
+from listings import scan_listings
+from warm_start import WARM_START_PATH, WARM_START_SAMPLE, build
+
+# Writes lambda/warm_start.json, the catalog summary new quotes_handler
+# containers serve from before their first DynamoDB read. Run it right
+# before `cdk deploy` so the bundled copy matches the catalog version; a
+# stale one is detected at runtime and ignored.
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the warm-start snapshot")
+    parser.add_argument("--table", default="NovaMuseQuotes")
+    parser.add_argument("--per-genre", type=int, default=WARM_START_SAMPLE)
+    parser.add_argument("--output", default=WARM_START_PATH)
+    args = parser.parse_args()
+
+    dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+    table = dynamodb.Table(args.table)
+    item = table.get_item(Key=VERSION_KEY, ConsistentRead=True).get("Item") or {}
+    genres, authors = scan_listings(table)
+    data = build(table, genres, authors, int(item.get("version", 0)), args.per_genre)
+
+    with open(args.output, "w") as f:
+        json.dump(data, f, separators=(",", ":"), default=str)
+    size = os.path.getsize(args.output)
+    print(f"Wrote {args.output}: v{data['version']}, {len(genres)} genres, {size} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import os
+import json
+import boto3
+from concurrent.futures import ThreadPoolExecutor
+
+from catalog_version import current_version
+from fields import parse_fields
+from listings import scan_authors, scan_genres
+from snapshots import current_snapshot
+from thread_tables import thread_table
+import quotes_handler
+from profiling import profiled
+
+# Everything the frontend needs for first paint in one request: the genre
+# and author lists plus a random quote, looked up concurrently.
+#
+#   GET /quote/bootstrap?genresVersion=41&authorsVersion=41&fields=text,author
+#
+#   {"genres":  {"version": 42, "items": [...]},
+#    "authors": {"version": 41},                      <- client copy is current
+#    "quote":   {"version": 42, "item": {...}}}
+#
+# Lists carry the catalog version they were read at. A client that sends back
+# the version it holds gets just the version when nothing has changed, and
+# that list isn't looked up at all.
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(os.environ["QUOTES_TABLE"])
+s3 = boto3.client("s3")
+
+# The combined payload is cacheable for this long (the quote is random anyway)
+BOOTSTRAP_MAX_AGE = int(os.environ.get("BOOTSTRAP_MAX_AGE", "30"))
+
+LISTS = {"genres": scan_genres, "authors": scan_authors}
+
+# Lists already read by this container: name -> (catalog version, items)
+_lists = {}
+
+# Kept across invocations. The lookups run on their own threads, and boto3
+# resources aren't thread-safe, so each one reads through its thread's own
+# Table (the s3 client is thread-safe and shared).
+executor = ThreadPoolExecutor(max_workers=len(LISTS) + 1)
+
+
+def load_list(name, version):
+    cached = _lists.get(name)
+    if cached and cached[0] == version:
+        return cached[1]
+    # Published snapshot of this version, else the list handler's scan
+    worker_table = thread_table(table)
+    items = current_snapshot(s3, worker_table, name)
+    if items is None:
+        items = LISTS[name](worker_table)
+    _lists[name] = (version, items)
+    return items
+
+
+def load_quote(fields, genre):
+    return quotes_handler.random_quote(fields, genre, thread_table(table))
+
+
+def client_version(query_params, name):
+    try:
+        return int(query_params.get(f"{name}Version"))
+    except (TypeError, ValueError):
+        return None
+
+
+@profiled
+def lambda_handler(event, context):
+    query_params = event.get("queryStringParameters") or {}
+    try:
+        fields = parse_fields(query_params.get("fields"))
+    except ValueError as e:
+        return respond(400, {"error": str(e)})
+
+    # Read once up front so every sub-result is labelled with the same one
+    version = current_version(table)
+    futures = {
+        "quote": executor.submit(load_quote, fields, query_params.get("genre"))
+    }
+    for name in LISTS:
+        if client_version(query_params, name) != version:
+            futures[name] = executor.submit(load_list, name, version)
+
+    body, complete = {}, True
+    for name in list(LISTS) + ["quote"]:
+        future = futures.get(name)
+        if future is None:
+            body[name] = {"version": version}
+            continue
+        try:
+            result = future.result()
+        except Exception as e:
+            # The rest of the page can still render
+            print(f"Bootstrap {name} lookup failed: {e}")
+            body[name] = {"version": version, "error": f"{name} unavailable"}
+            complete = False
+            continue
+        key = "item" if name == "quote" else "items"
+        body[name] = {"version": version, key: result}
+
+    cache_control = f"public, max-age={BOOTSTRAP_MAX_AGE}" if complete else "no-store"
+    return respond(200, body, {"Cache-Control": cache_control})
+
+
+def respond(status_code, body, extra_headers=None):
+    headers = {
+        "Content-Type": "application/json",
+        "Access-Control-Allow-Origin": "*",  # use "*" only for dev
+        "Access-Control-Allow-Headers": "Content-Type,Authorization",
+        "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
+    }
+    headers.update(extra_headers or {})
+    return {
+        "statusCode": status_code,
+        "headers": headers,
+        "body": json.dumps(body),
+    }
@@ -1,49 +1,264 @@
-import base64
 import json
 import boto3
 import os
 from boto3.dynamodb.conditions import Key
+from checkpoints import locate_page, start_key
+from cursors import (
+    decode_cursor,
+    encode_cursor,
+    genre_scope,
+    index_scope,
+    table_scope,
+    tags_scope,
+)
+from facets import facet_counts
+from fields import parse_fields, projection, strip_fields, with_fields
+from genre_shards import genre_partition_keys, query_genre
+from item_format import decode_items
+from page_cache import build_cache
+from sources import SOURCE_INDEX, source_partition_key
+from storage import DynamoStorage
+from tags import parse_tags, query_tags
+from profiling import profiled
 
 
 dynamodb = boto3.resource("dynamodb")
 table_name = os.environ.get("QUOTES_TABLE")
 table = dynamodb.Table(table_name)
+storage = DynamoStorage(table)
+cache = build_cache("browse")
 
 
-def encode_cursor(key):
-    if not key:
-        return None
-    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+def page(response):
+    # Only the parts of a query/scan response worth caching, decoded so the
+    # cache holds plain JSON-friendly items
+    result = {"Items": decode_items(response.get("Items", []))}
+    result["Count"] = len(result["Items"])
+    if response.get("LastEvaluatedKey"):
+        result["LastEvaluatedKey"] = response["LastEvaluatedKey"]
+    return result
 
 
-def decode_cursor(cursor):
-    if not cursor:
-        return None
-    return json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+def jump_to_page(genre, author, page_number, limit, fields):
+    # Start from the nearest precomputed checkpoint instead of walking every
+    # earlier page; at most CHECKPOINT_EVERY extra items are read and dropped.
+    if genre:
+        partition, pk_attr, sk_attr = f"GENRE#{genre}", "GSI1PK", "GSI1SK"
+        partition_keys = genre_partition_keys(genre)
+    else:
+        partition, pk_attr, sk_attr = f"AUTHOR#{author}", "GSI2PK", "GSI2SK"
+        partition_keys = [partition]
+    scope = cursor_scope(genre, author, None, ())
 
+    projection_expression, projection_names = projection(fields)
+    total, checkpoint, skip = locate_page(table, partition, page_number, limit)
+    total_pages = -(-total // limit)
+    if page_number > total_pages:
+        return {
+            "items": [],
+            "nextCursor": None,
+            "page": page_number,
+            "totalPages": total_pages,
+        }
+
+    start = None
+    if checkpoint:
+        start = start_key(checkpoint, pk_attr, sk_attr, partition_keys)
+    if genre:
+        items, last_key = query_genre(
+            table,
+            genre,
+            skip + limit,
+            scan_forward=False,
+            start=start,
+            ProjectionExpression=projection_expression,
+            ExpressionAttributeNames=projection_names,
+        )
+    else:
+        kwargs = {
+            "IndexName": "GSI2-Author",
+            "KeyConditionExpression": Key("GSI2PK").eq(partition),
+            "Limit": skip + limit,
+            "ScanIndexForward": False,
+            "ProjectionExpression": projection_expression,
+            "ExpressionAttributeNames": projection_names,
+        }
+        if start:
+            kwargs["ExclusiveStartKey"] = start
+        response = table.query(**kwargs)
+        items, last_key = response.get("Items", []), response.get("LastEvaluatedKey")
+
+    return {
+        "items": decode_items(items[skip:]),
+        "nextCursor": encode_cursor(last_key, scope),
+        "page": page_number,
+        "totalPages": total_pages,
+    }
+
+
+def cursor_scope(genre, author, source, tags):
+    # The listing a request pages through; its cursors are only valid there
+    if tags:
+        return tags_scope(tags, genre)
+    if genre:
+        return genre_scope(genre, author)
+    if author:
+        return index_scope("GSI2-Author", "GSI2PK", "GSI2SK", f"AUTHOR#{author}")
+    if source:
+        partition = source_partition_key(source)
+        return index_scope(SOURCE_INDEX, "GSI4PK", "GSI4SK", partition)
+    return table_scope()
+
+
+def facets_for(genre, author):
+    # Breakdown of the other side of the filter: authors within a genre,
+    # genres of an author (both when filtering by both)
+    def load():
+        facets = {}
+        if genre:
+            facets["author"] = facet_counts(table, "genre", genre)
+        if author:
+            facets["genre"] = facet_counts(table, "author", author)
+        return facets
+
+    return cache.read_through(table, ("facets", None, genre, author), load)
+
+
+def serve(items, fields):
+    # Trim to what the client asked for. List pages aren't counted as views
+    # (see popularity.py)
+    cache.flush_metrics("browse")
+    return strip_fields(items, fields)
+
+
+def respond(status_code, body):
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*",  # use "*" only for dev
+            "Access-Control-Allow-Headers": "Content-Type,Authorization",
+            "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
+        },
+        "body": json.dumps(body),
+    }
 
+
+@profiled
 def lambda_handler(event, context, test_genre=None):
     query_params = event.get("queryStringParameters") or {}
     limit = min(int(query_params.get("limit", "10")), 50)
     cursor = query_params.get("cursor")
     genre = query_params.get("genre")
     author = query_params.get("author")
+    source = query_params.get("source")
+    if source and (genre or author):
+        return respond(
+            400, {"error": "source cannot be combined with genre or author"}
+        )
+    try:
+        fields = parse_fields(query_params.get("fields"))
+        tags = parse_tags(query_params.get("tags"))
+    except ValueError as e:
+        return respond(400, {"error": str(e)})
+    if tags and (author or source or query_params.get("page")):
+        return respond(
+            400, {"error": "tags can only be combined with genre and cursor"}
+        )
+    want_facets = query_params.get("facets", "false")
+    if want_facets not in ("true", "false"):
+        return respond(400, {"error": "facets must be true or false"})
+    want_facets = want_facets == "true"
+    if want_facets and (tags or not (genre or author)):
+        return respond(
+            400, {"error": "facets requires genre or author, and no tags"}
+        )
+    # Attributes read internally: quoteId (plus genre for the filter) on tag
+    # pages, author for the in-memory author filter on genre pages
+    internal = []
+    if tags:
+        internal += ["quoteId", "genre"] if genre else ["quoteId"]
+    if genre and author:
+        internal.append("author")
+    query_fields = with_fields(fields, *internal)
+    projection_expression, projection_names = projection(query_fields)
+    # Cache key component; identical for equivalent field lists
+    field_key = ",".join(query_fields)
+
+    page_number = query_params.get("page")
+    if page_number:
+        if cursor or bool(genre) == bool(author):
+            return respond(
+                400, {"error": "page requires exactly one of genre or author"}
+            )
+        if not page_number.isdigit() or int(page_number) < 1:
+            return respond(400, {"error": "page must be a positive integer"})
+        page_number = int(page_number)
+        index, key = ("GSI1-Genre", genre) if genre else ("GSI2-Author", author)
+        try:
+            body = cache.read_through(
+                table,
+                ("jump", index, key, page_number, limit, field_key),
+                lambda: jump_to_page(genre, author, page_number, limit, query_fields),
+            )
+            if want_facets:
+                body["facets"] = facets_for(genre, author)
+            body["items"] = serve(body["items"], fields)
+        except Exception as e:
+            return respond(500, {"error": str(e)})
+        return respond(200, body)
 
-    exclusive_start_key = decode_cursor(cursor) if cursor else None
+    # Checked here, so a bad cursor never reaches DynamoDB
+    scope = cursor_scope(genre, author, source, tags)
     try:
-        if genre:
-            kwargs = {
-                "IndexName": "GSI1-Genre",
-                "KeyConditionExpression": Key("GSI1PK").eq(f"GENRE#{genre}"),
-                "Limit": limit,
-                "ScanIndexForward": False,
-                "ProjectionExpression": "quoteId, #t, author, genre, #s, createdAt",
-                "ExpressionAttributeNames": {"#t": "text", "#s": "source"},
-            }
-            if exclusive_start_key:
-                kwargs["ExclusiveStartKey"] = exclusive_start_key
-
-            response = table.query(**kwargs)
+        exclusive_start_key = decode_cursor(cursor, scope)
+    except ValueError as e:
+        return respond(400, {"error": str(e)})
+    try:
+        if tags:
+
+            def load():
+                # Intersection of the tag posting lists, rarest first; a
+                # genre narrows the matches rather than being another list
+                items, last_key = query_tags(
+                    table,
+                    tags,
+                    limit,
+                    start=exclusive_start_key,
+                    accept=(lambda item: item.get("genre") == genre)
+                    if genre
+                    else None,
+                    ProjectionExpression=projection_expression,
+                    ExpressionAttributeNames=projection_names,
+                )
+                return page({"Items": items, "LastEvaluatedKey": last_key})
+
+            response = cache.read_through(
+                table,
+                ("page", "tags", ",".join(tags), genre, cursor, limit, field_key),
+                load,
+            )
+        elif genre:
+
+            def load():
+                # Scatter-gather across the genre's write shards (a single
+                # plain query when sharding is off)
+                items, last_key = query_genre(
+                    table,
+                    genre,
+                    limit,
+                    scan_forward=False,
+                    start=exclusive_start_key,
+                    ProjectionExpression=projection_expression,
+                    ExpressionAttributeNames=projection_names,
+                )
+                return page({"Items": items, "LastEvaluatedKey": last_key})
+
+            response = cache.read_through(
+                table,
+                ("page", "GSI1-Genre", genre, cursor, limit, field_key),
+                load,
+            )
 
             # If author is also provided, filter in memory
             if author:
@@ -63,50 +278,60 @@ def lambda_handler(event, context, test_genre=None):
                         "LastEvaluatedKey", None
                     )  # Safer: no next page until refetch
                 # Else: no filtering happened → safe to keep LastEvaluatedKey
-        elif author:
-            kwargs = {
-                "IndexName": "GSI2-Author",
-                "KeyConditionExpression": Key("GSI2PK").eq(f"AUTHOR#{author}"),
-                "Limit": limit,
-                "ScanIndexForward": False,
-                "ProjectionExpression": "quoteId, #t, author, genre, #s, createdAt",
-                "ExpressionAttributeNames": {"#t": "text", "#s": "source"},
-            }
-            if exclusive_start_key:
-                kwargs["ExclusiveStartKey"] = exclusive_start_key
-
-            response = table.query(**kwargs)
+        elif author or source:
+            index, partition = (
+                ("GSI2-Author", f"AUTHOR#{author}")
+                if author
+                else (SOURCE_INDEX, source_partition_key(source))
+            )
+
+            def load():
+                items, last_key = storage.query(
+                    index,
+                    partition,
+                    limit,
+                    forward=False,
+                    start=exclusive_start_key,
+                    fields=query_fields,
+                )
+                return page({"Items": items, "LastEvaluatedKey": last_key})
+
+            response = cache.read_through(
+                table,
+                ("page", index, author or source, cursor, limit, field_key),
+                load,
+            )
         else:
-            # Full table browse (allowed, but less efficient)
-            kwargs = {
-                "Limit": limit,
-                "ProjectionExpression": "quoteId, #t, author, genre, #s, createdAt",
-                "ExpressionAttributeNames": {"#t": "text", "#s": "source"},
-            }
-            if exclusive_start_key:
-                kwargs["ExclusiveStartKey"] = exclusive_start_key
-            response = table.scan(**kwargs)
-    except Exception as e:
-        return {
-            "statusCode": 500,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",  # use "*" only for dev
-                "Access-Control-Allow-Headers": "Content-Type,Authorization",
-                "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
-            },
-            "body": json.dumps({"error": str(e)}),
-        }
-    items = response.get("Items", [])
-    next_cursor = encode_cursor(response.get("LastEvaluatedKey"))
+            # Full table browse (allowed, but less efficient). Only quote
+            # items; the table also holds bookkeeping items, so a filtered
+            # scan page can come back short or empty while more quotes
+            # follow. Keep reading until the page is full.
+            def load():
+                items, last_key = [], exclusive_start_key
+                while True:
+                    found, last_key = storage.scan(
+                        limit - len(items),
+                        start=last_key,
+                        pk_prefix="QUOTE#",
+                        sk="METADATA",
+                        fields=query_fields,
+                    )
+                    items += found
+                    if len(items) >= limit or not last_key:
+                        break
+                return page({"Items": items, "LastEvaluatedKey": last_key})
 
-    return {
-        "statusCode": 200,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",  # use "*" only for dev
-            "Access-Control-Allow-Headers": "Content-Type,Authorization",
-            "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
-        },
-        "body": json.dumps({"items": items, "nextCursor": next_cursor}),
-    }
+            response = cache.read_through(
+                table, ("page", "table", None, cursor, limit, field_key), load
+            )
+        body = {
+            "items": serve(response.get("Items", []), fields),
+            "nextCursor": encode_cursor(response.get("LastEvaluatedKey"), scope),
+        }
+        if want_facets:
+            body["facets"] = facets_for(genre, author)
+    except ValueError as e:
+        return respond(400, {"error": str(e)})
+    except Exception as e:
+        return respond(500, {"error": str(e)})
+    return respond(200, body)
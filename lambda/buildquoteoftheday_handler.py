@@ -0,0 +1,19 @@
+import os
+import json
+import boto3
+
+import quote_of_the_day
+from profiling import profiled
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(os.environ["QUOTES_TABLE"])
+
+
+@profiled
+def lambda_handler(event, context):
+    # Runs on a schedule just after midnight UTC; an explicit {"date": ...}
+    # builds (or re-reads) any other day
+    date = (event or {}).get("date") or quote_of_the_day.today()
+    item = quote_of_the_day.build(table, date)
+    print(json.dumps({"date": date, "genres": sorted(item["quotes"])}))
+    return {"date": date, "genres": len(item["quotes"])}
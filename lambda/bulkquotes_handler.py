@@ -0,0 +1,168 @@
+import os
+import json
+import boto3
+from datetime import timedelta
+from boto3.dynamodb.conditions import Attr
+
+from changes import now, oldest_since, parse_timestamp, query_changes
+from cursors import CursorScope, decode_cursor, encode_cursor
+from fields import PUBLIC_FIELDS, parse_fields, projection, strip_fields, with_fields
+from profiling import profiled
+
+# Bulk read for partner syncs, as newline-delimited JSON: one quote per line,
+# then a trailer line.
+#
+#   GET /quote/bulk                               full sync (table scan)
+#   GET /quote/bulk?updatedSince=<ISO timestamp>  changes only (GSI5-Changes)
+#
+#   {"quoteId": "1a2b3c4d", "text": ..., "updatedAt": "..."}
+#   {"quoteId": "5e6f7a8b", "deleted": true, "updatedAt": "..."}
+#   {"done": true, "count": 2, "nextUpdatedSince": "..."}
+#
+# Lines are produced as items are read (stream_lines). A response stops short
+# of BULK_MAX_BYTES, under Lambda's 6 MB response limit; the trailer then has
+# "done": false and a cursor for the next request. nextUpdatedSince, from the
+# final response, starts the next incremental sync.
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(os.environ["QUOTES_TABLE"])
+
+BULK_MAX_BYTES = int(os.environ.get("BULK_MAX_BYTES", str(5 * 1024 * 1024)))
+# nextUpdatedSince is this far before the sync started, so changes still
+# propagating to the index when it ran are picked up again next time
+SYNC_OVERLAP_SECONDS = 60
+
+CONTENT_TYPE = "application/x-ndjson"
+# Positions mix scan and change-index keys, so they stay JSON (still signed)
+CURSOR_SCOPE = CursorScope("bulk")
+
+
+def _scan_quotes(table, start, fields):
+    expression, attribute_names = projection(fields + ("PK", "SK", "updatedAt"))
+    while True:
+        kwargs = {
+            "FilterExpression": Attr("PK").begins_with("QUOTE#")
+            & Attr("SK").eq("METADATA"),
+            "ProjectionExpression": expression,
+            "ExpressionAttributeNames": attribute_names,
+        }
+        if start:
+            kwargs["ExclusiveStartKey"] = start
+        resp = table.scan(**kwargs)
+        for item in resp.get("Items", []):
+            key = {"PK": item.pop("PK"), "SK": item.pop("SK")}
+            yield item, key
+        start = resp.get("LastEvaluatedKey")
+        if not start:
+            break
+
+
+def stream_lines(table, since=None, start=None, fields=PUBLIC_FIELDS):
+    """Yield (line, resume key) per quote or deletion, as they are read.
+
+    Without ``since`` every quote is listed; with it, only quotes changed
+    and deleted at or after ``since``. Passing a yielded key back as
+    ``start`` continues after that line. Lines always carry the quoteId.
+    """
+    fields = with_fields(fields, "quoteId")
+    if since is None:
+        items = _scan_quotes(table, start, fields)
+    else:
+        expression, names = projection(
+            fields + ("PK", "SK", "GSI5PK", "GSI5SK", "updatedAt", "deletedAt")
+        )
+        items = query_changes(
+            table,
+            since,
+            start=start,
+            ProjectionExpression=expression,
+            ExpressionAttributeNames=names,
+        )
+    for item, key in items:
+        if "deletedAt" in item:
+            line = {
+                "quoteId": item["quoteId"],
+                "deleted": True,
+                "updatedAt": item["deletedAt"],
+            }
+        else:
+            updated_at = item.get("updatedAt") or item.get("createdAt")
+            line = strip_fields([item], fields)[0]
+            line["updatedAt"] = updated_at
+        yield json.dumps(line) + "\n", key
+
+
+@profiled
+def lambda_handler(event, context):
+    query_params = event.get("queryStringParameters") or {}
+    try:
+        fields = parse_fields(query_params.get("fields"))
+    except ValueError as e:
+        return respond(400, {"error": str(e)})
+    if query_params.get("cursor"):
+        try:
+            cursor = decode_cursor(query_params["cursor"], CURSOR_SCOPE)
+            # The sync window is fixed by its first request
+            since, started, start = cursor["since"], cursor["started"], cursor["key"]
+        except (ValueError, KeyError, TypeError):
+            return respond(400, {"error": "Invalid cursor"})
+    else:
+        since, started, start = query_params.get("updatedSince"), now(), None
+        if since is not None:
+            try:
+                too_old = parse_timestamp(since) < oldest_since()
+            except ValueError:
+                return respond(400, {"error": "updatedSince must be ISO 8601"})
+            if too_old:
+                return respond(
+                    400,
+                    {
+                        "error": "updatedSince is older than the change history; "
+                        "run a full sync"
+                    },
+                )
+
+    lines, size, last_key, done = [], 0, None, True
+    for line, key in stream_lines(table, since, start, fields):
+        length = len(line.encode("utf-8"))
+        if size + length > BULK_MAX_BYTES and lines:
+            done = False
+            break
+        lines.append(line)
+        size += length
+        last_key = key
+
+    trailer = {"done": done, "count": len(lines)}
+    if done:
+        next_since = parse_timestamp(started) - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+        trailer["nextUpdatedSince"] = (
+            next_since.isoformat(timespec="microseconds") + "Z"
+        )
+    else:
+        trailer["cursor"] = encode_cursor(
+            {"since": since, "started": started, "key": last_key}, CURSOR_SCOPE
+        )
+    lines.append(json.dumps(trailer) + "\n")
+
+    return {
+        "statusCode": 200,
+        "headers": {
+            "Content-Type": CONTENT_TYPE,
+            "Access-Control-Allow-Origin": "*",  # use "*" only for dev
+            "Access-Control-Allow-Headers": "Content-Type,Authorization",
+            "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
+        },
+        "body": "".join(lines),
+    }
+
+
+def respond(status_code, body):
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*",  # use "*" only for dev
+            "Access-Control-Allow-Headers": "Content-Type,Authorization",
+            "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
+        },
+        "body": json.dumps(body),
+    }
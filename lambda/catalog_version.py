@@ -0,0 +1,61 @@
+import os
+import time
+
+# Single counter item bumped on every content change. Caches fold the version
+# into their keys, so a bump invalidates everything derived from older data.
+# The same item records which version the static snapshots were built from.
+VERSION_KEY = {"PK": "META#CATALOG", "SK": "VERSION"}
+
+# How long a container trusts the version it last read
+VERSION_TTL = float(os.environ.get("CATALOG_VERSION_TTL", "5"))
+
+_cached_item = None
+_cached_at = 0.0
+
+
+def _version_item(table):
+    global _cached_item, _cached_at
+    now = time.monotonic()
+    if _cached_item is not None and now - _cached_at < VERSION_TTL:
+        return _cached_item
+
+    _cached_item = table.get_item(Key=VERSION_KEY).get("Item") or {}
+    _cached_at = now
+    return _cached_item
+
+
+def current_version(table):
+    return int(_version_item(table).get("version", 0))
+
+
+def published_version(table):
+    # Version of the latest static snapshot set, or None if none was published
+    published = _version_item(table).get("publishedVersion")
+    return None if published is None else int(published)
+
+
+def bump_version_action(table_name):
+    # bump_version as a TransactWriteItems action. Forgets the cached item
+    # right away; at worst the next read fetches the same version again.
+    global _cached_item
+    _cached_item = None
+    return {
+        "Update": {
+            "TableName": table_name,
+            "Key": VERSION_KEY,
+            "UpdateExpression": "ADD version :one",
+            "ExpressionAttributeValues": {":one": 1},
+        }
+    }
+
+
+def bump_version(table):
+    global _cached_item
+    resp = table.update_item(
+        Key=VERSION_KEY,
+        UpdateExpression="ADD version :one",
+        ExpressionAttributeValues={":one": 1},
+        ReturnValues="UPDATED_NEW",
+    )
+    _cached_item = None
+    return int(resp["Attributes"]["version"])
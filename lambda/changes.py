@@ -0,0 +1,99 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from boto3.dynamodb.conditions import Key
+
+# Change feed for incremental sync. Every content write stamps the quote's
+# updatedAt and files it under that day's partition of GSI5-Changes:
+#
+#   GSI5PK = CHANGED#2024-05-01   GSI5SK = 2024-05-01T10:00:00.000000Z#<quoteId>
+#
+# so "everything since T" is one query per day since T, and costs reads in
+# proportion to what changed. Deleting a quote leaves a tombstone in the
+# same index; tombstones expire through the table's TTL after TOMBSTONE_DAYS,
+# which therefore bounds how far back an incremental sync may start.
+CHANGES_INDEX = "GSI5-Changes"
+TOMBSTONE_DAYS = int(os.environ.get("TOMBSTONE_DAYS", "30"))
+
+
+def now():
+    return datetime.utcnow().isoformat(timespec="microseconds") + "Z"
+
+
+def parse_timestamp(timestamp):
+    # Naive UTC datetime; raises ValueError for anything but ISO 8601
+    parsed = datetime.fromisoformat(timestamp)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def sortable(timestamp):
+    # Fixed width (createdAt may omit the microseconds), so sort keys order
+    # by time
+    return parse_timestamp(timestamp).isoformat(timespec="microseconds") + "Z"
+
+
+def change_keys(quote_id, updated_at):
+    updated_at = sortable(updated_at)
+    return {
+        "GSI5PK": f"CHANGED#{updated_at[:10]}",
+        "GSI5SK": f"{updated_at}#{quote_id}",
+    }
+
+
+def stamp(item, updated_at):
+    # Record a content change on a quote item, in place
+    item["updatedAt"] = updated_at
+    item.update(change_keys(item["quoteId"], updated_at))
+    return item
+
+
+def tombstone(quote_id, deleted_at):
+    return {
+        "PK": f"TOMBSTONE#{quote_id}",
+        "SK": "META",
+        "quoteId": quote_id,
+        "deletedAt": deleted_at,
+        **change_keys(quote_id, deleted_at),
+        "expiresAt": int(time.time()) + TOMBSTONE_DAYS * 86400,
+    }
+
+
+def oldest_since():
+    # Earliest updatedSince that still sees every tombstone
+    return datetime.utcnow() - timedelta(days=TOMBSTONE_DAYS)
+
+
+def query_changes(table, since, start=None, until=None, **kwargs):
+    """Yield (item, key) for every change at or after ``since``, oldest first.
+
+    ``key`` is the item's index key: passed back as ``start`` it resumes just
+    after that item. Reads day partitions up to ``until`` (default today).
+    """
+    day = parse_timestamp(since).date()
+    if start:
+        day = parse_timestamp(start["GSI5SK"].split("#", 1)[0]).date()
+    last_day = (parse_timestamp(until) if until else datetime.utcnow()).date()
+    lower = sortable(since)
+    while day <= last_day:
+        condition = Key("GSI5PK").eq(f"CHANGED#{day.isoformat()}") & Key(
+            "GSI5SK"
+        ).gte(lower)
+        while True:
+            query = {"IndexName": CHANGES_INDEX, "KeyConditionExpression": condition}
+            if start:
+                query["ExclusiveStartKey"] = start
+            resp = table.query(**query, **kwargs)
+            for item in resp.get("Items", []):
+                key = {
+                    name: item.pop(name)
+                    for name in ("PK", "SK", "GSI5PK", "GSI5SK")
+                    if name in item
+                }
+                yield item, key
+            start = resp.get("LastEvaluatedKey")
+            if not start:
+                break
+        day += timedelta(days=1)
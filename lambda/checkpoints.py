@@ -0,0 +1,146 @@
+import os
+import random
+from boto3.dynamodb.conditions import Key
+from genre_shards import genre_partition_keys, query_genre
+
+# A checkpoint records the item at every Nth position of a genre/author
+# listing, counted from the oldest item. Counting from the oldest end keeps
+# existing checkpoints valid as new quotes are appended at the newest end.
+CHECKPOINT_EVERY = int(os.environ.get("CHECKPOINT_EVERY", "100"))
+
+
+def checkpoint_pk(partition):
+    # partition is the logical listing, e.g. "GENRE#sci-fi" or "AUTHOR#Yoda"
+    return f"CHECKPOINTS#{partition}"
+
+
+def offset_sk(offset):
+    return f"OFFSET#{offset:010d}"
+
+
+def checkpoint_item(partition, offset, item, sort_key_attr):
+    return {
+        "PK": checkpoint_pk(partition),
+        "SK": offset_sk(offset),
+        "offset": offset,
+        "itemPK": item["PK"],
+        "itemSK": item["SK"],
+        "sortKey": item[sort_key_attr],
+    }
+
+
+def record_item(table, partition, item, sort_key_attr, every=None):
+    # Called after a create: the new quote is the newest, so it takes the next
+    # position. Concurrent creates may land a position or two off; the
+    # build_checkpoints.py job rewrites exact checkpoints.
+    every = CHECKPOINT_EVERY if every is None else every
+    resp = table.update_item(
+        Key={"PK": checkpoint_pk(partition), "SK": "META"},
+        UpdateExpression="ADD itemCount :one",
+        ExpressionAttributeValues={":one": 1},
+        ReturnValues="UPDATED_NEW",
+    )
+    offset = int(resp["Attributes"]["itemCount"]) - 1
+    if offset % every == 0:
+        table.put_item(Item=checkpoint_item(partition, offset, item, sort_key_attr))
+
+
+def record_position(table, partition, item, sort_key_attr, every=None):
+    # record_item for a create whose itemCount ADD was part of its
+    # transaction: the count is read back instead, with the same caveat on
+    # concurrent creates
+    every = CHECKPOINT_EVERY if every is None else every
+    meta = table.get_item(
+        Key={"PK": checkpoint_pk(partition), "SK": "META"}, ConsistentRead=True
+    ).get("Item", {})
+    offset = int(meta.get("itemCount", 0)) - 1
+    if offset >= 0 and offset % every == 0:
+        table.put_item(Item=checkpoint_item(partition, offset, item, sort_key_attr))
+
+
+def item_count(table, partition):
+    # Items recorded for a listing (0 when it has no checkpoints yet)
+    meta = table.get_item(Key={"PK": checkpoint_pk(partition), "SK": "META"})
+    return int(meta.get("Item", {}).get("itemCount", 0))
+
+
+def locate_page(table, partition, page, limit):
+    """Find where page ``page`` (1-based, newest first) starts.
+
+    Returns ``(total, checkpoint, skip)``: start a newest-first read just after
+    ``checkpoint`` (or at the top when None) and drop the first ``skip``
+    items. ``skip`` is bounded by the checkpoint spacing.
+    """
+    total = item_count(table, partition)
+
+    # Oldest-first position just past the newest item on the page
+    end = total - (page - 1) * limit
+    if end <= 0 or end >= total:
+        return total, None, max(total - end, 0)
+
+    # Nearest checkpoint at or above it; positions >= total are stale
+    resp = table.query(
+        KeyConditionExpression=Key("PK").eq(checkpoint_pk(partition))
+        & Key("SK").between(offset_sk(end), offset_sk(total - 1)),
+        Limit=1,
+    )
+    items = resp.get("Items", [])
+    if not items:
+        return total, None, total - end
+    checkpoint = items[0]
+    return total, checkpoint, int(checkpoint["offset"]) - end
+
+
+def start_key(checkpoint, pk_attr, sk_attr, partition_keys):
+    # Position just after the checkpointed item on each index partition. With
+    # sharded genres only one shard holds the item; the others resume from
+    # the same (sort key, PK) position, which DynamoDB accepts for any key.
+    positions = {
+        partition_key: {
+            "PK": checkpoint["itemPK"],
+            "SK": checkpoint["itemSK"],
+            pk_attr: partition_key,
+            sk_attr: checkpoint["sortKey"],
+        }
+        for partition_key in partition_keys
+    }
+    if len(positions) == 1:
+        return next(iter(positions.values()))
+    return {"shards": positions}
+
+
+def random_position(table, partition, every=None):
+    """A uniformly chosen item of a listing, as ``(checkpoint, skip)``.
+
+    Read oldest-first from just after ``checkpoint`` (from the oldest end
+    when None) and drop the first ``skip`` items; ``skip`` is at most
+    ``every``, so the detour stays within one checkpoint window.
+    """
+    every = CHECKPOINT_EVERY if every is None else every
+    total = item_count(table, partition)
+    if not total:
+        return None, 0
+    offset = random.randrange(total)
+    # A checkpoint at c leads on to offsets c+1..c+every, the oldest end to
+    # offsets 0..every
+    base = (offset - 1) // every * every if offset > every else 0
+    if not base:
+        return None, offset
+    checkpoint = table.get_item(
+        Key={"PK": checkpoint_pk(partition), "SK": offset_sk(base)}
+    ).get("Item")
+    if checkpoint is None:
+        # Not recorded yet; build_checkpoints.py fills the gaps
+        return None, 0
+    return checkpoint, offset - base - 1
+
+
+def random_genre_window(table, genre, size, **kwargs):
+    # Up to ``size`` of a genre's items, oldest-first from a uniformly chosen
+    # one (fewer near the newest end). kwargs shape the query.
+    checkpoint, skip = random_position(table, f"GENRE#{genre}")
+    start = None
+    if checkpoint:
+        start = start_key(checkpoint, "GSI1PK", "GSI1SK", genre_partition_keys(genre))
+    items, _ = query_genre(table, genre, skip + size, start=start, **kwargs)
+    return items[skip:]
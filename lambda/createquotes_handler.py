@@ -1,14 +1,23 @@
 from datetime import datetime
-import hashlib
 import os
 import json
 import boto3
 from botocore.exceptions import ClientError
+from catalog_version import bump_version_action
+from changes import stamp
+from checkpoints import record_position
+from idempotency import IdempotencyError, begin, complete, header, release, request_hash
+from quote_items import build_item, create_actions
+from quote_text import TEXT_HASH_ATTR, find_owner, new_quote_id
+from tags import parse_tags
+from write_path import WriteTimer
+from profiling import profiled
 
 dynamodb = boto3.resource("dynamodb")
 table = dynamodb.Table(os.environ.get("QUOTES_TABLE"))
 
 
+@profiled
 def lambda_handler(event, context, test_genre=None):
     claims = event["requestContext"]["authorizer"]["claims"]
     raw_groups = claims.get("cognito:groups", "")
@@ -31,49 +40,120 @@ def lambda_handler(event, context, test_genre=None):
             "headers": {"Content-Type": "application/json"},
             "body": json.dumps({"error": "text, author, and genre are required"}),
         }
+    try:
+        tags = parse_tags(body.get("tags"))
+    except ValueError as e:
+        return {
+            "statusCode": 400,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"error": str(e)}),
+        }
+
+    idempotency_key = header(event, "Idempotency-Key")
+    scope = claims.get("sub", "")
+    timer = WriteTimer()
+    if idempotency_key:
+        try:
+            with timer.phase("idempotency"):
+                stored = begin(table, scope, idempotency_key, request_hash(body))
+        except IdempotencyError as e:
+            return respond(e.status_code, {"error": str(e)})
+        if stored is not None:
+            # Same key, same body: the earlier attempt's outcome, not a new write
+            timer.emit("create", "replay")
+            response = respond(stored["statusCode"], json.loads(stored["body"]))
+            response["headers"]["Idempotent-Replayed"] = "true"
+            return response
 
     created_at = datetime.utcnow().isoformat() + "Z"
-    normalized_text = " ".join(text.lower().strip().split())
-    quote_id = hashlib.md5(normalized_text.encode("utf-8")).hexdigest()[:8]
-    item = {
-        "PK": f"QUOTE#{quote_id}",
-        "SK": "METADATA",
-        "quoteId": quote_id,
-        "GSI1PK": f"GENRE#{genre}",
-        "GSI1SK": f"CREATED#{created_at}",
-        "GSI2PK": f"AUTHOR#{author}",
-        "GSI2SK": f"CREATED#{created_at}",
-        "text": text,
-        "author": author,
-        "genre": genre,
-        "source": source,
-        "createdAt": created_at,
-    }
+    quote_id = new_quote_id()
+    item = stamp(
+        build_item(quote_id, text, author, genre, source, created_at, tags),
+        created_at,
+    )
 
     try:
-        table.put_item(Item=item, ConditionExpression="attribute_not_exists(PK)")
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
-            return {
-                "statusCode": 409,
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",  # use "*" only for dev
-                    "Access-Control-Allow-Headers": "Content-Type,Authorization",
-                    "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
-                },
-                "body": json.dumps({"error": "Quote already exists"}),
-            }
-        else:
-            raise
+        response = create(item, timer)
+    except Exception:
+        if idempotency_key:
+            release(table, scope, idempotency_key)
+        timer.emit("create", "error")
+        raise
+
+    if idempotency_key:
+        complete(table, scope, idempotency_key, response)
+    timer.emit("create", "created" if response["statusCode"] == 201 else "conflict")
+    response["headers"]["Server-Timing"] = timer.server_timing()
+    return response
+
+
+def create(item, timer):
+    # The quote, its text guard, tag edges and every counter it moves
+    # (listing sizes, facets, source, tags, catalog version) commit in one
+    # transaction, so a failure leaves nothing half written. The request
+    # token makes a retried transaction that had in fact been applied a
+    # no-op rather than a second set of increments.
+    actions = create_actions(table.name, item) + [bump_version_action(table.name)]
+    with timer.phase("put"):
+        try:
+            timer.call(
+                table.meta.client.transact_write_items,
+                TransactItems=actions,
+                ClientRequestToken=item["quoteId"],
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "TransactionCanceledException":
+                raise
+            reasons = e.response.get("CancellationReasons") or []
+            failed = [r.get("Code") == "ConditionalCheckFailed" for r in reasons]
+            if not any(failed):
+                raise
+            # After a throttled retry the conflict may be our own first
+            # attempt, applied before the error reached us (the request token
+            # normally covers this)
+            if not (failed[0] and timer.retries and _applied(item)):
+                if len(failed) > 1 and failed[1]:
+                    # Second action is the text guard: a duplicate quote
+                    owner = find_owner(table, item[TEXT_HASH_ATTR])
+                    return respond(
+                        409, {"error": "Quote already exists", "quoteId": owner}
+                    )
+                # Another quote drew the same random id
+                return respond(409, {"error": "Quote id collision; retry"})
+
+    # Jump-to-page checkpoints for both listings. Their counts were moved in
+    # the transaction; a missed checkpoint only costs a longer skip until
+    # build_checkpoints.py rewrites them, so it never fails the create.
+    with timer.phase("bookkeeping"):
+        for partition, sort_key_attr in (
+            (f"GENRE#{item['genre']}", "GSI1SK"),
+            (f"AUTHOR#{item['author']}", "GSI2SK"),
+        ):
+            try:
+                record_position(table, partition, item, sort_key_attr)
+            except ClientError as e:
+                print(f"Skipped checkpoint for {partition}: {e}")
+
+    return respond(
+        201, {"message": "Quote created successfully", "quoteId": item["quoteId"]}
+    )
+
+
+def _applied(item):
+    existing = table.get_item(
+        Key={"PK": item["PK"], "SK": item["SK"]}, ConsistentRead=True
+    ).get("Item", {})
+    return existing.get("createdAt") == item["createdAt"]
+
 
+def respond(status_code, body):
     return {
-        "statusCode": 201,
+        "statusCode": status_code,
         "headers": {
             "Content-Type": "application/json",
             "Access-Control-Allow-Origin": "*",  # use "*" only for dev
-            "Access-Control-Allow-Headers": "Content-Type,Authorization",
+            "Access-Control-Allow-Headers": "Content-Type,Authorization,Idempotency-Key",
             "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
         },
-        "body": json.dumps({"message": "Quote created successfully"}),
+        "body": json.dumps(body),
     }
@@ -0,0 +1,286 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import boto3
+
+from genre_shards import genre_partition_keys
+from tags import tag_partition_key
+
+# Opaque pagination cursors, validated before they reach DynamoDB.
+#
+#   version (1) | scope fingerprint (4) | layout (1) | payload | HMAC (8)
+#
+# as unpadded URL-safe base64. The scope is the listing a cursor was issued
+# for (index plus filter values); its fingerprint and the HMAC are checked
+# locally, so a cursor that was edited, truncated or carried over to another
+# listing is a 400 without a round trip. The compact layout stores only what
+# the scope can't supply: a genre page position is the quote id and creation
+# time, with the index partition rebuilt from the request. Keys that don't
+# fit a scope's layout fall back to JSON (still signed).
+CURSOR_VERSION = 1
+FINGERPRINT_BYTES = 4
+MAC_BYTES = 8
+
+LAYOUT_JSON = 0
+LAYOUT_COMPACT = 1
+
+QUOTE_PREFIX = "QUOTE#"
+CREATED_PREFIX = "CREATED#"
+# Shard states in a sharded genre position; anything else is a quote id
+DROPPED, NOT_STARTED = "-", ""
+
+
+class CursorError(ValueError):
+    pass
+
+
+def _load_secret():
+    # The stack passes the secret's ARN (CURSOR_SECRET_ARN) and the value is
+    # fetched once per cold start; a plain CURSOR_SECRET wins for local runs
+    # and tests. There is no default: a key that ships with the source would
+    # let anyone forge cursors.
+    if os.environ.get("CURSOR_SECRET"):
+        return os.environ["CURSOR_SECRET"]
+    arn = os.environ.get("CURSOR_SECRET_ARN")
+    if not arn:
+        return None
+    resp = boto3.client("secretsmanager").get_secret_value(SecretId=arn)
+    return resp["SecretString"]
+
+
+# Signing key
+CURSOR_SECRET = _load_secret()
+
+
+def _write_parts(parts):
+    out = bytearray()
+    for part in parts:
+        data = part.encode("utf-8")
+        length = len(data)
+        while length >= 0x80:
+            out.append(length & 0x7F | 0x80)
+            length >>= 7
+        out.append(length)
+        out += data
+    return bytes(out)
+
+
+def _read_parts(data):
+    parts, i = [], 0
+    while i < len(data):
+        length = shift = 0
+        while True:
+            if i >= len(data):
+                raise CursorError("Invalid cursor")
+            byte = data[i]
+            i += 1
+            length |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        if i + length > len(data):
+            raise CursorError("Invalid cursor")
+        parts.append(data[i : i + length].decode("utf-8"))
+        i += length
+    return parts
+
+
+def _strip(value, prefix):
+    if not isinstance(value, str) or not value.startswith(prefix):
+        raise KeyError(prefix)
+    return value[len(prefix) :]
+
+
+class QuoteKeys:
+    """A quote item's key in one index: [quoteId] or [quoteId, createdAt].
+
+    ``partition`` is the index partition the scope implies.
+    """
+
+    def __init__(self, pk_attr=None, sk_attr=None, partition=None):
+        self.pk_attr = pk_attr
+        self.sk_attr = sk_attr
+        self.partition = partition
+
+    def compact(self, key):
+        # KeyError if the key doesn't have this layout's shape
+        names = {"PK", "SK"} | ({self.pk_attr, self.sk_attr} - {None})
+        if set(key) != names or key["SK"] != "METADATA":
+            raise KeyError("shape")
+        quote_id = _strip(key["PK"], QUOTE_PREFIX)
+        if quote_id in (DROPPED, NOT_STARTED):
+            raise KeyError("id")
+        if not self.pk_attr:
+            return [quote_id]
+        if key[self.pk_attr] != self.partition:
+            raise KeyError(self.pk_attr)
+        return [quote_id, _strip(key[self.sk_attr], CREATED_PREFIX)]
+
+    def expand(self, parts):
+        if len(parts) != (2 if self.pk_attr else 1):
+            raise IndexError("parts")
+        quote_id = parts[0]
+        key = {"PK": QUOTE_PREFIX + quote_id, "SK": "METADATA"}
+        if self.pk_attr:
+            key[self.pk_attr] = self.partition
+            key[self.sk_attr] = CREATED_PREFIX + parts[1]
+        return key
+
+
+class ShardedKeys:
+    # query_genre's {"shards": {partition: key | None}} positions, one entry
+    # per shard in genre_partition_keys() order
+
+    def __init__(self, genre):
+        self.partition_keys = genre_partition_keys(genre)
+
+    def _shard(self, partition_key):
+        return QuoteKeys("GSI1PK", "GSI1SK", partition_key)
+
+    def compact(self, position):
+        if set(position) != {"shards"}:
+            raise KeyError("shards")
+        shards = position["shards"]
+        if set(shards) - set(self.partition_keys):
+            raise KeyError("partition")
+        parts = []
+        for partition_key in self.partition_keys:
+            if partition_key not in shards:
+                parts.append(DROPPED)
+            elif shards[partition_key] is None:
+                parts.append(NOT_STARTED)
+            else:
+                parts += self._shard(partition_key).compact(shards[partition_key])
+        return parts
+
+    def expand(self, parts):
+        shards, parts = {}, list(parts)
+        for partition_key in self.partition_keys:
+            state = parts.pop(0)
+            if state == DROPPED:
+                continue
+            if state == NOT_STARTED:
+                shards[partition_key] = None
+                continue
+            shards[partition_key] = self._shard(partition_key).expand(
+                [state, parts.pop(0)]
+            )
+        if parts:
+            raise IndexError("trailing parts")
+        return {"shards": shards}
+
+
+class EdgeKeys:
+    # Tag posting list positions: {"PK": "TAG#<tag>", "SK": "QUOTE#<id>"}
+
+    def __init__(self, tags):
+        self.tags = list(tags)
+
+    def compact(self, key):
+        if set(key) != {"PK", "SK"}:
+            raise KeyError("shape")
+        tag = _strip(key["PK"], "TAG#")
+        if tag not in self.tags:
+            raise KeyError(tag)
+        return [str(self.tags.index(tag)), _strip(key["SK"], QUOTE_PREFIX)]
+
+    def expand(self, parts):
+        index, quote_id = parts
+        if not index.isdigit():
+            raise ValueError(index)
+        return {
+            "PK": tag_partition_key(self.tags[int(index)]),
+            "SK": QUOTE_PREFIX + quote_id,
+        }
+
+
+class CursorScope:
+    """The listing a cursor belongs to and how its positions compact."""
+
+    def __init__(self, name, *filters, layout=None):
+        identity = json.dumps([name, *filters]).encode("utf-8")
+        self.fingerprint = hashlib.sha256(identity).digest()[:FINGERPRINT_BYTES]
+        self.layout = layout
+
+    def pack(self, position):
+        if self.layout is not None:
+            try:
+                return LAYOUT_COMPACT, _write_parts(self.layout.compact(position))
+            except (KeyError, TypeError):
+                pass
+        return LAYOUT_JSON, json.dumps(position, separators=(",", ":")).encode()
+
+    def unpack(self, layout, payload):
+        if layout == LAYOUT_JSON:
+            return json.loads(payload)
+        if layout == LAYOUT_COMPACT and self.layout is not None:
+            return self.layout.expand(_read_parts(payload))
+        raise CursorError("Invalid cursor")
+
+
+def table_scope():
+    return CursorScope("table", layout=QuoteKeys())
+
+
+def genre_scope(genre, author=None):
+    partition_keys = genre_partition_keys(genre)
+    if len(partition_keys) == 1:
+        layout = QuoteKeys("GSI1PK", "GSI1SK", partition_keys[0])
+    else:
+        layout = ShardedKeys(genre)
+    return CursorScope("GSI1-Genre", genre, author, layout=layout)
+
+
+def index_scope(index, pk_attr, sk_attr, partition):
+    # A single-partition listing such as GSI2-Author or GSI4-Source
+    layout = QuoteKeys(pk_attr, sk_attr, partition)
+    return CursorScope(index, partition, layout=layout)
+
+
+def tags_scope(tags, genre=None):
+    return CursorScope("tags", sorted(tags), genre, layout=EdgeKeys(sorted(tags)))
+
+
+def _sign(data):
+    if not CURSOR_SECRET:
+        raise RuntimeError("CURSOR_SECRET is not set; cursors can't be signed")
+    key = CURSOR_SECRET.encode("utf-8")
+    return hmac.new(key, data, hashlib.sha256).digest()[:MAC_BYTES]
+
+
+def encode_cursor(position, scope=None):
+    if not position:
+        return None
+    scope = scope or table_scope()
+    layout, payload = scope.pack(position)
+    data = bytes([CURSOR_VERSION]) + scope.fingerprint + bytes([layout]) + payload
+    token = base64.urlsafe_b64encode(data + _sign(data))
+    return token.rstrip(b"=").decode()
+
+
+def decode_cursor(cursor, scope=None):
+    """The position ``cursor`` stands for; raises CursorError if it isn't
+    one this service issued for ``scope``."""
+    if not cursor:
+        return None
+    scope = scope or table_scope()
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    except (ValueError, TypeError):
+        raise CursorError("Invalid cursor")
+    header = 1 + FINGERPRINT_BYTES + 1
+    if len(raw) < header + MAC_BYTES or raw[0] != CURSOR_VERSION:
+        raise CursorError("Invalid cursor")
+    data, mac = raw[:-MAC_BYTES], raw[-MAC_BYTES:]
+    if not hmac.compare_digest(mac, _sign(data)):
+        raise CursorError("Invalid cursor")
+    if data[1:header - 1] != scope.fingerprint:
+        raise CursorError("Cursor belongs to a different listing")
+    try:
+        return scope.unpack(data[header - 1], data[header:])
+    except CursorError:
+        raise
+    except (ValueError, KeyError, IndexError):
+        raise CursorError("Invalid cursor")
@@ -0,0 +1,54 @@
+import os
+import json
+import boto3
+from botocore.exceptions import ClientError
+from catalog_version import bump_version
+from item_format import decode_item
+from quote_items import delete_actions, quote_key, transact
+from profiling import profiled
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(os.environ.get("QUOTES_TABLE"))
+
+
+@profiled
+def lambda_handler(event, context):
+    claims = event["requestContext"]["authorizer"]["claims"]
+    raw_groups = claims.get("cognito:groups", "")
+    groups = raw_groups.split(",") if isinstance(raw_groups, str) else raw_groups
+    if "admins" not in groups:
+        return respond(403, {"error": "Admins only"})
+
+    quote_id = (event.get("pathParameters") or {}).get("quoteId")
+    if not quote_id:
+        return respond(400, {"error": "quoteId is required"})
+
+    old = table.get_item(Key=quote_key(quote_id)).get("Item")
+    if old is None:
+        return respond(404, {"error": "Quote not found"})
+    # Keeps the stored form too, for the optimistic-concurrency condition
+    decode_item(old, keep_stored=True)
+
+    # The quote, its tag edges and every counter it contributed to go together
+    try:
+        transact(table, delete_actions(table.name, old))
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "TransactionCanceledException":
+            raise
+        return respond(409, {"error": "Quote was modified concurrently; retry"})
+
+    bump_version(table)
+    return respond(200, {"message": "Quote deleted", "quoteId": quote_id})
+
+
+def respond(status_code, body):
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*",  # use "*" only for dev
+            "Access-Control-Allow-Headers": "Content-Type,Authorization",
+            "Access-Control-Allow-Methods": "GET,POST,PUT,DELETE,OPTIONS",
+        },
+        "body": json.dumps(body),
+    }
@@ -0,0 +1,79 @@
+from boto3.dynamodb.conditions import Key
+
+# Quote counts per (genre, author) pair, for the facet breakdowns next to a
+# filtered browse page and the genre=/author= filters of the list endpoints.
+# Each pair is kept twice, as adjacency items, so either side is a single
+# query:
+#
+#   PK = FACETS#GENRE#<genre>     SK = AUTHOR#<author>   quoteCount
+#   PK = FACETS#AUTHOR#<author>   SK = GENRE#<genre>     quoteCount
+#
+# The names live only in the keys, so nothing scanning for a genre or author
+# attribute mistakes a facet for a quote.
+# createquotes_handler adds to them; admin edits and deletes move them in
+# the same transaction as the quote. build_facets.py recounts from scratch.
+FACETS_PREFIX = "FACETS#"
+
+
+def facet_keys(genre, author):
+    return [
+        {"PK": f"{FACETS_PREFIX}GENRE#{genre}", "SK": f"AUTHOR#{author}"},
+        {"PK": f"{FACETS_PREFIX}AUTHOR#{author}", "SK": f"GENRE#{genre}"},
+    ]
+
+
+def facet_item(key, count):
+    return {**key, "quoteCount": count}
+
+
+def facet_pair(item):
+    # (genre, author) of a FACETS#GENRE# item
+    return (
+        item["PK"].replace(f"{FACETS_PREFIX}GENRE#", "", 1),
+        item["SK"].replace("AUTHOR#", "", 1),
+    )
+
+
+def record_pair(table, genre, author, delta=1):
+    for key in facet_keys(genre, author):
+        table.update_item(
+            Key=key,
+            UpdateExpression="ADD quoteCount :delta",
+            ExpressionAttributeValues={":delta": delta},
+        )
+
+
+def _pairs(table, by, value):
+    # (other side, count) for one genre (by="genre") or author, in name order
+    other = "AUTHOR#" if by == "genre" else "GENRE#"
+    start_key = None
+    while True:
+        kwargs = {
+            "KeyConditionExpression": Key("PK").eq(
+                f"{FACETS_PREFIX}{by.upper()}#{value}"
+            ),
+            "ProjectionExpression": "SK, quoteCount",
+        }
+        if start_key:
+            kwargs["ExclusiveStartKey"] = start_key
+        resp = table.query(**kwargs)
+        for item in resp.get("Items", []):
+            yield item["SK"].replace(other, "", 1), int(item.get("quoteCount", 0))
+        start_key = resp.get("LastEvaluatedKey")
+        if not start_key:
+            return
+
+
+def facet_counts(table, by, value):
+    """Counts of the other side for one genre (``by="genre"``) or author.
+
+    Returns {author or genre: count}, largest first, leaving out pairs
+    whose quotes have all been moved or deleted.
+    """
+    counts = [(name, count) for name, count in _pairs(table, by, value) if count > 0]
+    return dict(sorted(counts, key=lambda pair: (-pair[1], pair[0])))
+
+
+def related(table, by, value):
+    # Authors in a genre, or genres of an author, sorted by name
+    return [name for name, count in _pairs(table, by, value) if count > 0]
@@ -0,0 +1,52 @@
+from item_format import decode_item, stored_names
+
+# Client-visible quote attributes, in response order. Internal key attributes
+# (PK, SK, GSI*) are never returned.
+PUBLIC_FIELDS = (
+    "quoteId",
+    "text",
+    "author",
+    "genre",
+    "source",
+    "tags",
+    "createdAt",
+)
+
+
+def parse_fields(raw):
+    # "text,author" -> ("text", "author"); canonical order so equivalent
+    # requests share cache entries. Raises ValueError on unknown names.
+    if not raw:
+        return PUBLIC_FIELDS
+    requested = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = requested - set(PUBLIC_FIELDS)
+    if unknown:
+        raise ValueError(
+            f"Unknown fields: {', '.join(sorted(unknown))}. "
+            f"Allowed: {', '.join(PUBLIC_FIELDS)}"
+        )
+    if not requested:
+        return PUBLIC_FIELDS
+    return tuple(name for name in PUBLIC_FIELDS if name in requested)
+
+
+def projection(fields):
+    # Placeholders for every name sidestep reserved words ("text", "source").
+    # Asking for text also fetches its compressed stored form.
+    names = {f"#f{i}": name for i, name in enumerate(stored_names(fields))}
+    return ", ".join(names), names
+
+
+def with_fields(fields, *names):
+    # The requested fields plus attributes the handler itself needs
+    return tuple(name for name in PUBLIC_FIELDS if name in fields or name in names)
+
+
+def strip_fields(items, fields):
+    # Decode the stored layout, then drop attributes that were only fetched
+    # for internal use
+    for item in items:
+        decode_item(item)
+        for name in [name for name in item if name not in fields]:
+            del item[name]
+    return items
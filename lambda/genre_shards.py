@@ -0,0 +1,164 @@
+import hashlib
+import heapq
+import os
+import random
+from boto3.dynamodb.conditions import Key
+
+# Number of GSI1 partitions each genre is spread over. 1 keeps the original
+# unsharded "GENRE#<genre>" layout.
+GENRE_SHARDS = int(os.environ.get("GENRE_SHARDS", "1"))
+
+# While items move from an earlier shard count onto GENRE_SHARDS (see the
+# genre-shards migration in migrate.py), readers also query the partitions
+# of that earlier layout. 0 = no migration in progress.
+PREVIOUS_SHARDS = int(os.environ.get("GENRE_SHARDS_PREVIOUS", "0"))
+
+GENRE_INDEX = "GSI1-Genre"
+
+
+def shard_for(quote_id, shards=None):
+    shards = GENRE_SHARDS if shards is None else shards
+    # Derived from the quote id (not random) so writers and the migration
+    # always agree on where an item lives.
+    digest = hashlib.md5(str(quote_id).encode("utf-8")).hexdigest()
+    return int(digest[:8], 16) % shards
+
+
+def genre_partition_key(genre, quote_id, shards=None):
+    shards = GENRE_SHARDS if shards is None else shards
+    if shards <= 1:
+        return f"GENRE#{genre}"
+    return f"GENRE#{genre}#{shard_for(quote_id, shards)}"
+
+
+def _layout(genre, shards):
+    if shards <= 1:
+        return [f"GENRE#{genre}"]
+    return [f"GENRE#{genre}#{n}" for n in range(shards)]
+
+
+def genre_partition_keys(genre, shards=None, previous=None):
+    shards = GENRE_SHARDS if shards is None else shards
+    previous = PREVIOUS_SHARDS if previous is None else previous
+    keys = _layout(genre, shards)
+    if previous:
+        # Partitions both layouts share are only read once
+        keys += [key for key in _layout(genre, previous) if key not in keys]
+    return keys
+
+
+def genre_from_partition_key(partition_key, shards=None, previous=None):
+    shards = GENRE_SHARDS if shards is None else shards
+    previous = PREVIOUS_SHARDS if previous is None else previous
+    most = max(shards, previous)
+    genre = partition_key.replace("GENRE#", "", 1)
+    # A trailing "#<n>" is a shard suffix only while a sharded layout is in
+    # use; otherwise it belongs to the genre name
+    head, sep, tail = genre.rpartition("#")
+    if most > 1 and sep and tail.isdigit() and int(tail) < most:
+        return head
+    return genre
+
+
+def query_genre(
+    table, genre, limit, scan_forward=True, start=None, shards=None, **kwargs
+):
+    """Scatter-gather a genre over its shards and merge by GSI1SK.
+
+    ``start`` is the position returned by a previous call. Returns
+    ``(items, next_start)``; ``next_start`` is None once every shard is
+    exhausted.
+    """
+    partition_keys = genre_partition_keys(genre, shards)
+
+    if len(partition_keys) == 1:
+        # Unsharded: a plain keyset query, positions are LastEvaluatedKeys
+        query = dict(
+            kwargs,
+            IndexName=GENRE_INDEX,
+            KeyConditionExpression=Key("GSI1PK").eq(partition_keys[0]),
+            Limit=limit,
+            ScanIndexForward=scan_forward,
+        )
+        if start:
+            query["ExclusiveStartKey"] = start
+        response = table.query(**query)
+        return response.get("Items", []), response.get("LastEvaluatedKey")
+
+    # Merging needs the key attributes even when the caller projects fewer
+    stripped = set()
+    if "ProjectionExpression" in kwargs:
+        projected = {a.strip() for a in kwargs["ProjectionExpression"].split(",")}
+        stripped = {"PK", "SK", "GSI1SK"} - projected
+        if stripped:
+            kwargs["ProjectionExpression"] += ", " + ", ".join(sorted(stripped))
+
+    # Sharded positions map each shard to the last item consumed from it
+    # (None = not started); exhausted shards are dropped from the map.
+    positions = start["shards"] if start else {pk: None for pk in partition_keys}
+    results = {}
+    for partition_key, position in positions.items():
+        query = dict(
+            kwargs,
+            IndexName=GENRE_INDEX,
+            KeyConditionExpression=Key("GSI1PK").eq(partition_key),
+            Limit=limit,
+            ScanIndexForward=scan_forward,
+        )
+        if position:
+            query["ExclusiveStartKey"] = position
+        results[partition_key] = table.query(**query)
+
+    streams = [
+        [(item.get("GSI1SK", ""), item.get("PK", ""), pk, item) for item in r["Items"]]
+        for pk, r in results.items()
+    ]
+    merged = heapq.merge(
+        *streams, key=lambda entry: entry[:2], reverse=not scan_forward
+    )
+
+    items = []
+    taken = {pk: 0 for pk in results}
+    next_positions = dict(positions)
+    for sort_key, pk_value, partition_key, item in merged:
+        if len(items) >= limit:
+            break
+        items.append(item)
+        taken[partition_key] += 1
+        next_positions[partition_key] = {
+            "PK": item["PK"],
+            "SK": item["SK"],
+            "GSI1PK": partition_key,
+            "GSI1SK": sort_key,
+        }
+
+    for partition_key, response in results.items():
+        drained = taken[partition_key] == len(response.get("Items", []))
+        if drained and not response.get("LastEvaluatedKey"):
+            next_positions.pop(partition_key)
+
+    for item in items:
+        for attribute in stripped:
+            item.pop(attribute, None)
+
+    if not next_positions:
+        return items, None
+    return items, {"shards": next_positions}
+
+
+def query_random_shard(table, genre, limit, shards=None, **kwargs):
+    # A random read only needs one shard, which spreads hot-genre reads
+    # across partitions; fall through to the others if it happens to be empty.
+    partition_keys = genre_partition_keys(genre, shards)
+    random.shuffle(partition_keys)
+    for partition_key in partition_keys:
+        response = table.query(
+            IndexName=GENRE_INDEX,
+            KeyConditionExpression=Key("GSI1PK").eq(partition_key),
+            Limit=limit,
+            **kwargs,
+        )
+        items = response.get("Items", [])
+        if items:
+            return items
+    return []
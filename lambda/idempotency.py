@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import time
+from botocore.exceptions import ClientError
+
+# Client-supplied Idempotency-Key records. The first request with a key
+# claims it; retries with the same key get the stored response replayed
+# instead of being treated as a new write. Records expire through the
+# table's TTL attribute (expiresAt), so they never need cleaning up.
+IDEMPOTENCY_TTL = int(os.environ.get("IDEMPOTENCY_TTL", "3600"))
+# An IN_PROGRESS claim only lasts this long, so a request that died without
+# releasing its key blocks retries for seconds, not the whole TTL. Longer
+# than API Gateway's 29 s integration timeout.
+IDEMPOTENCY_LEASE = int(os.environ.get("IDEMPOTENCY_LEASE", "30"))
+MAX_KEY_LENGTH = 128
+
+
+class IdempotencyError(Exception):
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def header(event, name):
+    # API Gateway passes headers with the client's casing
+    for key, value in (event.get("headers") or {}).items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+
+def request_hash(body):
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def record_key(scope, key):
+    # Scoped per caller so two admins can't collide on the same key
+    return {"PK": f"IDEMPOTENCY#{scope}#{key}", "SK": "RECORD"}
+
+
+def begin(table, scope, key, fingerprint, now=None):
+    """Claim ``key`` for this request.
+
+    Returns None when claimed (go ahead and write) or the stored response
+    when an earlier request with the same key already completed. Raises
+    IdempotencyError when the key is reused for a different body (422) or
+    the earlier request is still running (409).
+    """
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise IdempotencyError(
+            400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"
+        )
+    now = int(now if now is not None else time.time())
+    try:
+        table.put_item(
+            Item={
+                **record_key(scope, key),
+                "status": "IN_PROGRESS",
+                "requestHash": fingerprint,
+                "expiresAt": now + IDEMPOTENCY_LEASE,
+            },
+            # TTL deletion lags, so expired records and leases count as absent
+            ConditionExpression="attribute_not_exists(PK) OR expiresAt < :now",
+            ExpressionAttributeValues={":now": now},
+        )
+        return None
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+
+    record = table.get_item(Key=record_key(scope, key), ConsistentRead=True).get(
+        "Item", {}
+    )
+    if record.get("requestHash") != fingerprint:
+        raise IdempotencyError(
+            422, "Idempotency-Key was already used with a different request"
+        )
+    if record.get("status") != "COMPLETED":
+        raise IdempotencyError(
+            409, "A request with this Idempotency-Key is still in progress"
+        )
+    return json.loads(record["response"])
+
+
+def complete(table, scope, key, response, now=None):
+    # Only the parts a replay needs; status code and body. Kept for the full
+    # TTL from here on.
+    now = int(now if now is not None else time.time())
+    stored = {"statusCode": response["statusCode"], "body": response["body"]}
+    table.update_item(
+        Key=record_key(scope, key),
+        UpdateExpression="SET #s = :done, #r = :response, expiresAt = :expires",
+        ExpressionAttributeNames={"#s": "status", "#r": "response"},
+        ExpressionAttributeValues={
+            ":done": "COMPLETED",
+            ":response": json.dumps(stored),
+            ":expires": now + IDEMPOTENCY_TTL,
+        },
+    )
+
+
+def release(table, scope, key):
+    # The write failed without a definite outcome; let the client retry
+    table.delete_item(Key=record_key(scope, key))
@@ -0,0 +1,120 @@
+import os
+import zlib
+from decimal import Decimal
+from boto3.dynamodb.types import Binary
+
+from write_path import batch_get
+
+# Stored layout of quote items. Format 1 is the plain layout build_item()
+# produces. Format 2 keeps long text zlib-compressed in a binary attribute;
+# items say which format they use in FORMAT_ATTR (absent = 1), so both can be
+# read side by side while old items are migrated (migrate.py compact-text).
+ITEM_FORMAT = 2
+FORMAT_ATTR = "fmt"
+COMPRESSED_TEXT = "textZ"
+
+# Texts shorter than this many UTF-8 bytes stay plain; 0 turns compression off
+ITEM_COMPRESS_MIN = int(os.environ.get("ITEM_COMPRESS_MIN", "256"))
+# Keep the plain text unless compression saves at least this fraction
+MIN_SAVING = 0.1
+
+# Attributes that only exist in the stored form
+STORED_ONLY = (COMPRESSED_TEXT, FORMAT_ATTR)
+
+
+def _unpack(packed):
+    if isinstance(packed, Binary):
+        packed = packed.value
+    return zlib.decompress(bytes(packed)).decode("utf-8")
+
+
+def pack_text(text, minimum=None):
+    # Compressed bytes for ``text``, or None where plain storage is better
+    minimum = ITEM_COMPRESS_MIN if minimum is None else minimum
+    raw = text.encode("utf-8")
+    if not minimum or len(raw) < minimum:
+        return None
+    packed = zlib.compress(raw, 9)
+    if len(packed) > len(raw) * (1 - MIN_SAVING):
+        return None
+    return packed
+
+
+def encode_item(item, minimum=None):
+    """The stored form of a quote item (a new dict; ``item`` is untouched).
+
+    A compressed text the item already carries (see decode_item's
+    keep_stored) is reused while it still matches, so unchanged items
+    encode to exactly the bytes in the table.
+    """
+    stored = {
+        name: value for name, value in item.items() if name not in STORED_ONLY
+    }
+    text = stored.get("text")
+    if not isinstance(text, str):
+        return stored
+    packed = item.get(COMPRESSED_TEXT)
+    if packed is None or _unpack(packed) != text:
+        packed = pack_text(text, minimum)
+    if packed is None:
+        return stored
+    del stored["text"]
+    stored[COMPRESSED_TEXT] = packed
+    stored[FORMAT_ATTR] = ITEM_FORMAT
+    return stored
+
+
+def decode_item(item, keep_stored=False):
+    """Turn a stored item back into the plain layout, in place.
+
+    Safe to call on items that are already plain. ``keep_stored`` leaves the
+    stored-only attributes on the item for code that writes it back.
+    """
+    if FORMAT_ATTR not in item and COMPRESSED_TEXT not in item:
+        return item
+    version = int(item.get(FORMAT_ATTR, ITEM_FORMAT))
+    if version > ITEM_FORMAT:
+        raise ValueError(f"Unsupported item format {version}")
+    if COMPRESSED_TEXT in item:
+        item["text"] = _unpack(item[COMPRESSED_TEXT])
+    if not keep_stored:
+        for name in STORED_ONLY:
+            item.pop(name, None)
+    return item
+
+
+def decode_items(items):
+    for item in items:
+        decode_item(item)
+    return items
+
+
+def load_missing_text(table, items):
+    # Items read from an index that doesn't project the compressed text get
+    # it from the base table (one batch read, only for long quotes)
+    missing = [item for item in items if "text" not in item and "quoteId" in item]
+    found = batch_get(
+        table,
+        [{"PK": f"QUOTE#{item['quoteId']}", "SK": "METADATA"} for item in missing],
+        ProjectionExpression="quoteId, #t, " + ", ".join(STORED_ONLY),
+        ExpressionAttributeNames={"#t": "text"},
+    )
+    texts = {quote["quoteId"]: decode_item(quote).get("text") for quote in found}
+    for item in missing:
+        if texts.get(item["quoteId"]) is not None:
+            item["text"] = texts[item["quoteId"]]
+    return items
+
+
+def stored_names(fields):
+    # What to project from the table to produce ``fields``
+    if "text" in fields:
+        return tuple(fields) + STORED_ONLY
+    return tuple(fields)
+
+
+def json_default(value):
+    # json.dumps default= for DynamoDB numbers, which come back as Decimal
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
@@ -2,35 +2,43 @@ import os
 import json
 import boto3
 
+from facets import related
+from listings import scan_authors
+from snapshots import snapshot_response
+from profiling import profiled
+
 dynamodb = boto3.resource("dynamodb")
 table = dynamodb.Table(os.environ["QUOTES_TABLE"])
+s3 = boto3.client("s3")
 
+HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",  # use "*" only for dev
+    "Access-Control-Allow-Headers": "Content-Type,Authorization",
+    "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
+}
 
-def lambda_handler(event, context):
-    # Scan only the author attribute (GSI2PK)
-    unique_authors = set()
-    start_key = None
 
-    while True:
-        kwargs = {"ProjectionExpression": "GSI2PK"}
-        if start_key:
-            kwargs["ExclusiveStartKey"] = start_key
+@profiled
+def lambda_handler(event, context):
+    query_params = event.get("queryStringParameters") or {}
+    genre = query_params.get("genre")
+    if genre:
+        # One query over the genre's adjacency items
+        return {
+            "statusCode": 200,
+            "headers": HEADERS,
+            "body": json.dumps(related(table, "genre", genre)),
+        }
 
-        resp = table.scan(**kwargs)
-        for item in resp.get("Items", []):
-            # Remove prefix "AUTHOR#" to get the actual author
-            unique_authors.add(item["GSI2PK"].replace("AUTHOR#", ""))
-        start_key = resp.get("LastEvaluatedKey")
-        if not start_key:
-            break
+    # Served from the published snapshot while it matches the catalog
+    # version; the scan below is the fallback
+    snapshot = snapshot_response(s3, table, "authors", HEADERS)
+    if snapshot:
+        return snapshot
 
     return {
         "statusCode": 200,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",  # use "*" only for dev
-            "Access-Control-Allow-Headers": "Content-Type,Authorization",
-            "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
-        },
-        "body": json.dumps(sorted(unique_authors)),
+        "headers": HEADERS,
+        "body": json.dumps(scan_authors(table)),
     }
@@ -1,36 +1,43 @@
 import os
 import json
 import boto3
+from facets import related
+from listings import scan_genres
+from snapshots import snapshot_response
+from profiling import profiled
 
 dynamodb = boto3.resource("dynamodb")
 table = dynamodb.Table(os.environ["QUOTES_TABLE"])
+s3 = boto3.client("s3")
 
+HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",  # use "*" only for dev
+    "Access-Control-Allow-Headers": "Content-Type,Authorization",
+    "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
+}
 
-def lambda_handler(event, context):
-    # Scan only the genre attribute (GSI1PK)
-    unique_genres = set()
-    start_key = None
 
-    while True:
-        kwargs = {"ProjectionExpression": "GSI1PK"}
-        if start_key:
-            kwargs["ExclusiveStartKey"] = start_key
+@profiled
+def lambda_handler(event, context):
+    query_params = event.get("queryStringParameters") or {}
+    author = query_params.get("author")
+    if author:
+        # One query over the author's adjacency items
+        return {
+            "statusCode": 200,
+            "headers": HEADERS,
+            "body": json.dumps(related(table, "author", author)),
+        }
 
-        resp = table.scan(**kwargs)
-        for item in resp.get("Items", []):
-            # Remove prefix "GENRE#" to get the actual genre
-            unique_genres.add(item["GSI1PK"].replace("GENRE#", ""))
-        start_key = resp.get("LastEvaluatedKey")
-        if not start_key:
-            break
+    # Served from the published snapshot while it matches the catalog
+    # version; the scan below is the fallback
+    snapshot = snapshot_response(s3, table, "genres", HEADERS)
+    if snapshot:
+        return snapshot
 
     return {
         "statusCode": 200,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",  # use "*" only for dev
-            "Access-Control-Allow-Headers": "Content-Type,Authorization",
-            "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
-        },
-        "body": json.dumps(sorted(unique_genres)),
+        "headers": HEADERS,
+        "body": json.dumps(scan_genres(table)),
     }
@@ -0,0 +1,39 @@
+from boto3.dynamodb.conditions import Attr
+
+from genre_shards import genre_from_partition_key
+
+# Genre and author names, from one scan over the quote items themselves.
+# Bookkeeping items (facets, checkpoints, registries) are filtered out on the
+# server, so a leftover counter can never name a listing with no quotes.
+
+
+def scan_listings(table):
+    """Every genre and every author with at least one quote, each sorted."""
+    genres, authors = set(), set()
+    start_key = None
+    while True:
+        kwargs = {
+            "ProjectionExpression": "GSI1PK, GSI2PK",
+            "FilterExpression": Attr("PK").begins_with("QUOTE#")
+            & Attr("SK").eq("METADATA"),
+        }
+        if start_key:
+            kwargs["ExclusiveStartKey"] = start_key
+        resp = table.scan(**kwargs)
+        for item in resp.get("Items", []):
+            if "GSI1PK" in item:
+                # Remove prefix "GENRE#" and any shard suffix
+                genres.add(genre_from_partition_key(item["GSI1PK"]))
+            if "GSI2PK" in item:
+                authors.add(item["GSI2PK"].replace("AUTHOR#", "", 1))
+        start_key = resp.get("LastEvaluatedKey")
+        if not start_key:
+            return sorted(genres), sorted(authors)
+
+
+def scan_genres(table):
+    return scan_listings(table)[0]
+
+
+def scan_authors(table):
+    return scan_listings(table)[1]
@@ -0,0 +1,25 @@
+import os
+import json
+import boto3
+
+from sources import list_sources
+from profiling import profiled
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(os.environ["QUOTES_TABLE"])
+
+
+@profiled
+def lambda_handler(event, context):
+    # Query the source registry (kept current by createquotes_handler)
+    # instead of scanning every quote
+    return {
+        "statusCode": 200,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*",  # use "*" only for dev
+            "Access-Control-Allow-Headers": "Content-Type,Authorization",
+            "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
+        },
+        "body": json.dumps(sorted(list_sources(table))),
+    }
@@ -0,0 +1,194 @@
+import json
+import os
+import socket
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from catalog_version import current_version
+from item_format import json_default
+
+# Seconds a cached page stays valid; 0 disables the cache entirely
+PAGE_CACHE_TTL = float(os.environ.get("PAGE_CACHE_TTL", "0"))
+PAGE_CACHE_MAX_BYTES = int(os.environ.get("PAGE_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+# Optional shared tier, e.g. "redis://cache.internal:6379"
+PAGE_CACHE_REDIS_URL = os.environ.get("PAGE_CACHE_REDIS_URL")
+
+
+class LRUCache:
+    # In-process tier: bounded by the total size of the stored payloads
+
+    def __init__(self, max_bytes, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.size = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= self.clock():
+            self._remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl):
+        if len(value) > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (value, self.clock() + ttl)
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+
+    def _remove(self, key):
+        value, _ = self.entries.pop(key)
+        self.size -= len(value)
+
+
+class RedisBackend:
+    # Minimal RESP client (GET / SET PX) so any Redis-compatible server can
+    # act as the shared tier without bundling a client library. Errors are
+    # swallowed: the cache must never fail a request.
+
+    def __init__(self, url, timeout=0.05):
+        parsed = urlparse(url)
+        self.address = (parsed.hostname or "localhost", parsed.port or 6379)
+        self.timeout = timeout
+        self.sock = None
+        self.reader = None
+
+    def get(self, key):
+        try:
+            return self._command(b"GET", key)
+        except (OSError, ValueError):
+            self._close()
+            return None
+
+    def set(self, key, value, ttl):
+        try:
+            self._command(b"SET", key, value, b"PX", str(int(ttl * 1000)))
+        except (OSError, ValueError):
+            self._close()
+
+    def _command(self, *args):
+        if self.sock is None:
+            self.sock = socket.create_connection(self.address, self.timeout)
+            self.reader = self.sock.makefile("rb")
+        parts = [a if isinstance(a, bytes) else str(a).encode() for a in args]
+        payload = b"*%d\r\n" % len(parts)
+        for part in parts:
+            payload += b"$%d\r\n%s\r\n" % (len(part), part)
+        self.sock.sendall(payload)
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self.reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ValueError("connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            return self.reader.read(length + 2)[:-2]
+        raise ValueError(rest.decode(errors="replace"))
+
+    def _close(self):
+        if self.sock is not None:
+            self.sock.close()
+        self.sock = None
+        self.reader = None
+
+
+class PageCache:
+    def __init__(self, ttl, local, shared=None, namespace=""):
+        self.ttl = ttl
+        # Keeps handlers sharing the Redis tier from reading each other's
+        # entries, which have different shapes under similar parts
+        self.namespace = namespace
+        self.local = local
+        self.shared = shared
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def read_through(self, table, parts, loader):
+        # parts identifies the page: (shape, index, key, cursor, limit,
+        # projection), shape naming what the loader returns. The catalog
+        # version is folded in, so creates invalidate by bumping it.
+        if not self.ttl:
+            return loader()
+
+        key = json.dumps(
+            [self.namespace, current_version(table), *parts], separators=(",", ":")
+        )
+        payload = self.local.get(key)
+        if payload is not None:
+            self.hits += 1
+            return json.loads(payload)
+
+        if self.shared is not None:
+            shared_payload = self.shared.get(key.encode())
+            if shared_payload is not None:
+                self.shared_hits += 1
+                payload = shared_payload.decode()
+                self.local.set(key, payload, self.ttl)
+                return json.loads(payload)
+
+        self.misses += 1
+        value = loader()
+        payload = json.dumps(value, default=json_default)
+        self.local.set(key, payload, self.ttl)
+        if self.shared is not None:
+            self.shared.set(key.encode(), payload.encode(), self.ttl)
+        return json.loads(payload)
+
+    def flush_metrics(self, function_name):
+        # CloudWatch embedded metric format: one log line, counters since the
+        # previous flush
+        if not self.ttl:
+            return
+        lookups = self.hits + self.shared_hits + self.misses
+        if not lookups:
+            return
+        record = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": "NovaMuse",
+                        "Dimensions": [["Function"]],
+                        "Metrics": [
+                            {"Name": "PageCacheHits", "Unit": "Count"},
+                            {"Name": "PageCacheSharedHits", "Unit": "Count"},
+                            {"Name": "PageCacheMisses", "Unit": "Count"},
+                            {"Name": "PageCacheHitRate", "Unit": "Percent"},
+                        ],
+                    }
+                ],
+            },
+            "Function": function_name,
+            "PageCacheHits": self.hits,
+            "PageCacheSharedHits": self.shared_hits,
+            "PageCacheMisses": self.misses,
+            "PageCacheHitRate": 100.0 * (lookups - self.misses) / lookups,
+            "PageCacheBytes": self.local.size,
+        }
+        print(json.dumps(record))
+        self.hits = self.shared_hits = self.misses = 0
+
+
+def build_cache(namespace):
+    shared = RedisBackend(PAGE_CACHE_REDIS_URL) if PAGE_CACHE_REDIS_URL else None
+    return PageCache(
+        PAGE_CACHE_TTL, LRUCache(PAGE_CACHE_MAX_BYTES), shared, namespace
+    )
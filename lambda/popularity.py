@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+
+from thread_tables import thread_table
+
+# Views are buffered in the container and written once they are due, so a
+# popular quote costs one UpdateItem per flush instead of one per read. Only
+# single-quote responses count as views; list pages are impressions and
+# aren't counted. A reaped container loses at most one buffer of views.
+# Shares are acknowledged with a 202, so sharequote_handler forces a flush.
+FLUSH_SIZE = int(os.environ.get("POPULARITY_FLUSH_SIZE", "25"))
+FLUSH_INTERVAL = float(os.environ.get("POPULARITY_FLUSH_INTERVAL", "30"))
+# A due flush writes its quotes concurrently, each thread through its own
+# Table; the pool is kept across invocations
+FLUSH_WORKERS = int(os.environ.get("POPULARITY_FLUSH_WORKERS", "8"))
+executor = ThreadPoolExecutor(max_workers=FLUSH_WORKERS)
+SHARE_WEIGHT = int(os.environ.get("POPULARITY_SHARE_WEIGHT", "5"))
+
+# Sparse leaderboard index: only quotes that have been viewed or shared
+# carry GSI3PK, so the index holds just the ranked quotes per genre.
+TOP_INDEX = "GSI3-Top"
+
+
+def top_partition_key(genre):
+    return f"TOP#{genre}"
+
+
+class CounterBuffer:
+    def __init__(self, flush_size=None, flush_interval=None, clock=time.monotonic):
+        self.flush_size = FLUSH_SIZE if flush_size is None else flush_size
+        self.flush_interval = (
+            FLUSH_INTERVAL if flush_interval is None else flush_interval
+        )
+        self.clock = clock
+        self.pending = {}
+        self.oldest = None
+        # bootstrap_handler serves quotes from several threads
+        self.lock = threading.Lock()
+
+    def _record(self, quote_id, genre, views, shares):
+        if not quote_id or not genre:
+            return
+        with self.lock:
+            entry = self.pending.setdefault(quote_id, [genre, 0, 0])
+            entry[1] += views
+            entry[2] += shares
+            if self.oldest is None:
+                self.oldest = self.clock()
+
+    def record_views(self, items):
+        for item in items:
+            self._record(item.get("quoteId"), item.get("genre"), 1, 0)
+
+    def record_share(self, quote_id, genre):
+        self._record(quote_id, genre, 0, 1)
+
+    def due(self):
+        if not self.pending:
+            return False
+        return (
+            len(self.pending) >= self.flush_size
+            or self.clock() - self.oldest >= self.flush_interval
+        )
+
+    def flush(self, table, force=False):
+        # One coalesced ADD per quote, written concurrently. Errors are
+        # swallowed: losing a few counts is better than failing the read
+        # that triggered the flush.
+        with self.lock:
+            if not self.pending or not (force or self.due()):
+                return 0
+            pending, self.pending, self.oldest = self.pending, {}, None
+        if len(pending) == 1:
+            return sum(_write(table, *entry) for entry in pending.items())
+        return sum(
+            executor.map(
+                lambda entry: _write(thread_table(table), *entry), pending.items()
+            )
+        )
+
+
+def _write(table, quote_id, counts):
+    genre, views, shares = counts
+    try:
+        table.update_item(
+            Key={"PK": f"QUOTE#{quote_id}", "SK": "METADATA"},
+            UpdateExpression=(
+                "SET GSI3PK = if_not_exists(GSI3PK, :top) "
+                "ADD #views :views, #shares :shares, #score :score"
+            ),
+            # Never resurrect a deleted quote as a bare counter item
+            ConditionExpression="attribute_exists(PK)",
+            ExpressionAttributeNames={
+                "#views": "views",
+                "#shares": "shares",
+                "#score": "score",
+            },
+            ExpressionAttributeValues={
+                ":top": top_partition_key(genre),
+                ":views": views,
+                ":shares": shares,
+                ":score": views + SHARE_WEIGHT * shares,
+            },
+        )
+        return 1
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            print(f"Dropped counters for {quote_id}: {e}")
+        return 0
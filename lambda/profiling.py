@@ -0,0 +1,164 @@
+import cProfile
+import functools
+import json
+import os
+import pstats
+import random
+import time
+import tracemalloc
+
+# Opt-in profiling for handlers. A profiled invocation runs under cProfile
+# (and tracemalloc when PROFILE_MEMORY=1) and logs one JSON record with the
+# top-N functions by own time, time per package (botocore vs json vs our
+# code...) and peak allocation. Off by default; costs one random() per
+# request when off.
+#
+#   PROFILE=1                  profile every invocation
+#   PROFILE_SAMPLE_RATE=0.01   or this fraction of them
+#   PROFILE_CAPTURE_EVENT=1    include the event, for profile_handler.py
+#
+# Only the invoking thread is profiled (not bootstrap's worker threads).
+PROFILE = os.environ.get("PROFILE", "") == "1"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MEMORY = os.environ.get("PROFILE_MEMORY", "") == "1"
+PROFILE_CAPTURE_EVENT = os.environ.get("PROFILE_CAPTURE_EVENT", "") == "1"
+PROFILE_TOP_N = int(os.environ.get("PROFILE_TOP_N", "15"))
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# Path components followed by a package name (the Lambda runtime keeps
+# boto3 and botocore under /var/runtime)
+PACKAGE_ROOTS = ("site-packages", "dist-packages", "runtime")
+REDACTED_HEADERS = ("authorization", "cookie")
+
+_active = False
+
+
+def sampled():
+    if PROFILE:
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def package_of(filename, function):
+    # Where a profiled function lives: "app" for lambda/, else its package
+    if filename == "~":
+        # C functions; the json accelerators are worth telling apart
+        return "json" if "json" in function else "builtins"
+    path = os.path.abspath(filename)
+    if path.startswith(APP_DIR + os.sep):
+        return "app"
+    parts = path.split(os.sep)
+    for i, part in enumerate(parts[:-1]):
+        if part in PACKAGE_ROOTS:
+            return parts[i + 1].removesuffix(".py")
+    for i, part in enumerate(parts[:-1]):
+        if part.startswith("python3"):
+            return parts[i + 1].removesuffix(".py")
+    return parts[-1].removesuffix(".py")
+
+
+def summarize(profiler, top_n=None):
+    # (top functions by own time, own time per package), times in ms
+    top_n = PROFILE_TOP_N if top_n is None else top_n
+    stats = pstats.Stats(profiler).stats
+    packages = {}
+    rows = []
+    for (filename, line, function), (_, calls, own, total, _) in stats.items():
+        package = package_of(filename, function)
+        packages[package] = packages.get(package, 0.0) + own * 1000
+        location = function if filename == "~" else f"{filename}:{line}({function})"
+        rows.append((own, total, calls, location))
+    rows.sort(reverse=True)
+    top = [
+        {
+            "function": location,
+            "calls": calls,
+            "ownMs": round(own * 1000, 3),
+            "cumulativeMs": round(total * 1000, 3),
+        }
+        for own, total, calls, location in rows[:top_n]
+    ]
+    by_package = {
+        name: round(ms, 3)
+        for name, ms in sorted(packages.items(), key=lambda entry: -entry[1])
+    }
+    return top, by_package
+
+
+def _redact(event):
+    # A copy without credentials: auth headers (single and multi-value) and
+    # the authorizer's claims
+    if not isinstance(event, dict):
+        return event
+    event = dict(event)
+    for key in ("headers", "multiValueHeaders"):
+        if event.get(key):
+            event[key] = {
+                name: "<redacted>" if name.lower() in REDACTED_HEADERS else value
+                for name, value in event[key].items()
+            }
+    context = event.get("requestContext")
+    if isinstance(context, dict) and "authorizer" in context:
+        event["requestContext"] = {**context, "authorizer": "<redacted>"}
+    return event
+
+
+def run_profiled(
+    function, name, args, kwargs, memory=None, capture_event=None, profiler=None
+):
+    """Call ``function`` under the profilers and log the record.
+
+    Returns (result, record). Pass ``profiler`` to keep the raw
+    cProfile data as well.
+    """
+    global _active
+    memory = PROFILE_MEMORY if memory is None else memory
+    capture_event = PROFILE_CAPTURE_EVENT if capture_event is None else capture_event
+    tracing = memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    elif memory:
+        tracemalloc.reset_peak()
+    profiler = profiler or cProfile.Profile()
+    _active = True
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        result = function(*args, **kwargs)
+    finally:
+        profiler.disable()
+        elapsed = (time.perf_counter() - started) * 1000
+        _active = False
+        top, by_package = summarize(profiler)
+        record = {
+            "Profile": name,
+            "durationMs": round(elapsed, 3),
+            "top": top,
+            "byPackage": by_package,
+        }
+        if memory:
+            record["peakKB"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+            statistics = tracemalloc.take_snapshot().statistics("lineno")
+            record["topAllocations"] = [
+                {"line": str(stat.traceback), "KB": round(stat.size / 1024, 1)}
+                for stat in statistics[:PROFILE_TOP_N]
+            ]
+            if tracing:
+                tracemalloc.stop()
+        if capture_event and args:
+            record["event"] = _redact(args[0])
+        print(json.dumps(record, default=str))
+    return result, record
+
+
+def profiled(handler):
+    # Decorator for lambda_handler functions
+    name = handler.__module__
+
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        if _active or not sampled():
+            return handler(*args, **kwargs)
+        return run_profiled(handler, name, args, kwargs)[0]
+
+    return wrapper
@@ -0,0 +1,26 @@
+import os
+import boto3
+
+from catalog_version import VERSION_KEY
+from snapshots import SNAPSHOT_BUCKET, publish
+from profiling import profiled
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(os.environ["QUOTES_TABLE"])
+s3 = boto3.client("s3")
+
+
+@profiled
+def lambda_handler(event, context):
+    # Triggered by stream records for the catalog version item. The records
+    # themselves don't matter: a batch of bumps is one rebuild of whatever
+    # is current, and the record for our own publishedVersion write finds
+    # nothing left to do.
+    item = table.get_item(Key=VERSION_KEY, ConsistentRead=True).get("Item") or {}
+    version = int(item.get("version", 0))
+    published = item.get("publishedVersion")
+    if published is not None and int(published) >= version:
+        return {"published": False, "version": version}
+
+    publish(s3, table, SNAPSHOT_BUCKET, version)
+    return {"published": True, "version": version}
@@ -0,0 +1,314 @@
+from changes import now, stamp, tombstone
+from checkpoints import checkpoint_pk
+from facets import facet_keys
+from genre_shards import genre_partition_key
+from item_format import COMPRESSED_TEXT, encode_item
+from popularity import top_partition_key
+from quote_text import TEXT_HASH_ATTR, normalize_text, text_hash, text_key
+from similar import SIMILAR_ATTRS
+from sources import SOURCES_PK, source_partition_key
+from tags import TAGS_PK, tag_partition_key
+
+# Attributes an admin may change; everything else on a quote is derived
+EDITABLE_FIELDS = ("text", "author", "genre", "source", "tags")
+
+
+def quote_key(quote_id):
+    return {"PK": f"QUOTE#{quote_id}", "SK": "METADATA"}
+
+
+def index_keys(quote_id, genre, author, source, created_at):
+    return {
+        "GSI1PK": genre_partition_key(genre, quote_id),
+        "GSI1SK": f"CREATED#{created_at}",
+        "GSI2PK": f"AUTHOR#{author}",
+        "GSI2SK": f"CREATED#{created_at}",
+        "GSI4PK": source_partition_key(source),
+        "GSI4SK": f"CREATED#{created_at}",
+    }
+
+
+def build_item(quote_id, text, author, genre, source, created_at, tags=()):
+    item = {
+        **quote_key(quote_id),
+        "quoteId": quote_id,
+        **index_keys(quote_id, genre, author, source, created_at),
+        "text": text,
+        "author": author,
+        "genre": genre,
+        "source": source,
+        "createdAt": created_at,
+        TEXT_HASH_ATTR: text_hash(text),
+    }
+    if tags:
+        item["tags"] = list(tags)
+    return item
+
+
+def _unchanged(old):
+    # Optimistic concurrency: the write only applies if the editable
+    # attributes (in their stored form) still hold what this change was
+    # computed from
+    names, values, clauses = {}, {}, []
+    for i, name in enumerate(EDITABLE_FIELDS + (COMPRESSED_TEXT,)):
+        names[f"#e{i}"] = name
+        if name in old:
+            values[f":e{i}"] = old[name]
+            clauses.append(f"#e{i} = :e{i}")
+        else:
+            clauses.append(f"attribute_not_exists(#e{i})")
+    return " AND ".join(clauses), names, values
+
+
+def _counter(table_name, key, delta, extra=None):
+    # ADD on a bookkeeping counter (source registry, tag sizes, listing sizes)
+    names, values, sets = {}, {":delta": delta}, []
+    for i, (name, value) in enumerate((extra or {}).items()):
+        names[f"#x{i}"] = name
+        values[f":x{i}"] = value
+        sets.append(f"#x{i} = :x{i}")
+    expression = (f"SET {', '.join(sets)} " if sets else "") + "ADD #n :delta"
+    names["#n"] = "itemCount" if key["PK"].startswith("CHECKPOINTS#") else "quoteCount"
+    return {
+        "Update": {
+            "TableName": table_name,
+            "Key": key,
+            "UpdateExpression": expression,
+            "ExpressionAttributeNames": names,
+            "ExpressionAttributeValues": values,
+        }
+    }
+
+
+def _bookkeeping(table_name, old, new):
+    # Counter moves for whatever differs between old and new (None = absent)
+    actions = []
+
+    def moves(prefix_of, value_of):
+        before = value_of(old) if old else set()
+        after = value_of(new) if new else set()
+        for value in before - after:
+            actions.append(_counter(table_name, *prefix_of(value, -1)))
+        for value in after - before:
+            actions.append(_counter(table_name, *prefix_of(value, 1)))
+
+    moves(
+        lambda genre, d: ({"PK": checkpoint_pk(f"GENRE#{genre}"), "SK": "META"}, d),
+        lambda item: {item["genre"]},
+    )
+    moves(
+        lambda author, d: ({"PK": checkpoint_pk(f"AUTHOR#{author}"), "SK": "META"}, d),
+        lambda item: {item["author"]},
+    )
+    # Both copies of the (genre, author) facet count
+    for mirror in (0, 1):
+        moves(
+            lambda pair, d, mirror=mirror: (facet_keys(*pair)[mirror], d),
+            lambda item: {(item["genre"], item["author"])},
+        )
+    moves(
+        lambda source, d: (
+            {"PK": SOURCES_PK, "SK": source_partition_key(source)},
+            d,
+            {"source": source},
+        ),
+        lambda item: {item["source"]},
+    )
+    moves(
+        lambda tag, d: ({"PK": TAGS_PK, "SK": tag_partition_key(tag)}, d, {"tag": tag}),
+        lambda item: set(item.get("tags", [])),
+    )
+    return actions
+
+
+def _edges(table_name, old, new):
+    # Tag edge items; only added and removed tags are touched
+    old_edges = {
+        (tag_partition_key(tag), f"QUOTE#{old['quoteId']}"): old["quoteId"]
+        for tag in (old.get("tags", []) if old else [])
+    }
+    new_edges = {
+        (tag_partition_key(tag), f"QUOTE#{new['quoteId']}"): new["quoteId"]
+        for tag in (new.get("tags", []) if new else [])
+    }
+    actions = []
+    for pk, sk in old_edges.keys() - new_edges.keys():
+        actions.append(
+            {"Delete": {"TableName": table_name, "Key": {"PK": pk, "SK": sk}}}
+        )
+    for (pk, sk), quote_id in new_edges.items():
+        if (pk, sk) not in old_edges:
+            item = {"PK": pk, "SK": sk, "quoteId": quote_id}
+            actions.append({"Put": {"TableName": table_name, "Item": item}})
+    return actions
+
+
+def apply_changes(old, changes, updated_at=None):
+    """Return the quote item after ``changes`` (a subset of EDITABLE_FIELDS).
+
+    The id never changes. Derived keys are recomputed only for the
+    attributes that changed; the creation time, popularity counters and
+    their index keys carry over (similar-quote lists only while the
+    normalized text stays the same). An actual change is stamped with
+    ``updated_at`` (default now).
+    """
+    new = dict(old)
+    for name, value in changes.items():
+        if name == "tags":
+            if value:
+                new["tags"] = list(value)
+            else:
+                new.pop("tags", None)
+        else:
+            new[name] = value
+
+    quote_id = old["quoteId"]
+    keys = index_keys(
+        quote_id, new["genre"], new["author"], new["source"], old["createdAt"]
+    )
+    if normalize_text(new["text"]) != normalize_text(old["text"]):
+        # Claims the new text's guard (update_actions)
+        new[TEXT_HASH_ATTR] = text_hash(new["text"])
+        # Neighbours of the old wording; build_similar.py lists the new one
+        for name in SIMILAR_ATTRS:
+            new.pop(name, None)
+    if new["genre"] != old["genre"]:
+        new["GSI1PK"] = keys["GSI1PK"]
+    if new["author"] != old["author"]:
+        new["GSI2PK"] = keys["GSI2PK"]
+    if new["source"] != old["source"]:
+        new["GSI4PK"] = keys["GSI4PK"]
+    if "GSI3PK" in old and new["genre"] != old["genre"]:
+        new["GSI3PK"] = top_partition_key(new["genre"])
+    if any(new.get(name) != old.get(name) for name in EDITABLE_FIELDS):
+        stamp(new, updated_at or now())
+    return new
+
+
+def _guards(table_name, old, new):
+    # Moves the text guard when the normalized text changes: the new one must
+    # be free (a conflict cancels the transaction), the old one is released
+    # if this quote held it
+    old_hash = old.get(TEXT_HASH_ATTR) if old else None
+    new_hash = new.get(TEXT_HASH_ATTR) if new else None
+    if old_hash == new_hash:
+        return []
+    actions = []
+    if new_hash:
+        guard = {**text_key(new_hash), "quoteId": new["quoteId"]}
+        actions.append(
+            {
+                "Put": {
+                    "TableName": table_name,
+                    "Item": guard,
+                    "ConditionExpression": "attribute_not_exists(PK)",
+                }
+            }
+        )
+    if old_hash:
+        actions.append({"Delete": {"TableName": table_name, "Key": text_key(old_hash)}})
+    return actions
+
+
+def update_actions(table_name, old, new):
+    """TransactWriteItems actions that turn ``old`` into ``new``.
+
+    The item is updated in place with just the changed attributes; a new
+    text guard, when there is one, is the second action. ``old`` should be
+    decoded with keep_stored so its compressed text is compared byte for
+    byte.
+    """
+    stored_old, stored_new = encode_item(old), encode_item(new)
+    condition, names, values = _unchanged(stored_old)
+    changed = {
+        name: value
+        for name, value in stored_new.items()
+        if name not in ("PK", "SK") and stored_old.get(name) != value
+    }
+    removed = [name for name in stored_old if name not in stored_new]
+    if not changed and not removed:
+        return []
+    for i, (name, value) in enumerate(changed.items()):
+        names[f"#u{i}"] = name
+        values[f":u{i}"] = value
+    expression = "SET " + ", ".join(f"#u{i} = :u{i}" for i in range(len(changed)))
+    if removed:
+        for i, name in enumerate(removed):
+            names[f"#r{i}"] = name
+        remove = "REMOVE " + ", ".join(f"#r{i}" for i in range(len(removed)))
+        expression = f"{expression} {remove}" if changed else remove
+    actions = [
+        {
+            "Update": {
+                "TableName": table_name,
+                "Key": quote_key(old["quoteId"]),
+                "UpdateExpression": expression,
+                "ConditionExpression": condition,
+                "ExpressionAttributeNames": names,
+                "ExpressionAttributeValues": values,
+            }
+        }
+    ]
+    return (
+        actions
+        + _guards(table_name, old, new)
+        + _edges(table_name, old, new)
+        + _bookkeeping(table_name, old, new)
+    )
+
+
+def create_actions(table_name, new):
+    """TransactWriteItems actions that add the quote ``new``.
+
+    The item (whose id must be free) comes first and its text guard second;
+    tag edges and every counter the quote moves follow.
+    """
+    actions = [
+        {
+            "Put": {
+                "TableName": table_name,
+                "Item": encode_item(new),
+                "ConditionExpression": "attribute_not_exists(PK)",
+            }
+        }
+    ]
+    return (
+        actions
+        + _guards(table_name, None, new)
+        + _edges(table_name, None, new)
+        + _bookkeeping(table_name, None, new)
+    )
+
+
+def delete_actions(table_name, old, deleted_at=None):
+    condition, names, values = _unchanged(encode_item(old))
+    actions = [
+        {
+            "Delete": {
+                "TableName": table_name,
+                "Key": quote_key(old["quoteId"]),
+                "ConditionExpression": condition,
+                "ExpressionAttributeNames": names,
+                "ExpressionAttributeValues": values,
+            }
+        },
+        {
+            "Put": {
+                "TableName": table_name,
+                "Item": tombstone(old["quoteId"], deleted_at or now()),
+            }
+        },
+    ]
+    return (
+        actions
+        + _guards(table_name, old, None)
+        + _edges(table_name, old, None)
+        + _bookkeeping(table_name, old, None)
+    )
+
+
+def transact(table, actions):
+    # One all-or-nothing write; at most 3 + 4 * MAX_TAGS + 10 actions, well
+    # under the 100-action limit
+    if actions:
+        table.meta.client.transact_write_items(TransactItems=actions)
@@ -0,0 +1,122 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from botocore.exceptions import ClientError
+
+import checkpoints
+from checkpoints import checkpoint_pk, offset_sk, start_key
+from fields import PUBLIC_FIELDS, projection
+from genre_shards import genre_partition_keys, query_genre
+from item_format import decode_item
+from listings import scan_genres
+
+# All genres' picks for one UTC day live in a single item
+QOTD_PK = "QOTD"
+
+
+def today():
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def previous_day(date):
+    return (datetime.fromisoformat(date).date() - timedelta(days=1)).isoformat()
+
+
+def seconds_until_midnight(now=None):
+    now = now or datetime.now(timezone.utc)
+    midnight = datetime.combine(
+        now.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc
+    )
+    return max(int((midnight - now).total_seconds()), 1)
+
+
+def seed_offset(date, genre, total):
+    # Same date + genre -> same position, on every container and every rerun
+    digest = hashlib.sha256(f"{date}#{genre}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % total
+
+
+def quote_at(table, genre, offset):
+    # Oldest-first position `offset`, reached from the checkpoint at or below
+    # it, so the read is bounded by CHECKPOINT_EVERY items
+    projection_expression, projection_names = projection(PUBLIC_FIELDS)
+    every = checkpoints.CHECKPOINT_EVERY
+    base = offset - offset % every
+    start = None
+    if base:
+        checkpoint = table.get_item(
+            Key={"PK": checkpoint_pk(f"GENRE#{genre}"), "SK": offset_sk(base)}
+        ).get("Item")
+        if checkpoint is None:
+            return None
+        start = start_key(checkpoint, "GSI1PK", "GSI1SK", genre_partition_keys(genre))
+    # From the oldest end the first item is included; after a checkpoint the
+    # read starts just past the checkpointed item
+    needed = offset - base + (0 if base else 1)
+    if needed == 0:
+        return table.get_item(
+            Key={"PK": checkpoint["itemPK"], "SK": checkpoint["itemSK"]},
+            ProjectionExpression=projection_expression,
+            ExpressionAttributeNames=projection_names,
+        ).get("Item")
+    items, _ = query_genre(
+        table,
+        genre,
+        needed,
+        start=start,
+        ProjectionExpression=projection_expression,
+        ExpressionAttributeNames=projection_names,
+    )
+    return items[needed - 1] if len(items) >= needed else None
+
+
+def select_for_date(table, date):
+    projection_expression, projection_names = projection(PUBLIC_FIELDS)
+    picks = {}
+    for genre in scan_genres(table):
+        meta = table.get_item(
+            Key={"PK": checkpoint_pk(f"GENRE#{genre}"), "SK": "META"}
+        ).get("Item")
+        total = int(meta["itemCount"]) if meta else 0
+        quote = None
+        if total:
+            quote = quote_at(table, genre, seed_offset(date, genre, total))
+        if quote is None:
+            # No (or stale) checkpoints: fall back to walking the genre
+            items, start = [], None
+            while True:
+                page, start = query_genre(
+                    table,
+                    genre,
+                    500,
+                    start=start,
+                    ProjectionExpression=projection_expression,
+                    ExpressionAttributeNames=projection_names,
+                )
+                items.extend(page)
+                if not start:
+                    break
+            if items:
+                quote = items[seed_offset(date, genre, len(items))]
+        if quote is not None:
+            picks[genre] = decode_item(quote)
+    return picks
+
+
+def store(table, date, picks):
+    # Conditional so concurrent builders never flip a published pick
+    item = {"PK": QOTD_PK, "SK": date, "date": date, "quotes": picks}
+    try:
+        table.put_item(Item=item, ConditionExpression="attribute_not_exists(PK)")
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return table.get_item(Key={"PK": QOTD_PK, "SK": date})["Item"]
+    return item
+
+
+def load(table, date):
+    return table.get_item(Key={"PK": QOTD_PK, "SK": date}).get("Item")
+
+
+def build(table, date):
+    return store(table, date, select_for_date(table, date))
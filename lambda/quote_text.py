@@ -0,0 +1,113 @@
+import hashlib
+import secrets
+import time
+from botocore.exceptions import ClientError
+
+# Quote text identity, shared by every writer (createquotes_handler, admin
+# edits, seed_quotes.py, migrate.py).
+#
+# Public ids are random and never change. Duplicates are caught by a guard
+# item per normalized text:
+#
+#   PK = TEXT#<sha256 of the normalized text>   SK = QUOTE   quoteId = ...
+#
+# The quote that holds the guard records its hash in TEXT_HASH_ATTR, so edits
+# and deletes know which guard to move or release. Ids issued before this
+# (the first 8 hex chars of an md5) stay valid; they are only ever looked up.
+TEXT_HASH_ATTR = "textHash"
+QUOTE_ID_BYTES = 8
+# A guard whose quote doesn't exist is only taken over once it is this old,
+# so a create that claimed it and is about to write the quote keeps it
+GUARD_GRACE_SECONDS = 60
+
+
+def normalize_text(text):
+    return " ".join(text.lower().strip().split())
+
+
+def text_hash(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def new_quote_id():
+    # 64 random bits as 16 hex chars
+    return secrets.token_hex(QUOTE_ID_BYTES)
+
+
+def legacy_quote_id(text):
+    # The id scheme before random ids (collides past ~65k quotes)
+    return hashlib.md5(normalize_text(text).encode("utf-8")).hexdigest()[:8]
+
+
+def text_key(digest):
+    return {"PK": f"TEXT#{digest}", "SK": "QUOTE"}
+
+
+def _guard(table, digest):
+    return table.get_item(Key=text_key(digest), ConsistentRead=True).get("Item")
+
+
+def find_owner(table, digest):
+    item = _guard(table, digest)
+    return item["quoteId"] if item else None
+
+
+def find_quote_id(table, text):
+    # Id of the quote with this text (after normalization), or None
+    return find_owner(table, text_hash(text))
+
+
+def _quote_exists(table, quote_id):
+    key = {"PK": f"QUOTE#{quote_id}", "SK": "METADATA"}
+    return "Item" in table.get_item(Key=key, ProjectionExpression="PK")
+
+
+def claim_text(table, digest, quote_id):
+    """Point the guard for ``digest`` at ``quote_id``.
+
+    Returns the id holding the guard afterwards: ``quote_id`` on success
+    (including when an earlier, retried attempt already claimed it), the
+    other quote's id for a duplicate. A guard whose quote is gone (a create
+    that failed half way) is taken over after GUARD_GRACE_SECONDS.
+    """
+    now = int(time.time())
+    guard = {**text_key(digest), "quoteId": quote_id, "claimedAt": now}
+    condition, values = "attribute_not_exists(PK)", {}
+    for _ in range(2):
+        try:
+            table.put_item(
+                Item=guard,
+                ConditionExpression=condition,
+                **({"ExpressionAttributeValues": values} if values else {}),
+            )
+            return quote_id
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+        holder = _guard(table, digest)
+        if holder is None:
+            continue
+        owner = holder["quoteId"]
+        if (
+            owner == quote_id
+            or int(holder.get("claimedAt", 0)) > now - GUARD_GRACE_SECONDS
+            or _quote_exists(table, owner)
+        ):
+            return owner
+        condition = "quoteId = :stale"
+        values = {":stale": owner}
+    # Lost a race for a dangling guard
+    return find_owner(table, digest)
+
+
+def release_text(table, digest, quote_id):
+    # Drop the guard if ``quote_id`` still holds it
+    try:
+        table.delete_item(
+            Key=text_key(digest),
+            ConditionExpression="quoteId = :id",
+            ExpressionAttributeValues={":id": quote_id},
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
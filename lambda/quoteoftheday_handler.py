@@ -0,0 +1,83 @@
+import os
+import json
+import boto3
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import quote_of_the_day
+from profiling import profiled
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(os.environ["QUOTES_TABLE"])
+
+TODAY_CACHE = None  # today's picks, kept for the life of the container
+
+# Until the scheduled build has stored today's picks, yesterday's are served
+# with this short max-age, so clients and CloudFront pick up the new day soon
+STALE_MAX_AGE = 60
+
+
+def get_today():
+    # Today's picks, else yesterday's, else None. Never built here: a miss
+    # just after midnight would have every request scan the catalog at once.
+    global TODAY_CACHE
+    date = quote_of_the_day.today()
+    if TODAY_CACHE and TODAY_CACHE["date"] == date:
+        return TODAY_CACHE
+
+    item = quote_of_the_day.load(table, date)
+    if item is not None:
+        TODAY_CACHE = item
+        return item
+    return quote_of_the_day.load(table, quote_of_the_day.previous_day(date))
+
+
+@profiled
+def lambda_handler(event, context):
+    query_params = event.get("queryStringParameters") or {}
+    genre = query_params.get("genre")
+
+    today = get_today()
+    if today is None:
+        return respond(
+            503,
+            {"error": "Quote of the day is not ready yet"},
+            {"Retry-After": str(STALE_MAX_AGE)},
+        )
+    if genre:
+        quote = today["quotes"].get(genre)
+        if quote is None:
+            return respond(404, {"error": f"No quote of the day for {genre}"})
+        body = {"date": today["date"], "genre": genre, "quote": quote}
+    else:
+        body = {"date": today["date"], "quotes": today["quotes"]}
+
+    # Valid until the next UTC midnight, for browsers and CloudFront alike
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    max_age = quote_of_the_day.seconds_until_midnight(now)
+    if today["date"] != quote_of_the_day.today():
+        max_age = min(max_age, STALE_MAX_AGE)
+    expires = now + timedelta(seconds=max_age)
+    return respond(
+        200,
+        body,
+        {
+            "Cache-Control": f"public, max-age={max_age}",
+            "Expires": format_datetime(expires, usegmt=True),
+        },
+    )
+
+
+def respond(status_code, body, extra_headers=None):
+    headers = {
+        "Content-Type": "application/json",
+        "Access-Control-Allow-Origin": "*",  # use "*" only for dev
+        "Access-Control-Allow-Headers": "Content-Type,Authorization",
+        "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
+    }
+    headers.update(extra_headers or {})
+    return {
+        "statusCode": status_code,
+        "headers": headers,
+        "body": json.dumps(body),
+    }
@@ -2,78 +2,305 @@ import os
 import random
 import json
 import boto3
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from boto3.dynamodb.conditions import Key
+import checkpoints
+from checkpoints import random_genre_window
+from fields import parse_fields, projection, strip_fields, with_fields
+from genre_shards import query_genre, query_random_shard
+from item_format import decode_items
+from listings import scan_genres
+from seen_filter import SeenFilter
+from page_cache import build_cache
+from popularity import CounterBuffer
+from snapshots import SNAPSHOT_BUCKET
+from thread_tables import thread_table
+from write_path import batch_get
+import warm_start
+from profiling import profiled
 
 # Initialize DynamoDB client
 dynamodb = boto3.resource("dynamodb")
 table_name = os.environ.get("QUOTES_TABLE")
 table = dynamodb.Table(table_name)
+page_cache = build_cache("quotes")
+counters = CounterBuffer()
+# Bundled (or published) catalog summary for the first requests; checked
+# against the catalog version while the first request is being served
+warm = warm_start.load(boto3.client("s3") if SNAPSHOT_BUCKET else None)
+if warm:
+    warm.reconcile_in_background(table)
 
 GENRE_CACHE = None  # simple in-memory cache for Lambda container
 
+# Genres a stream request samples before declaring the cycle done
+STREAM_POOL_ATTEMPTS = 3
+# Largest count= for random quotes (BatchGetItem takes up to 100 keys)
+MAX_RANDOM_COUNT = int(os.environ.get("MAX_RANDOM_COUNT", "25"))
+# Quotes a random pick is drawn from, per genre
+RANDOM_POOL = 20
+
+# Per-genre pools for count= are read concurrently, each thread through its
+# own Table (see sample_ids); kept across invocations
+executor = ThreadPoolExecutor(max_workers=8)
+
 
 def get_all_genres(table):
     global GENRE_CACHE
     if GENRE_CACHE:
         return GENRE_CACHE
+    if warm and warm.usable():
+        return warm.genres
 
-    # Scan only the genre attribute
-    response = table.scan(ProjectionExpression="genre")
-    genres = list(
-        {item["genre"] for item in response.get("Items", []) if "genre" in item}
-    )
+    genres = scan_genres(table)
 
     GENRE_CACHE = genres
     return genres
 
 
+def stream_quote(genre, token, fields):
+    # One unseen quote plus the updated token. Each pool is one query from a
+    # uniformly chosen quote; already-served quotes are filtered out in
+    # memory, so collisions never cost extra reads.
+    # fields must include quoteId
+    seen = SeenFilter.decode(token) if token else SeenFilter.for_capacity()
+    if seen.full():
+        seen = SeenFilter.for_capacity()
+    projection_expression, projection_names = projection(fields)
+    read_kwargs = {
+        "ProjectionExpression": projection_expression,
+        "ExpressionAttributeNames": projection_names,
+    }
+
+    genres = [genre] if genre else get_all_genres(table)
+    if not genres:
+        return None, seen
+
+    unseen = pool = []
+    for pool_genre in random.sample(genres, min(len(genres), STREAM_POOL_ATTEMPTS)):
+        pool = random_genre_window(
+            table, pool_genre, checkpoints.CHECKPOINT_EVERY, **read_kwargs
+        )
+        unseen = [quote for quote in pool if quote["quoteId"] not in seen]
+        if unseen:
+            break
+
+    if not unseen and seen.count < catalog_size(genres):
+        # The sampled pools were all served but the catalog hasn't been
+        unseen = find_unseen(genres, seen, **read_kwargs)
+    if not unseen:
+        # Everything was already served: start the next cycle
+        seen = SeenFilter.for_capacity()
+        unseen = pool
+    if not unseen:
+        return None, seen
+
+    quote = random.choice(unseen)
+    seen.add(quote["quoteId"])
+    return quote, seen
+
+
+def catalog_size(genres):
+    return sum(checkpoints.item_count(table, f"GENRE#{g}") for g in genres)
+
+
+def find_unseen(genres, seen, **kwargs):
+    # Unseen quotes from the first page that has any, walking each genre from
+    # its oldest end. Only served quotes are skipped, so this reads about
+    # seen.count items; much more than that means false positives are
+    # hiding the rest, and the caller starts a new cycle instead.
+    skipped = 0
+    for genre in random.sample(genres, len(genres)):
+        start = None
+        while True:
+            items, start = query_genre(
+                table, genre, checkpoints.CHECKPOINT_EVERY, start=start, **kwargs
+            )
+            unseen = [quote for quote in items if quote["quoteId"] not in seen]
+            if unseen:
+                return unseen
+            skipped += len(items)
+            if skipped > seen.count + checkpoints.CHECKPOINT_EVERY:
+                return []
+            if not start:
+                break
+    return []
+
+
+def serve(quotes, fields, quotes_table=None, viewed=False):
+    # Count a single served quote as a view (lists are impressions, not
+    # views), write the buffered counters if they are due, then trim to what
+    # the client asked for
+    if viewed:
+        counters.record_views(quotes)
+        counters.flush(quotes_table or table)
+    page_cache.flush_metrics("quotes")
+    return strip_fields(quotes, fields)
+
+
+@profiled
 def lambda_handler(event, context, test_genre=None):
     query_params = event.get("queryStringParameters") or {}
     author = query_params.get("author")
     genre = query_params.get("genre")
+    try:
+        fields = parse_fields(query_params.get("fields"))
+    except ValueError as e:
+        return respond({"error": str(e)}, status_code=400)
+    # quoteId and genre are always fetched for view counting
+    query_fields = with_fields(fields, "quoteId", "genre")
+    projection_expression, projection_names = projection(query_fields)
+    field_key = ",".join(query_fields)
+
+    # Non-repeating random stream
+    if query_params.get("mode") == "stream":
+        try:
+            quote, seen = stream_quote(genre, query_params.get("token"), query_fields)
+        except ValueError as e:
+            return respond({"error": str(e)}, status_code=400)
+        quotes = serve([quote] if quote else [], fields, viewed=True)
+        return respond({"items": quotes, "token": seen.encode()})
 
     # Search by author
     if author:
-        response = table.query(
-            IndexName="GSI2-Author",
-            KeyConditionExpression=Key("GSI2PK").eq(f"AUTHOR#{author}"),
-            Limit=20,
+        quotes = page_cache.read_through(
+            table,
+            ("list", "GSI2-Author", author, None, 20, field_key),
+            lambda: decode_items(
+                table.query(
+                    IndexName="GSI2-Author",
+                    KeyConditionExpression=Key("GSI2PK").eq(f"AUTHOR#{author}"),
+                    Limit=20,
+                    ProjectionExpression=projection_expression,
+                    ExpressionAttributeNames=projection_names,
+                ).get("Items", [])
+            ),
         )
-        quotes = response.get("Items", [])
-        return respond(quotes)
+        return respond(serve(quotes, fields))
+
+    # Several random quotes, optionally from one genre
+    if "count" in query_params:
+        try:
+            count = int(query_params["count"])
+        except ValueError:
+            count = 0
+        if not 1 <= count <= MAX_RANDOM_COUNT:
+            return respond(
+                {"error": f"count must be between 1 and {MAX_RANDOM_COUNT}"},
+                status_code=400,
+            )
+        return respond(random_quotes(count, fields, genre or test_genre))
 
     # Search by genre
     if genre:
-        response = table.query(
-            IndexName="GSI1-Genre",
-            KeyConditionExpression=Key("GSI1PK").eq(f"GENRE#{genre}"),
-            Limit=20,
+        quotes = page_cache.read_through(
+            table,
+            ("list", "GSI1-Genre", genre, None, 20, field_key),
+            lambda: decode_items(
+                query_genre(
+                    table,
+                    genre,
+                    20,
+                    ProjectionExpression=projection_expression,
+                    ExpressionAttributeNames=projection_names,
+                )[0]
+            ),
         )
-        quotes = response.get("Items", [])
-        return respond(quotes)
+        return respond(serve(quotes, fields))
+
+    quote = random_quote(fields, test_genre)
+    return respond([quote] if quote else [])
+
+
+def random_quote(fields, genre=None, quotes_table=None):
+    # One served random quote, or None if there are none. Straight from the
+    # warm-start sample while this container is still cold. Callers on
+    # another thread pass their own quotes_table.
+    quotes_table = quotes_table or table
+    quote = warm.random_quote(genre) if warm else None
+    if quote:
+        return serve([quote], fields, quotes_table, viewed=True)[0]
+    genres = get_all_genres(quotes_table)
+    if not genres:
+        return None
+    selected_genre = genre if genre else random.choice(genres)
+
+    projection_expression, projection_names = projection(
+        with_fields(fields, "quoteId", "genre")
+    )
+    quotes = query_random_shard(
+        quotes_table,
+        selected_genre,
+        20,
+        ProjectionExpression=projection_expression,
+        ExpressionAttributeNames=projection_names,
+    )
+    if not quotes:
+        return None
+    return serve([random.choice(quotes)], fields, quotes_table, viewed=True)[0]
+
+
+def sample_ids(genre, count):
+    # Up to ``count`` distinct random ids from one genre (plus the rest of
+    # the pool as spares), from a keys-only read starting at a uniformly
+    # chosen quote. Runs on the executor, so it reads through this thread's
+    # own Table.
+    worker_table = thread_table(table)
+    size = max(RANDOM_POOL, count)
+    pool = random_genre_window(
+        worker_table, genre, size, ProjectionExpression="quoteId"
+    )
+    if len(pool) < count:
+        # Near the newest end; the oldest end tops the pool up
+        pool += query_genre(
+            worker_table, genre, size, ProjectionExpression="quoteId"
+        )[0]
+    ids = list(dict.fromkeys(item["quoteId"] for item in pool))
+    random.shuffle(ids)
+    return ids[:count], ids[count:]
+
 
-    # Random quote
-    genres = get_all_genres(table)
+def random_quotes(count, fields, genre=None):
+    """``count`` distinct random quotes (fewer if the catalog is smaller),
+    spread over the genres and fetched with one BatchGetItem."""
+    quotes = warm.random_quotes(count, genre) if warm else None
+    if quotes and len(quotes) == count:
+        return serve(quotes, fields)
+    genres = [genre] if genre else get_all_genres(table)
     if not genres:
-        return respond([])
-    selected_genre = test_genre if test_genre else random.choice(genres)
+        return []
 
-    response = table.query(
-        IndexName="GSI1-Genre",
-        KeyConditionExpression=Key("GSI1PK").eq(f"GENRE#{selected_genre}"),
-        Limit=20,
+    # Picks dealt out over the genres in random order
+    order = random.sample(genres, len(genres))
+    wanted = Counter(order[i % len(order)] for i in range(count))
+    samples = executor.map(lambda g: sample_ids(g, wanted[g]), list(wanted))
+    ids, spares = [], []
+    for picked, rest in samples:
+        ids += picked
+        spares += rest
+    # A genre smaller than its share leaves picks for the others
+    random.shuffle(spares)
+    ids += spares[: count - len(ids)]
+    if not ids:
+        return []
+
+    projection_expression, projection_names = projection(
+        with_fields(fields, "quoteId", "genre")
+    )
+    quotes = batch_get(
+        table,
+        [{"PK": f"QUOTE#{quote_id}", "SK": "METADATA"} for quote_id in ids],
+        ProjectionExpression=projection_expression,
+        ExpressionAttributeNames=projection_names,
     )
-    quotes = response.get("Items", [])
-    if quotes:
-        quote = random.choice(quotes)
-        return respond([quote])
-    else:
-        return respond([])
+    random.shuffle(quotes)
+    return serve(quotes, fields)
 
 
-def respond(items):
+def respond(items, status_code=200):
     return {
-        "statusCode": 200,
+        "statusCode": status_code,
         "headers": {
             "Content-Type": "application/json",
             "Access-Control-Allow-Origin": "*",  # use "*" only for dev
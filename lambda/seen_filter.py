@@ -0,0 +1,84 @@
+import base64
+import hashlib
+import math
+import os
+import struct
+import zlib
+
+# Quotes a stream session remembers before it starts a new cycle
+STREAM_CAPACITY = int(os.environ.get("STREAM_CAPACITY", "500"))
+STREAM_FALSE_POSITIVE_RATE = 0.01
+
+TOKEN_VERSION = 1
+# Largest bit array a token may claim, so a forged header can't make decode
+# allocate (or inflate) more than a real session ever needs
+MAX_TOKEN_BITS = 8 * 1024 * 1024
+_HEADER = struct.Struct(">BBHI")  # version, hashes, count, bits
+
+
+class SeenFilter:
+    # Bloom filter of served quote ids, carried by the client as an opaque
+    # token. A false positive only means an unseen quote is skipped for the
+    # rest of the cycle.
+
+    def __init__(self, bits, hashes, count=0, data=None):
+        self.bits = bits
+        self.hashes = hashes
+        self.count = count
+        if data is None:
+            data = bytes((bits + 7) // 8)
+        self.data = bytearray(data)
+
+    @classmethod
+    def for_capacity(cls, capacity=None, rate=STREAM_FALSE_POSITIVE_RATE):
+        capacity = STREAM_CAPACITY if capacity is None else capacity
+        bits = math.ceil(-capacity * math.log(rate) / (math.log(2) ** 2))
+        hashes = max(1, round(bits / capacity * math.log(2)))
+        return cls(bits, hashes)
+
+    def _positions(self, quote_id):
+        digest = hashlib.sha256(str(quote_id).encode("utf-8")).digest()
+        h1, h2 = struct.unpack(">QQ", digest[:16])
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def __contains__(self, quote_id):
+        return all(
+            self.data[p >> 3] & (1 << (p & 7)) for p in self._positions(quote_id)
+        )
+
+    def add(self, quote_id):
+        for p in self._positions(quote_id):
+            self.data[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def full(self):
+        return self.count >= self.bits * (math.log(2) ** 2) / -math.log(
+            STREAM_FALSE_POSITIVE_RATE
+        )
+
+    def encode(self):
+        header = _HEADER.pack(
+            TOKEN_VERSION, self.hashes, min(self.count, 0xFFFF), self.bits
+        )
+        # Early in a session the bit array is mostly zeros and compresses well
+        raw = header + zlib.compress(bytes(self.data), 9)
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token):
+        # Raises ValueError on anything that is not a token we issued
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            version, hashes, count, bits = _HEADER.unpack_from(raw)
+            if not 0 < bits <= MAX_TOKEN_BITS:
+                raise ValueError("bit array size out of range")
+            size = (bits + 7) // 8
+            # Inflate no more than the header promises, plus one byte to
+            # notice a longer stream
+            inflater = zlib.decompressobj()
+            data = inflater.decompress(raw[_HEADER.size :], size + 1)
+        except (struct.error, zlib.error, ValueError) as e:
+            raise ValueError("Invalid stream token") from e
+        if version != TOKEN_VERSION or not hashes or len(data) != size:
+            raise ValueError("Invalid stream token")
+        return cls(bits, hashes, count, data)
@@ -0,0 +1,43 @@
+import os
+import json
+import boto3
+
+from popularity import CounterBuffer
+from profiling import profiled
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(os.environ["QUOTES_TABLE"])
+counters = CounterBuffer()
+
+
+@profiled
+def lambda_handler(event, context):
+    quote_id = (event.get("pathParameters") or {}).get("quoteId")
+    if not quote_id:
+        return respond(400, {"error": "quoteId is required"})
+
+    item = table.get_item(
+        Key={"PK": f"QUOTE#{quote_id}", "SK": "METADATA"},
+        ProjectionExpression="genre",
+    ).get("Item")
+    if item is None:
+        return respond(404, {"error": "Quote not found"})
+
+    # Written before the 202 (with any buffered views) rather than left in a
+    # container that may be reaped before the next flush
+    counters.record_share(quote_id, item["genre"])
+    counters.flush(table, force=True)
+    return respond(202, {"message": "Share recorded"})
+
+
+def respond(status_code, body):
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*",  # use "*" only for dev
+            "Access-Control-Allow-Headers": "Content-Type,Authorization",
+            "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
+        },
+        "body": json.dumps(body),
+    }
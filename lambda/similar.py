@@ -0,0 +1,58 @@
+import os
+from decimal import Decimal
+from botocore.exceptions import ClientError
+
+# "More like this" neighbour lists, precomputed offline by build_similar.py
+# and stored on the quote items themselves:
+#
+#   similar      = ["9f8e7d6c", "0a1b2c3d", ...]   nearest first
+#   similarFloor = 0.2841                         score of the last entry
+#
+# so serving them is one keyed read. The floor is what the incremental
+# refresh compares new quotes against: a new quote only displaces an entry
+# of a list it beats. Lists can name quotes deleted since the last run;
+# readers drop ids that no longer resolve.
+SIMILAR_ATTR = "similar"
+SIMILAR_FLOOR_ATTR = "similarFloor"
+SIMILAR_ATTRS = (SIMILAR_ATTR, SIMILAR_FLOOR_ATTR)
+# Neighbours kept per quote
+SIMILAR_K = int(os.environ.get("SIMILAR_K", "10"))
+
+# The job's progress through the change feed
+SIMILAR_STATE_KEY = {"PK": "META#SIMILAR", "SK": "STATE"}
+
+
+def neighbours(table, quote_id):
+    # The stored list, [] if not computed yet, None if the quote is missing
+    item = table.get_item(
+        Key={"PK": f"QUOTE#{quote_id}", "SK": "METADATA"},
+        ProjectionExpression="quoteId, #s",
+        ExpressionAttributeNames={"#s": SIMILAR_ATTR},
+    ).get("Item")
+    if item is None:
+        return None
+    return list(item.get(SIMILAR_ATTR, []))
+
+
+def store_neighbours(table, quote_id, ids, floor):
+    """Write one quote's list; False if the quote has gone meanwhile.
+
+    Only the similarity attributes are touched, so this never races with
+    admin edits (their conditions cover the editable attributes).
+    """
+    try:
+        table.update_item(
+            Key={"PK": f"QUOTE#{quote_id}", "SK": "METADATA"},
+            UpdateExpression="SET #s = :ids, #f = :floor",
+            ConditionExpression="attribute_exists(PK)",
+            ExpressionAttributeNames={"#s": SIMILAR_ATTR, "#f": SIMILAR_FLOOR_ATTR},
+            ExpressionAttributeValues={
+                ":ids": list(ids),
+                ":floor": Decimal(str(round(floor, 4))),
+            },
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return False
+    return True
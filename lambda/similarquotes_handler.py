@@ -0,0 +1,80 @@
+import os
+import json
+import boto3
+
+from fields import parse_fields, projection, strip_fields, with_fields
+from similar import SIMILAR_K, neighbours
+from write_path import batch_get
+from profiling import profiled
+
+# GET /quote/{quoteId}/similar?limit=5&fields=text,author
+#
+# The neighbour list is read from the quote's own item (build_similar.py
+# keeps it up to date); the neighbours themselves come from one
+# BatchGetItem, skipped when only quoteId is asked for.
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(os.environ["QUOTES_TABLE"])
+
+# Lists only change when the offline job runs
+SIMILAR_MAX_AGE = int(os.environ.get("SIMILAR_MAX_AGE", "300"))
+
+
+@profiled
+def lambda_handler(event, context):
+    quote_id = (event.get("pathParameters") or {}).get("quoteId")
+    if not quote_id:
+        return respond(400, {"error": "quoteId is required"})
+    query_params = event.get("queryStringParameters") or {}
+    try:
+        fields = parse_fields(query_params.get("fields"))
+        limit = min(int(query_params.get("limit", str(SIMILAR_K))), SIMILAR_K)
+    except ValueError as e:
+        return respond(400, {"error": str(e)})
+    if limit < 1:
+        return respond(400, {"error": "limit must be positive"})
+
+    ids = neighbours(table, quote_id)
+    if ids is None:
+        return respond(404, {"error": "Quote not found"})
+    ids = ids[:limit]
+
+    if fields == ("quoteId",):
+        items = [{"quoteId": similar_id} for similar_id in ids]
+    elif ids:
+        projection_expression, projection_names = projection(
+            with_fields(fields, "quoteId")
+        )
+        found = batch_get(
+            table,
+            [{"PK": f"QUOTE#{similar_id}", "SK": "METADATA"} for similar_id in ids],
+            ProjectionExpression=projection_expression,
+            ExpressionAttributeNames=projection_names,
+        )
+        by_id = {item["quoteId"]: item for item in found}
+        # List order is nearest first; deleted neighbours are skipped
+        items = strip_fields(
+            [by_id[similar_id] for similar_id in ids if similar_id in by_id], fields
+        )
+    else:
+        items = []
+
+    return respond(
+        200,
+        {"quoteId": quote_id, "items": items},
+        {"Cache-Control": f"public, max-age={SIMILAR_MAX_AGE}"},
+    )
+
+
+def respond(status_code, body, extra_headers=None):
+    headers = {
+        "Content-Type": "application/json",
+        "Access-Control-Allow-Origin": "*",  # use "*" only for dev
+        "Access-Control-Allow-Headers": "Content-Type,Authorization",
+        "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
+    }
+    headers.update(extra_headers or {})
+    return {
+        "statusCode": status_code,
+        "headers": headers,
+        "body": json.dumps(body),
+    }
@@ -0,0 +1,179 @@
+import gzip
+import json
+import os
+from botocore.exceptions import ClientError
+
+from catalog_version import VERSION_KEY, current_version, published_version
+from cursors import encode_cursor, genre_scope
+from fields import PUBLIC_FIELDS, projection
+from genre_shards import query_genre
+from item_format import decode_items, json_default
+from listings import scan_listings
+from warm_start import build as build_warm_start
+
+# Static catalog snapshots: genres, authors and each genre's first browse page
+# as gzipped JSON objects under <prefix>/v<version>/, written to the bucket
+# CloudFront already serves. Objects of a version never change, so they are
+# cached for a year; latest.json names the current version.
+#
+#   catalog/v42/genres.json
+#   catalog/v42/authors.json
+#   catalog/v42/genres/<genre>.json
+#   catalog/v42/warm-start.json        (see warm_start.py)
+#   catalog/latest.json
+#
+# Unset SNAPSHOT_BUCKET turns snapshots off and the list handlers scan.
+SNAPSHOT_BUCKET = os.environ.get("SNAPSHOT_BUCKET")
+SNAPSHOT_PREFIX = os.environ.get("SNAPSHOT_PREFIX", "catalog")
+# Public URL of the bucket behind CloudFront. When set the list handlers
+# redirect there; otherwise they return the snapshot body themselves.
+SNAPSHOT_BASE_URL = os.environ.get("SNAPSHOT_BASE_URL")
+# Same as browse's default limit, so a snapshot page equals /quote/browse?genre=
+SNAPSHOT_PAGE_SIZE = int(os.environ.get("SNAPSHOT_PAGE_SIZE", "10"))
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+MANIFEST_MAX_AGE = 60
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Snapshot bodies already read by this container, keyed by (version, name)
+_bodies = {}
+
+
+def snapshot_key(version, name):
+    return f"{SNAPSHOT_PREFIX}/v{version}/{name}.json"
+
+
+def manifest_key():
+    return f"{SNAPSHOT_PREFIX}/latest.json"
+
+
+def collect(table):
+    # One scan for the genre and author lists, then a newest-first page per
+    # genre through the same scatter-gather browse uses
+    genres, authors = scan_listings(table)
+    snapshots = {"genres": genres, "authors": authors}
+    expression, names = projection(PUBLIC_FIELDS)
+    for genre in genres:
+        items, last_key = query_genre(
+            table,
+            genre,
+            SNAPSHOT_PAGE_SIZE,
+            scan_forward=False,
+            ProjectionExpression=expression,
+            ExpressionAttributeNames=names,
+        )
+        snapshots[f"genres/{genre}"] = {
+            "items": decode_items(items),
+            "nextCursor": encode_cursor(last_key, genre_scope(genre)),
+        }
+    return snapshots
+
+
+def publish(s3, table, bucket, version=None):
+    """Write every snapshot for ``version`` (default: the current one).
+
+    The manifest and the publishedVersion marker are written last, so
+    readers never see a version whose objects aren't all in place.
+    """
+    if version is None:
+        item = table.get_item(Key=VERSION_KEY, ConsistentRead=True).get("Item")
+        version = int((item or {}).get("version", 0))
+
+    snapshots = collect(table)
+    snapshots["warm-start"] = build_warm_start(
+        table, snapshots["genres"], snapshots["authors"], version
+    )
+    for name, body in snapshots.items():
+        s3.put_object(
+            Bucket=bucket,
+            Key=snapshot_key(version, name),
+            Body=gzip.compress(json.dumps(body, default=json_default).encode()),
+            ContentType="application/json",
+            ContentEncoding="gzip",
+            CacheControl=IMMUTABLE,
+        )
+    s3.put_object(
+        Bucket=bucket,
+        Key=manifest_key(),
+        Body=json.dumps({"version": version, "files": sorted(snapshots)}).encode(),
+        ContentType="application/json",
+        CacheControl=f"public, max-age={MANIFEST_MAX_AGE}",
+    )
+
+    try:
+        # Never move the marker backwards if a newer publish finished first
+        table.update_item(
+            Key=VERSION_KEY,
+            UpdateExpression="SET publishedVersion = :v",
+            ConditionExpression=(
+                "attribute_not_exists(publishedVersion) OR publishedVersion < :v"
+            ),
+            ExpressionAttributeValues={":v": version},
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+    return version
+
+
+def load_snapshot(s3, bucket, version, name):
+    # The JSON text of one snapshot, or None if it isn't there
+    cached = _bodies.get((version, name))
+    if cached is not None:
+        return cached
+    try:
+        resp = s3.get_object(Bucket=bucket, Key=snapshot_key(version, name))
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            return None
+        raise
+    body = resp["Body"].read()
+    # By magic number rather than ContentEncoding, which not every S3
+    # implementation echoes back
+    if body[:2] == GZIP_MAGIC:
+        body = gzip.decompress(body)
+    _bodies[(version, name)] = body = body.decode()
+    return body
+
+
+def _servable_version(table):
+    # The current catalog version if its snapshots are published, else None
+    if not SNAPSHOT_BUCKET:
+        return None
+    version = current_version(table)
+    return version if published_version(table) == version else None
+
+
+def current_snapshot(s3, table, name):
+    # The parsed snapshot ``name`` of the current catalog version, or None
+    version = _servable_version(table)
+    if version is None:
+        return None
+    body = load_snapshot(s3, SNAPSHOT_BUCKET, version, name)
+    return None if body is None else json.loads(body)
+
+
+def snapshot_response(s3, table, name, headers):
+    """Serve ``name`` from the snapshot of the current catalog version.
+
+    Returns None (the caller falls back to building the answer itself) when
+    snapshots are off or haven't caught up with the latest change yet.
+    """
+    version = _servable_version(table)
+    if version is None:
+        return None
+
+    if SNAPSHOT_BASE_URL:
+        return {
+            "statusCode": 302,
+            "headers": {
+                **headers,
+                "Location": f"{SNAPSHOT_BASE_URL.rstrip('/')}/"
+                f"{snapshot_key(version, name)}",
+            },
+            "body": "",
+        }
+    body = load_snapshot(s3, SNAPSHOT_BUCKET, version, name)
+    if body is None:
+        return None
+    return {"statusCode": 200, "headers": headers, "body": body}
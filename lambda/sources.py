@@ -0,0 +1,51 @@
+from boto3.dynamodb.conditions import Key
+
+SOURCE_INDEX = "GSI4-Source"
+
+# Registry of every source work, one small item each under a single
+# partition, so listing sources is a query rather than a table scan
+SOURCES_PK = "SOURCES"
+
+
+def source_partition_key(source):
+    return f"SOURCE#{source}"
+
+
+def _register_request(source, delta):
+    return {
+        "Key": {"PK": SOURCES_PK, "SK": source_partition_key(source)},
+        "UpdateExpression": "SET #s = :source ADD quoteCount :delta",
+        "ExpressionAttributeNames": {"#s": "source"},
+        "ExpressionAttributeValues": {":source": source, ":delta": delta},
+    }
+
+
+def register_source(table, source, delta=1):
+    table.update_item(**_register_request(source, delta))
+
+
+def register_source_action(table_name, source, delta=1):
+    # register_source as a TransactWriteItems action
+    return {"Update": {"TableName": table_name, **_register_request(source, delta)}}
+
+
+def list_sources(table):
+    sources = []
+    start_key = None
+    while True:
+        kwargs = {
+            "KeyConditionExpression": Key("PK").eq(SOURCES_PK),
+            "ProjectionExpression": "#s, quoteCount",
+            "ExpressionAttributeNames": {"#s": "source"},
+        }
+        if start_key:
+            kwargs["ExclusiveStartKey"] = start_key
+        resp = table.query(**kwargs)
+        sources.extend(
+            item["source"]
+            for item in resp.get("Items", [])
+            if item.get("quoteCount", 1) > 0
+        )
+        start_key = resp.get("LastEvaluatedKey")
+        if not start_key:
+            return sources
@@ -0,0 +1,320 @@
+import base64
+import json
+import sqlite3
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from boto3.dynamodb.conditions import Attr, Key
+from boto3.dynamodb.types import Binary
+from botocore.exceptions import ClientError
+
+from fields import projection
+from item_format import json_default, stored_names
+from write_path import batch_get
+
+# Storage covers the plain access patterns: keyed put/get, one-partition
+# index queries, filtered scans and batch reads/writes. It is not a backend
+# switch: there is no engine selector, the handlers always run on DynamoDB
+# and the handler tests still run on moto. browsequotes_handler serves its
+# author, source and full-table pages through DynamoStorage; sharded genre
+# pages, tag intersections, transactions, checkpoints, facets and the
+# catalog version read the table directly. SqliteStorage exists to benchmark
+# these patterns at catalog sizes moto can't hold
+# (benchmarks/bench_storage.py).
+
+# Index name -> (partition key attribute, sort key attribute), mirroring the
+# table's GSIs so both engines serve the same access patterns
+INDEXES = {
+    "GSI1-Genre": ("GSI1PK", "GSI1SK"),
+    "GSI2-Author": ("GSI2PK", "GSI2SK"),
+    "GSI3-Top": ("GSI3PK", "score"),
+    "GSI4-Source": ("GSI4PK", "GSI4SK"),
+}
+
+
+class ConditionFailed(Exception):
+    # A conditional put found an existing item with the same key
+    pass
+
+
+class Storage(ABC):
+    """The plain access patterns the handlers use, independent of the engine.
+
+    Items are plain dicts with DynamoDB-style values (numbers come back as
+    Decimal). Cursors returned by query/scan are JSON-serializable dicts
+    that the same engine accepts as ``start``.
+    """
+
+    @abstractmethod
+    def put(self, item, if_not_exists=False):
+        pass
+
+    @abstractmethod
+    def get(self, pk, sk, fields=None):
+        pass
+
+    @abstractmethod
+    def query(self, index, partition, limit, forward=True, start=None, fields=None):
+        # (items, next_start) from one index partition in sort key order
+        pass
+
+    @abstractmethod
+    def scan(self, limit, start=None, pk_prefix=None, sk=None, fields=None):
+        # (items, next_start). Like DynamoDB, a page may hold fewer than
+        # ``limit`` matches while next_start is still set.
+        pass
+
+    @abstractmethod
+    def batch_get(self, keys, fields=None):
+        # keys are (pk, sk) pairs; missing items are left out, order is not kept
+        pass
+
+    @abstractmethod
+    def batch_write(self, puts=(), deletes=()):
+        pass
+
+
+def _projected(fields):
+    if not fields:
+        return {}
+    expression, attribute_names = projection(fields)
+    return {
+        "ProjectionExpression": expression,
+        "ExpressionAttributeNames": attribute_names,
+    }
+
+
+def _strip(items, fields):
+    # Same as a DynamoDB projection of ``fields``: items are still in their
+    # stored form here, so "text" keeps its compressed attributes too
+    if fields:
+        keep = set(stored_names(fields))
+        for item in items:
+            for name in [n for n in item if n not in keep]:
+                del item[name]
+    return items
+
+
+class DynamoStorage(Storage):
+    def __init__(self, table):
+        self.table = table
+
+    def put(self, item, if_not_exists=False):
+        kwargs = {"Item": item}
+        if if_not_exists:
+            kwargs["ConditionExpression"] = "attribute_not_exists(PK)"
+        try:
+            self.table.put_item(**kwargs)
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                raise ConditionFailed(item["PK"]) from e
+            raise
+
+    def get(self, pk, sk, fields=None):
+        return self.table.get_item(
+            Key={"PK": pk, "SK": sk}, **_projected(fields)
+        ).get("Item")
+
+    def query(self, index, partition, limit, forward=True, start=None, fields=None):
+        pk_attr, _ = INDEXES[index]
+        kwargs = {
+            "IndexName": index,
+            "KeyConditionExpression": Key(pk_attr).eq(partition),
+            "Limit": limit,
+            "ScanIndexForward": forward,
+            **_projected(fields),
+        }
+        if start:
+            kwargs["ExclusiveStartKey"] = start
+        resp = self.table.query(**kwargs)
+        return resp.get("Items", []), resp.get("LastEvaluatedKey")
+
+    def scan(self, limit, start=None, pk_prefix=None, sk=None, fields=None):
+        kwargs = {"Limit": limit, **_projected(fields)}
+        conditions = []
+        if pk_prefix:
+            conditions.append(Attr("PK").begins_with(pk_prefix))
+        if sk:
+            conditions.append(Attr("SK").eq(sk))
+        if conditions:
+            condition = conditions[0]
+            for extra in conditions[1:]:
+                condition = condition & extra
+            kwargs["FilterExpression"] = condition
+        if start:
+            kwargs["ExclusiveStartKey"] = start
+        resp = self.table.scan(**kwargs)
+        return resp.get("Items", []), resp.get("LastEvaluatedKey")
+
+    def batch_get(self, keys, fields=None):
+        keys = [{"PK": pk, "SK": sk} for pk, sk in dict.fromkeys(keys)]
+        return batch_get(self.table, keys, **_projected(fields))
+
+    def batch_write(self, puts=(), deletes=()):
+        with self.table.batch_writer() as batch:
+            for item in puts:
+                batch.put_item(Item=item)
+            for pk, sk in deletes:
+                batch.delete_item(Key={"PK": pk, "SK": sk})
+
+
+def _encode(value):
+    if isinstance(value, (Binary, bytes, bytearray)):
+        # Binary attributes (compressed text) round-trip as tagged base64
+        raw = value.value if isinstance(value, Binary) else bytes(value)
+        return {"$b": base64.b64encode(raw).decode("ascii")}
+    return json_default(value)
+
+
+# Reused rather than rebuilt by json.dumps for every row
+_encoder = json.JSONEncoder(default=_encode, separators=(",", ":"))
+
+
+def _binary(obj):
+    if len(obj) == 1 and "$b" in obj:
+        return Binary(base64.b64decode(obj["$b"]))
+    return obj
+
+
+def _decode(body):
+    return json.loads(
+        body, parse_float=Decimal, parse_int=Decimal, object_hook=_binary
+    )
+
+
+class SqliteStorage(Storage):
+    """Embedded engine for local runs and benchmarks.
+
+    One row per item: the key and index attributes as columns (each GSI is
+    a partial SQLite index over them) and the whole item as JSON.
+    Attributes that aren't index keys can't be queried, only returned.
+    """
+
+    KEY_COLUMNS = ("PK", "SK") + tuple(
+        column for pair in INDEXES.values() for column in pair
+    )
+
+    def __init__(self, path=":memory:"):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        columns = ", ".join(
+            f"{name} {'REAL' if name == 'score' else 'TEXT'}"
+            for name in self.KEY_COLUMNS
+        )
+        self.db.execute(
+            f"CREATE TABLE IF NOT EXISTS items ({columns}, body TEXT NOT NULL, "
+            "PRIMARY KEY (PK, SK)) WITHOUT ROWID"
+        )
+        for index, (pk_attr, sk_attr) in INDEXES.items():
+            # Sparse like a GSI: rows without the partition key stay out
+            self.db.execute(
+                f'CREATE INDEX IF NOT EXISTS "{index}" ON items '
+                f"({pk_attr}, {sk_attr}, PK, SK) WHERE {pk_attr} IS NOT NULL"
+            )
+        self.db.commit()
+
+    def _row(self, item):
+        return [
+            float(item[name]) if name == "score" and name in item else item.get(name)
+            for name in self.KEY_COLUMNS
+        ] + [_encoder.encode(item)]
+
+    def _insert(self, items, verb="INSERT OR REPLACE"):
+        placeholders = ", ".join("?" for _ in range(len(self.KEY_COLUMNS) + 1))
+        self.db.executemany(
+            f"{verb} INTO items ({', '.join(self.KEY_COLUMNS)}, body) "
+            f"VALUES ({placeholders})",
+            [self._row(item) for item in items],
+        )
+
+    def put(self, item, if_not_exists=False):
+        try:
+            self._insert([item], "INSERT" if if_not_exists else "INSERT OR REPLACE")
+        except sqlite3.IntegrityError as e:
+            self.db.rollback()
+            raise ConditionFailed(item["PK"]) from e
+        self.db.commit()
+
+    def get(self, pk, sk, fields=None):
+        row = self.db.execute(
+            "SELECT body FROM items WHERE PK = ? AND SK = ?", (pk, sk)
+        ).fetchone()
+        if row is None:
+            return None
+        return _strip([_decode(row[0])], fields)[0]
+
+    def query(self, index, partition, limit, forward=True, start=None, fields=None):
+        pk_attr, sk_attr = INDEXES[index]
+        order = "ASC" if forward else "DESC"
+        sql = f"SELECT body FROM items WHERE {pk_attr} = ?"
+        params = [partition]
+        if start:
+            # Resume just past (sort key, PK, SK) like ExclusiveStartKey
+            sql += f" AND ({sk_attr}, PK, SK) {'>' if forward else '<'} (?, ?, ?)"
+            start_sort = start[sk_attr]
+            if sk_attr == "score":
+                start_sort = float(start_sort)
+            params += [start_sort, start["PK"], start["SK"]]
+        sql += f" ORDER BY {sk_attr} {order}, PK {order}, SK {order} LIMIT ?"
+        params.append(limit + 1)
+        items = [_decode(row[0]) for row in self.db.execute(sql, params)]
+
+        next_start = None
+        if len(items) > limit:
+            items = items[:limit]
+            last = items[-1]
+            next_start = {
+                "PK": last["PK"],
+                "SK": last["SK"],
+                pk_attr: last[pk_attr],
+                sk_attr: last[sk_attr],
+            }
+        return _strip(items, fields), next_start
+
+    def scan(self, limit, start=None, pk_prefix=None, sk=None, fields=None):
+        sql, params = "SELECT body FROM items WHERE 1 = 1", []
+        # Range form of begins_with, so the primary key index is used. A
+        # cursor replaces the lower bound; keeping both makes SQLite pick
+        # the prefix bound and re-read every earlier row on each page.
+        if start:
+            sql += " AND (PK, SK) > (?, ?)"
+            params += [start["PK"], start["SK"]]
+        elif pk_prefix:
+            sql += " AND PK >= ?"
+            params.append(pk_prefix)
+        if pk_prefix:
+            sql += " AND PK < ?"
+            params.append(pk_prefix + "\uffff")
+        if sk:
+            sql += " AND SK = ?"
+            params.append(sk)
+        sql += " ORDER BY PK, SK LIMIT ?"
+        params.append(limit + 1)
+        items = [_decode(row[0]) for row in self.db.execute(sql, params)]
+
+        next_start = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_start = {"PK": items[-1]["PK"], "SK": items[-1]["SK"]}
+        return _strip(items, fields), next_start
+
+    def batch_get(self, keys, fields=None):
+        keys = list(dict.fromkeys(keys))
+        items = []
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(keys), 400):
+            chunk = keys[i : i + 400]
+            clause = " OR ".join("(PK = ? AND SK = ?)" for _ in chunk)
+            params = [value for key in chunk for value in key]
+            rows = self.db.execute(f"SELECT body FROM items WHERE {clause}", params)
+            items.extend(_decode(row[0]) for row in rows)
+        return _strip(items, fields)
+
+    def batch_write(self, puts=(), deletes=()):
+        with self.db:
+            if puts:
+                self._insert(puts)
+            if deletes:
+                self.db.executemany(
+                    "DELETE FROM items WHERE PK = ? AND SK = ?", list(deletes)
+                )
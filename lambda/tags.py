@@ -0,0 +1,132 @@
+import re
+from boto3.dynamodb.conditions import Key
+
+from write_path import batch_get
+
+# Adjacency list: one edge item per (tag, quote) under the tag's partition,
+# PK=TAG#<tag>, SK=QUOTE#<quoteId>. Each tag partition is a posting list
+# sorted by quote id, so lists can be paged and probed by key.
+MAX_TAGS = 10
+TAG_PATTERN = re.compile(r"^[a-z0-9][a-z0-9 _-]{0,39}$")
+
+# Posting list sizes, one item per tag, so intersections can start from the
+# rarest tag without counting
+TAGS_PK = "TAGS"
+
+# Candidates read from the driving list per round trip
+PROBE_BATCH = 50
+
+
+def tag_partition_key(tag):
+    return f"TAG#{tag}"
+
+
+def parse_tags(raw):
+    # Accepts a list (create body) or a comma separated string (query
+    # string). Returns sorted, de-duplicated, lower-cased tags; raises
+    # ValueError on anything else.
+    if raw is None:
+        return []
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    if not isinstance(raw, list) or not all(isinstance(t, str) for t in raw):
+        raise ValueError("tags must be a list of strings")
+    tags = sorted({" ".join(t.lower().split()) for t in raw if t.strip()})
+    if len(tags) > MAX_TAGS:
+        raise ValueError(f"At most {MAX_TAGS} tags are allowed")
+    invalid = [t for t in tags if not TAG_PATTERN.match(t)]
+    if invalid:
+        raise ValueError(f"Invalid tags: {', '.join(invalid)}")
+    return tags
+
+
+def add_tags(table, quote_id, tags, delta=1):
+    # Edge items plus their posting list counters; delta=-1 removes them
+    with table.batch_writer() as batch:
+        for tag in tags:
+            key = {"PK": tag_partition_key(tag), "SK": f"QUOTE#{quote_id}"}
+            if delta > 0:
+                batch.put_item(Item={**key, "quoteId": quote_id})
+            else:
+                batch.delete_item(Key=key)
+    for tag in tags:
+        table.update_item(
+            Key={"PK": TAGS_PK, "SK": tag_partition_key(tag)},
+            UpdateExpression="SET #t = :tag ADD quoteCount :delta",
+            ExpressionAttributeNames={"#t": "tag"},
+            ExpressionAttributeValues={":tag": tag, ":delta": delta},
+        )
+
+
+def tag_counts(table, tags):
+    keys = [{"PK": TAGS_PK, "SK": tag_partition_key(tag)} for tag in tags]
+    counts = {tag: 0 for tag in tags}
+    for item in batch_get(table, keys):
+        counts[item["tag"]] = int(item.get("quoteCount", 0))
+    return counts
+
+
+def query_tags(table, tags, limit, start=None, accept=None, **kwargs):
+    # Quote ids tagged with every one of `tags`, as (quote items,
+    # next_start). Walks the smallest posting list in key order and probes
+    # the others, rarest first, by primary key, so the cost follows the
+    # rarest tag rather than the whole table. `accept(item)` filters the
+    # fetched quote items (e.g. by genre); kwargs shape the quote read and
+    # must keep quoteId.
+    counts = tag_counts(table, tags)
+    if not all(counts.values()):
+        return [], None
+    order = sorted(tags, key=lambda tag: (counts[tag], tag))
+    driver, others = order[0], order[1:]
+    if start and start.get("PK") != tag_partition_key(driver):
+        # The cursor pins the list it was walking even if counts moved
+        driver = start["PK"].replace("TAG#", "", 1)
+        if driver not in tags:
+            raise ValueError("cursor does not match tags")
+        others = [tag for tag in order if tag != driver]
+
+    items = []
+    while len(items) < limit:
+        query = {
+            "KeyConditionExpression": Key("PK").eq(tag_partition_key(driver)),
+            "Limit": PROBE_BATCH,
+            "ProjectionExpression": "SK",
+        }
+        if start:
+            query["ExclusiveStartKey"] = start
+        resp = table.query(**query)
+        edges = [edge["SK"] for edge in resp.get("Items", [])]
+        last_key = resp.get("LastEvaluatedKey")
+
+        candidates = set(edges)
+        for tag in others:
+            if not candidates:
+                break
+            found = batch_get(
+                table,
+                [{"PK": tag_partition_key(tag), "SK": sk} for sk in candidates],
+                ProjectionExpression="SK",
+            )
+            candidates &= {edge["SK"] for edge in found}
+
+        quotes = {}
+        if candidates:
+            found = batch_get(
+                table, [{"PK": sk, "SK": "METADATA"} for sk in candidates], **kwargs
+            )
+            quotes = {f"QUOTE#{q['quoteId']}": q for q in found if "quoteId" in q}
+
+        # Keep the driving list's order so cursors stay exact
+        for sk in edges:
+            quote = quotes.get(sk)
+            if quote is None or (accept and not accept(quote)):
+                continue
+            items.append(quote)
+            if len(items) == limit:
+                if sk != edges[-1] or last_key:
+                    return items, {"PK": tag_partition_key(driver), "SK": sk}
+                return items, None
+        if not last_key:
+            return items, None
+        start = last_key
+    return items, start
@@ -0,0 +1,20 @@
+import threading
+import boto3
+
+# boto3 resources aren't thread-safe, so code running on an executor thread
+# looks its tables up here instead of sharing the module-level ones. Each
+# thread gets its own session, kept for the life of the container.
+_local = threading.local()
+
+
+def thread_table(table):
+    """This thread's copy of ``table`` (same name and region)."""
+    tables = _local.__dict__.setdefault("tables", {})
+    if table.name not in tables:
+        region = table.meta.client.meta.region_name
+        tables[table.name] = (
+            boto3.session.Session()
+            .resource("dynamodb", region_name=region)
+            .Table(table.name)
+        )
+    return tables[table.name]
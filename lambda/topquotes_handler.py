@@ -0,0 +1,55 @@
+import os
+import json
+import boto3
+from boto3.dynamodb.conditions import Key
+
+from fields import PUBLIC_FIELDS, projection
+from item_format import decode_items, load_missing_text
+from popularity import TOP_INDEX, top_partition_key
+from profiling import profiled
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(os.environ["QUOTES_TABLE"])
+
+
+@profiled
+def lambda_handler(event, context):
+    query_params = event.get("queryStringParameters") or {}
+    genre = query_params.get("genre")
+    limit = min(int(query_params.get("limit", "10")), 50)
+
+    if not genre:
+        return respond(400, {"error": "genre is required"})
+
+    # The leaderboard is a single query on the sparse score index
+    projection_expression, projection_names = projection(
+        PUBLIC_FIELDS + ("views", "shares")
+    )
+    response = table.query(
+        IndexName=TOP_INDEX,
+        KeyConditionExpression=Key("GSI3PK").eq(top_partition_key(genre)),
+        ScanIndexForward=False,
+        Limit=limit,
+        ProjectionExpression=projection_expression,
+        ExpressionAttributeNames=projection_names,
+    )
+    # The index projects text but not its compressed form
+    items = load_missing_text(table, decode_items(response.get("Items", [])))
+    items = [
+        dict(item, views=int(item.get("views", 0)), shares=int(item.get("shares", 0)))
+        for item in items
+    ]
+    return respond(200, {"genre": genre, "items": items})
+
+
+def respond(status_code, body):
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*",  # use "*" only for dev
+            "Access-Control-Allow-Headers": "Content-Type,Authorization",
+            "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
+        },
+        "body": json.dumps(body),
+    }
@@ -0,0 +1,92 @@
+import os
+import json
+import boto3
+from botocore.exceptions import ClientError
+from catalog_version import bump_version
+from item_format import decode_item
+from quote_items import (
+    EDITABLE_FIELDS,
+    apply_changes,
+    quote_key,
+    transact,
+    update_actions,
+)
+from tags import parse_tags
+from profiling import profiled
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(os.environ.get("QUOTES_TABLE"))
+
+
+@profiled
+def lambda_handler(event, context):
+    claims = event["requestContext"]["authorizer"]["claims"]
+    raw_groups = claims.get("cognito:groups", "")
+    groups = raw_groups.split(",") if isinstance(raw_groups, str) else raw_groups
+    if "admins" not in groups:
+        return respond(403, {"error": "Admins only"})
+
+    quote_id = (event.get("pathParameters") or {}).get("quoteId")
+    if not quote_id:
+        return respond(400, {"error": "quoteId is required"})
+
+    body = json.loads(event.get("body") or "{}")
+    unknown = set(body) - set(EDITABLE_FIELDS)
+    if unknown:
+        return respond(
+            400,
+            {
+                "error": f"Unknown fields: {', '.join(sorted(unknown))}. "
+                f"Editable: {', '.join(EDITABLE_FIELDS)}"
+            },
+        )
+    changes = {}
+    for name in ("text", "author", "genre", "source"):
+        if name in body:
+            if not isinstance(body[name], str) or not body[name].strip():
+                return respond(400, {"error": f"{name} must be a non-empty string"})
+            changes[name] = body[name]
+    if "tags" in body:
+        try:
+            changes["tags"] = parse_tags(body["tags"] or [])
+        except ValueError as e:
+            return respond(400, {"error": str(e)})
+
+    old = table.get_item(Key=quote_key(quote_id)).get("Item")
+    if old is None:
+        return respond(404, {"error": "Quote not found"})
+    # Keeps the stored form too, for the optimistic-concurrency condition
+    decode_item(old, keep_stored=True)
+
+    new = apply_changes(old, changes)
+    actions = update_actions(table.name, old, new)
+    if not actions:
+        return respond(200, {"message": "No changes", "quoteId": quote_id})
+
+    try:
+        transact(table, actions)
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "TransactionCanceledException":
+            raise
+        reasons = e.response.get("CancellationReasons") or []
+        # Second action is the put of a reworded quote's new text guard
+        if len(reasons) > 1 and reasons[1].get("Code") == "ConditionalCheckFailed":
+            return respond(409, {"error": "Another quote already has this text"})
+        return respond(409, {"error": "Quote was modified concurrently; retry"})
+
+    # Invalidates cached browse pages in every container
+    bump_version(table)
+    return respond(200, {"message": "Quote updated", "quoteId": new["quoteId"]})
+
+
+def respond(status_code, body):
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*",  # use "*" only for dev
+            "Access-Control-Allow-Headers": "Content-Type,Authorization",
+            "Access-Control-Allow-Methods": "GET,POST,PUT,DELETE,OPTIONS",
+        },
+        "body": json.dumps(body),
+    }
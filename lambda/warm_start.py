@@ -0,0 +1,142 @@
+import json
+import os
+import random
+import threading
+
+from catalog_version import current_version
+from checkpoints import random_genre_window
+from fields import PUBLIC_FIELDS, projection
+from item_format import decode_items
+
+# A compact catalog summary (genres, authors and a random sample of quotes per
+# genre) that a new container can answer from before its first DynamoDB read.
+# It is bundled with the lambda/ asset by build_warm_start.py, or else read
+# once at init from the published snapshots (see snapshots.py).
+WARM_START_PATH = os.environ.get(
+    "WARM_START_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "warm_start.json"),
+)
+WARM_START_SAMPLE = int(os.environ.get("WARM_START_SAMPLE", "20"))
+
+WARM_START_FORMAT = 1
+
+
+def build(table, genres, authors, version, per_genre=None):
+    # One random window per genre, like stream mode's pools
+    per_genre = WARM_START_SAMPLE if per_genre is None else per_genre
+    expression, names = projection(PUBLIC_FIELDS)
+    samples = {}
+    for genre in genres:
+        items = random_genre_window(
+            table,
+            genre,
+            per_genre,
+            ProjectionExpression=expression,
+            ExpressionAttributeNames=names,
+        )
+        samples[genre] = decode_items(items)
+    return {
+        "format": WARM_START_FORMAT,
+        "version": version,
+        "genres": list(genres),
+        "authors": list(authors),
+        "samples": samples,
+    }
+
+
+class WarmStart:
+    """Serves from the snapshot until a version check says otherwise.
+
+    ``current`` is None while the check is pending, then True or False.
+    Random quotes come from the sample only while it is pending (the cold
+    window); the genre list is used for as long as the snapshot is current.
+    """
+
+    def __init__(self, data):
+        self.version = int(data["version"])
+        self.genres = data["genres"]
+        self.authors = data["authors"]
+        self.samples = {
+            genre: quotes for genre, quotes in data["samples"].items() if quotes
+        }
+        self.current = None
+        self.thread = None
+
+    def reconcile(self, table):
+        try:
+            self.current = current_version(table) == self.version
+        except Exception as e:
+            print(f"Warm start version check failed: {e}")
+            self.current = False
+        if not self.current:
+            print(f"Warm start snapshot v{self.version} is stale; serving live")
+
+    def reconcile_in_background(self, table):
+        # Started during init, so the check overlaps the first request
+        # instead of delaying it
+        self.thread = threading.Thread(target=self.reconcile, args=(table,))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def usable(self):
+        return self.current is not False
+
+    def random_quote(self, genre=None):
+        # A copy of a sampled quote, or None once the cold window is over
+        if self.current is not None or not self.samples:
+            return None
+        if genre is None:
+            genre = random.choice(list(self.samples))
+        quotes = self.samples.get(genre)
+        return dict(random.choice(quotes)) if quotes else None
+
+    def random_quotes(self, count, genre=None):
+        # Up to ``count`` distinct sampled copies, taken from the genres in
+        # turn; None once the cold window is over
+        if self.current is not None or not self.samples:
+            return None
+        genres = [genre] if genre else list(self.samples)
+        pools = [
+            random.sample(self.samples.get(name, []), len(self.samples.get(name, [])))
+            for name in random.sample(genres, len(genres))
+        ]
+        picks = []
+        while len(picks) < count and any(pools):
+            for pool in pools:
+                if pool and len(picks) < count:
+                    picks.append(dict(pool.pop()))
+        return picks or None
+
+
+def _from_snapshots(s3):
+    # Imported here: snapshots imports this module to publish warm starts
+    from snapshots import SNAPSHOT_BUCKET, load_snapshot, manifest_key
+
+    if not SNAPSHOT_BUCKET:
+        return None
+    resp = s3.get_object(Bucket=SNAPSHOT_BUCKET, Key=manifest_key())
+    version = json.loads(resp["Body"].read())["version"]
+    body = load_snapshot(s3, SNAPSHOT_BUCKET, version, "warm-start")
+    return json.loads(body) if body else None
+
+
+def load(s3=None, path=None):
+    """The bundled snapshot, else the published one, else None.
+
+    Never raises: a missing or unreadable snapshot only means a normal
+    cold start.
+    """
+    path = WARM_START_PATH if path is None else path
+    try:
+        data = None
+        if path and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+        elif s3 is not None:
+            data = _from_snapshots(s3)
+        if not data or data.get("format") != WARM_START_FORMAT:
+            return None
+        return WarmStart(data)
+    except Exception as e:
+        print(f"Warm start snapshot not loaded: {e}")
+        return None
@@ -0,0 +1,153 @@
+import functools
+import json
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+from botocore.exceptions import ClientError
+
+# DynamoDB shed the request before applying it: always safe to repeat
+THROTTLE_CODES = {
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+}
+# The write may or may not have been applied. Repeating it is fine for puts,
+# deletes and SET updates, but would count an ADD twice
+UNKNOWN_OUTCOME_CODES = {"InternalServerError", "ServiceUnavailable"}
+RETRYABLE_CODES = THROTTLE_CODES | UNKNOWN_OUTCOME_CODES
+
+WRITE_MAX_ATTEMPTS = int(os.environ.get("WRITE_MAX_ATTEMPTS", "5"))
+WRITE_BASE_DELAY = float(os.environ.get("WRITE_BASE_DELAY", "0.05"))
+WRITE_MAX_DELAY = float(os.environ.get("WRITE_MAX_DELAY", "1.0"))
+
+# Keys per BatchGetItem request, the API's limit
+BATCH_GET_SIZE = 100
+
+
+def is_throttle(error, codes=RETRYABLE_CODES):
+    return isinstance(error, ClientError) and error.response["Error"]["Code"] in codes
+
+
+class WriteTimer:
+    # Per-request breakdown of where write time goes, plus retry counts.
+    # emit() logs it in CloudWatch embedded metric format.
+
+    def __init__(self, clock=time.perf_counter, sleep=time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self.started = clock()
+        self.phases = {}
+        self.retries = 0
+
+    @contextmanager
+    def phase(self, name):
+        started = self.clock()
+        try:
+            yield
+        finally:
+            elapsed = (self.clock() - started) * 1000
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def call(self, fn, *args, max_attempts=None, retry_on=RETRYABLE_CODES, **kwargs):
+        """Call ``fn`` with bounded, fully jittered exponential backoff.
+
+        Only errors whose code is in ``retry_on`` are retried; anything else
+        (including conditional check failures) propagates on the first
+        attempt. Pass ``THROTTLE_CODES`` for writes that aren't idempotent.
+        """
+        max_attempts = max_attempts or WRITE_MAX_ATTEMPTS
+        for attempt in range(max_attempts):
+            try:
+                return fn(*args, **kwargs)
+            except ClientError as e:
+                if not is_throttle(e, retry_on) or attempt == max_attempts - 1:
+                    raise
+            self.retries += 1
+            cap = min(WRITE_MAX_DELAY, WRITE_BASE_DELAY * 2**attempt)
+            self.sleep(random.uniform(0, cap))
+
+    def wrap(self, table):
+        return RetryingTable(table, self)
+
+    def server_timing(self):
+        # Server-Timing response header, readable in browser dev tools
+        return ", ".join(f"{name};dur={ms:.1f}" for name, ms in self.phases.items())
+
+    def emit(self, function_name, outcome):
+        total = (self.clock() - self.started) * 1000
+        metrics = {f"Write{name.title()}Ms": ms for name, ms in self.phases.items()}
+        record = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": "NovaMuse",
+                        "Dimensions": [["Function", "Outcome"]],
+                        "Metrics": [
+                            {"Name": "WriteTotalMs", "Unit": "Milliseconds"},
+                            {"Name": "WriteRetries", "Unit": "Count"},
+                        ]
+                        + [
+                            {"Name": name, "Unit": "Milliseconds"}
+                            for name in metrics
+                        ],
+                    }
+                ],
+            },
+            "Function": function_name,
+            "Outcome": outcome,
+            "WriteTotalMs": total,
+            "WriteRetries": self.retries,
+            **metrics,
+        }
+        print(json.dumps(record))
+
+
+def batch_get(table, keys, **kwargs):
+    """BatchGetItem for any number of keys; results in no particular order.
+
+    Requests are chunked at BATCH_GET_SIZE keys, and unprocessed keys are
+    asked for again after the same jittered backoff writes use. kwargs
+    shape each read (ProjectionExpression and so on).
+    """
+    items = []
+    for i in range(0, len(keys), BATCH_GET_SIZE):
+        request = {table.name: {"Keys": keys[i : i + BATCH_GET_SIZE], **kwargs}}
+        attempt = 0
+        while request:
+            if attempt:
+                cap = min(WRITE_MAX_DELAY, WRITE_BASE_DELAY * 2 ** (attempt - 1))
+                time.sleep(random.uniform(0, cap))
+            resp = table.meta.client.batch_get_item(RequestItems=request)
+            items.extend(resp["Responses"].get(table.name, []))
+            request = resp.get("UnprocessedKeys") or None
+            attempt += 1
+    return items
+
+
+class RetryingTable:
+    # Table stand-in whose single-item calls go through WriteTimer.call, so
+    # helpers that issue several writes retry each one on its own rather
+    # than repeating the ones that already succeeded. Counter updates (ADD)
+    # are only retried when DynamoDB says it didn't apply them
+
+    RETRIED = ("put_item", "update_item", "delete_item", "get_item")
+
+    def __init__(self, table, timer):
+        self._table = table
+        self._timer = timer
+
+    def __getattr__(self, name):
+        attr = getattr(self._table, name)
+        if name == "update_item":
+            return self._update_item
+        if name in self.RETRIED:
+            return functools.partial(self._timer.call, attr)
+        return attr
+
+    def _update_item(self, **kwargs):
+        adds = re.search(r"\bADD\b", kwargs.get("UpdateExpression", ""), re.I)
+        retry_on = THROTTLE_CODES if adds else RETRYABLE_CODES
+        return self._timer.call(self._table.update_item, retry_on=retry_on, **kwargs)
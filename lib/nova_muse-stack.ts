@@ -1,6 +1,12 @@
 import * as cdk from "aws-cdk-lib";
 import { Construct } from "constructs";
-import { AttributeType, Table, BillingMode } from "aws-cdk-lib/aws-dynamodb";
+import {
+  AttributeType,
+  Table,
+  BillingMode,
+  ProjectionType,
+  StreamViewType,
+} from "aws-cdk-lib/aws-dynamodb";
 import * as apigateway from "aws-cdk-lib/aws-apigateway";
 import * as lambda from "aws-cdk-lib/aws-lambda";
 import * as path from "node:path";
@@ -12,6 +18,10 @@ import * as s3 from "aws-cdk-lib/aws-s3";
 import * as cloudfront from "aws-cdk-lib/aws-cloudfront";
 import * as origins from "aws-cdk-lib/aws-cloudfront-origins";
 import * as iam from "aws-cdk-lib/aws-iam";
+import * as secretsmanager from "aws-cdk-lib/aws-secretsmanager";
+import * as events from "aws-cdk-lib/aws-events";
+import * as eventTargets from "aws-cdk-lib/aws-events-targets";
+import * as eventSources from "aws-cdk-lib/aws-lambda-event-sources";
 
 export class NovaMuseStack extends cdk.Stack {
   constructor(scope: Construct, id: string, props?: cdk.StackProps) {
@@ -22,11 +32,68 @@ export class NovaMuseStack extends cdk.Stack {
       throw new Error("ACM_ARN environment variable must be set");
     }
 
+    // Spread each genre over N GSI1 partitions; "1" keeps GENRE#<genre> keys.
+    // While migrate.py's genre-shards run moves items to a new count, set
+    // GENRE_SHARDS_PREVIOUS to the old one so readers see both layouts.
+    const genreEnvironment = {
+      GENRE_SHARDS: process.env.GENRE_SHARDS ?? "1",
+      GENRE_SHARDS_PREVIOUS: process.env.GENRE_SHARDS_PREVIOUS ?? "0",
+    };
+
+    // Catalog snapshots live in the frontend bucket (novamuse-frontend.yaml),
+    // so CloudFront serves them from https://novamusequotes.c3devs.com/catalog/
+    const frontendBucket = s3.Bucket.fromBucketName(
+      this,
+      "FrontendBucket",
+      process.env.FRONTEND_BUCKET ?? "novamuse-frontend"
+    );
+    const snapshotEnvironment = {
+      SNAPSHOT_BUCKET: frontendBucket.bucketName,
+      SNAPSHOT_PREFIX: "catalog",
+    };
+
+    // Signing key for pagination cursors (lambda/cursors.py), which refuse to
+    // work without one. Functions get only the secret's ARN and read the
+    // value at cold start, so the key stays out of the template and the
+    // function configuration. CURSOR_SECRET_ARN at deploy time reuses an
+    // existing secret; otherwise one is generated.
+    const cursorSecret = process.env.CURSOR_SECRET_ARN
+      ? secretsmanager.Secret.fromSecretCompleteArn(
+          this,
+          "CursorSecret",
+          process.env.CURSOR_SECRET_ARN
+        )
+      : new secretsmanager.Secret(this, "CursorSecret", {
+          description: "Signing key for NovaMuse pagination cursors",
+          generateSecretString: { passwordLength: 48, excludePunctuation: true },
+        });
+    const cursorEnvironment: Record<string, string> = {
+      CURSOR_SECRET_ARN: cursorSecret.secretArn,
+    };
+
+    // Opt-in profiling (lambda/profiling.py), e.g. PROFILE_SAMPLE_RATE=0.01
+    // at deploy time. Records go to each function's CloudWatch logs.
+    const profilingEnvironment: Record<string, string> = Object.fromEntries(
+      [
+        "PROFILE",
+        "PROFILE_SAMPLE_RATE",
+        "PROFILE_MEMORY",
+        "PROFILE_CAPTURE_EVENT",
+        "PROFILE_TOP_N",
+      ]
+        .filter((name) => process.env[name])
+        .map((name) => [name, process.env[name] as string])
+    );
+
     const table = new Table(this, "QuotesTable", {
       tableName: "NovaMuseQuotes",
       partitionKey: { name: "PK", type: AttributeType.STRING },
       sortKey: { name: "SK", type: AttributeType.STRING },
       billingMode: BillingMode.PAY_PER_REQUEST,
+      // Idempotency records and deletion tombstones expire on their own
+      timeToLiveAttribute: "expiresAt",
+      // Feeds the snapshot publisher (filtered to catalog version bumps)
+      stream: StreamViewType.KEYS_ONLY,
     });
     table.addGlobalSecondaryIndex({
       indexName: "GSI1-Genre",
@@ -39,12 +106,81 @@ export class NovaMuseStack extends cdk.Stack {
       sortKey: { name: "GSI2SK", type: AttributeType.STRING },
     });
 
+    // CloudFormation adds at most one GSI per table update, so a table that
+    // predates GSI3-GSI5 has to get them over successive deploys:
+    //
+    //   INDEX_STAGE=1 cdk deploy    adds GSI3-Top
+    //   INDEX_STAGE=2 cdk deploy    adds GSI4-Source
+    //   cdk deploy                  adds GSI5-Changes
+    //
+    // Wait for each index to finish backfilling (ACTIVE) before the next
+    // deploy. Until then the top, source browse and bulk changes endpoints
+    // fail on the missing index. A new table gets all five at once.
+    const indexStage = Number(process.env.INDEX_STAGE ?? "3");
+
+    // Sparse: only quotes with views/shares carry GSI3PK ("TOP#<genre>")
+    if (indexStage >= 1) {
+      table.addGlobalSecondaryIndex({
+        indexName: "GSI3-Top",
+        partitionKey: { name: "GSI3PK", type: AttributeType.STRING },
+        sortKey: { name: "score", type: AttributeType.NUMBER },
+        projectionType: ProjectionType.INCLUDE,
+        nonKeyAttributes: [
+          "quoteId",
+          "text",
+          "author",
+          "genre",
+          "source",
+          "tags",
+          "createdAt",
+          "views",
+          "shares",
+        ],
+      });
+    }
+    if (indexStage >= 2) {
+      table.addGlobalSecondaryIndex({
+        indexName: "GSI4-Source",
+        partitionKey: { name: "GSI4PK", type: AttributeType.STRING },
+        sortKey: { name: "GSI4SK", type: AttributeType.STRING },
+      });
+    }
+    // Change feed for incremental bulk syncs (lambda/changes.py): quotes by
+    // the day they last changed, plus deletion tombstones
+    if (indexStage >= 3) {
+      table.addGlobalSecondaryIndex({
+        indexName: "GSI5-Changes",
+        partitionKey: { name: "GSI5PK", type: AttributeType.STRING },
+        sortKey: { name: "GSI5SK", type: AttributeType.STRING },
+        projectionType: ProjectionType.INCLUDE,
+        nonKeyAttributes: [
+          "quoteId",
+          "text",
+          "textZ",
+          "fmt",
+          "author",
+          "genre",
+          "source",
+          "tags",
+          "createdAt",
+          "updatedAt",
+          "deletedAt",
+        ],
+      });
+    }
+
     const quotesLambda = new lambda.Function(this, "QuotesLambda", {
       runtime: lambda.Runtime.PYTHON_3_11,
       handler: "quotes_handler.lambda_handler",
       code: lambda.Code.fromAsset(path.join(__dirname, "../lambda")),
       environment: {
         QUOTES_TABLE: table.tableName,
+        ...profilingEnvironment,
+        ...genreEnvironment,
+        PAGE_CACHE_TTL: "60",
+        // Warm start falls back to the published snapshot when
+        // lambda/warm_start.json wasn't bundled
+        ...snapshotEnvironment,
       },
     });
 
@@ -54,6 +190,29 @@ export class NovaMuseStack extends cdk.Stack {
       code: lambda.Code.fromAsset(path.join(__dirname, "../lambda")),
       environment: {
         QUOTES_TABLE: table.tableName,
+        ...profilingEnvironment,
+        ...genreEnvironment,
+      },
+    });
+
+    const updateQuoteLambda = new lambda.Function(this, "UpdateQuoteLambda", {
+      runtime: lambda.Runtime.PYTHON_3_11,
+      handler: "updatequote_handler.lambda_handler",
+      code: lambda.Code.fromAsset(path.join(__dirname, "../lambda")),
+      environment: {
+        QUOTES_TABLE: table.tableName,
+        ...profilingEnvironment,
+        ...genreEnvironment,
+      },
+    });
+
+    const deleteQuoteLambda = new lambda.Function(this, "DeleteQuoteLambda", {
+      runtime: lambda.Runtime.PYTHON_3_11,
+      handler: "deletequote_handler.lambda_handler",
+      code: lambda.Code.fromAsset(path.join(__dirname, "../lambda")),
+      environment: {
+        QUOTES_TABLE: table.tableName,
+        ...profilingEnvironment,
       },
     });
 
@@ -63,6 +222,10 @@ export class NovaMuseStack extends cdk.Stack {
       code: lambda.Code.fromAsset(path.join(__dirname, "../lambda")),
       environment: {
         QUOTES_TABLE: table.tableName,
+        ...profilingEnvironment,
+        ...genreEnvironment,
+        PAGE_CACHE_TTL: "60",
+        ...cursorEnvironment,
       },
     });
 
@@ -72,6 +235,9 @@ export class NovaMuseStack extends cdk.Stack {
       code: lambda.Code.fromAsset(path.join(__dirname, "../lambda")),
       environment: {
         QUOTES_TABLE: table.tableName,
+        ...profilingEnvironment,
+        ...genreEnvironment,
+        ...snapshotEnvironment,
       },
     });
 
@@ -81,9 +247,160 @@ export class NovaMuseStack extends cdk.Stack {
       code: lambda.Code.fromAsset(path.join(__dirname, "../lambda")),
       environment: {
         QUOTES_TABLE: table.tableName,
+        ...profilingEnvironment,
+        ...snapshotEnvironment,
       },
     });
 
+    // Genres, authors and a random quote for first paint in one round trip
+    const bootstrapLambda = new lambda.Function(this, "BootstrapLambda", {
+      runtime: lambda.Runtime.PYTHON_3_11,
+      handler: "bootstrap_handler.lambda_handler",
+      code: lambda.Code.fromAsset(path.join(__dirname, "../lambda")),
+      environment: {
+        QUOTES_TABLE: table.tableName,
+        ...profilingEnvironment,
+        ...genreEnvironment,
+        PAGE_CACHE_TTL: "60",
+        ...snapshotEnvironment,
+      },
+    });
+
+    // NDJSON bulk reads for partner syncs; a full page is a few MB of scan
+    const bulkQuotesLambda = new lambda.Function(this, "BulkQuotesLambda", {
+      runtime: lambda.Runtime.PYTHON_3_11,
+      handler: "bulkquotes_handler.lambda_handler",
+      code: lambda.Code.fromAsset(path.join(__dirname, "../lambda")),
+      timeout: cdk.Duration.seconds(29),
+      memorySize: 512,
+      environment: {
+        QUOTES_TABLE: table.tableName,
+        ...profilingEnvironment,
+        ...cursorEnvironment,
+      },
+    });
+
+    const quoteOfTheDayLambda = new lambda.Function(
+      this,
+      "QuoteOfTheDayLambda",
+      {
+        runtime: lambda.Runtime.PYTHON_3_11,
+        handler: "quoteoftheday_handler.lambda_handler",
+        code: lambda.Code.fromAsset(path.join(__dirname, "../lambda")),
+        environment: {
+          QUOTES_TABLE: table.tableName,
+          ...profilingEnvironment,
+          ...genreEnvironment,
+        },
+      }
+    );
+
+    const buildQuoteOfTheDayLambda = new lambda.Function(
+      this,
+      "BuildQuoteOfTheDayLambda",
+      {
+        runtime: lambda.Runtime.PYTHON_3_11,
+        handler: "buildquoteoftheday_handler.lambda_handler",
+        code: lambda.Code.fromAsset(path.join(__dirname, "../lambda")),
+        timeout: cdk.Duration.minutes(5),
+        environment: {
+          QUOTES_TABLE: table.tableName,
+          ...profilingEnvironment,
+          ...genreEnvironment,
+        },
+      }
+    );
+
+    // Publish each day's picks right after midnight UTC
+    new events.Rule(this, "BuildQuoteOfTheDaySchedule", {
+      schedule: events.Schedule.cron({ minute: "0", hour: "0" }),
+      targets: [new eventTargets.LambdaFunction(buildQuoteOfTheDayLambda)],
+    });
+
+    const topQuotesLambda = new lambda.Function(this, "TopQuotesLambda", {
+      runtime: lambda.Runtime.PYTHON_3_11,
+      handler: "topquotes_handler.lambda_handler",
+      code: lambda.Code.fromAsset(path.join(__dirname, "../lambda")),
+      environment: {
+        QUOTES_TABLE: table.tableName,
+        ...profilingEnvironment,
+      },
+    });
+
+    const listSourcesLambda = new lambda.Function(this, "ListSourcesLambda", {
+      runtime: lambda.Runtime.PYTHON_3_11,
+      handler: "listsources_handler.lambda_handler",
+      code: lambda.Code.fromAsset(path.join(__dirname, "../lambda")),
+      environment: {
+        QUOTES_TABLE: table.tableName,
+        ...profilingEnvironment,
+      },
+    });
+
+    const publishSnapshotsLambda = new lambda.Function(
+      this,
+      "PublishSnapshotsLambda",
+      {
+        runtime: lambda.Runtime.PYTHON_3_11,
+        handler: "publishsnapshots_handler.lambda_handler",
+        code: lambda.Code.fromAsset(path.join(__dirname, "../lambda")),
+        timeout: cdk.Duration.minutes(5),
+        environment: {
+          QUOTES_TABLE: table.tableName,
+          ...profilingEnvironment,
+          ...genreEnvironment,
+          ...snapshotEnvironment,
+          ...cursorEnvironment,
+        },
+      }
+    );
+
+    // Rebuild the snapshots whenever create/update/delete bump the catalog
+    // version; one publisher at a time, bursts coalesce into one batch
+    publishSnapshotsLambda.addEventSource(
+      new eventSources.DynamoEventSource(table, {
+        startingPosition: lambda.StartingPosition.LATEST,
+        batchSize: 100,
+        maxBatchingWindow: cdk.Duration.seconds(5),
+        retryAttempts: 3,
+        filters: [
+          lambda.FilterCriteria.filter({
+            dynamodb: {
+              Keys: {
+                PK: { S: lambda.FilterRule.isEqual("META#CATALOG") },
+                SK: { S: lambda.FilterRule.isEqual("VERSION") },
+              },
+            },
+          }),
+        ],
+      })
+    );
+
+    const shareQuoteLambda = new lambda.Function(this, "ShareQuoteLambda", {
+      runtime: lambda.Runtime.PYTHON_3_11,
+      handler: "sharequote_handler.lambda_handler",
+      code: lambda.Code.fromAsset(path.join(__dirname, "../lambda")),
+      environment: {
+        QUOTES_TABLE: table.tableName,
+        ...profilingEnvironment,
+      },
+    });
+
+    // Neighbour lists are precomputed by build_similar.py
+    const similarQuotesLambda = new lambda.Function(
+      this,
+      "SimilarQuotesLambda",
+      {
+        runtime: lambda.Runtime.PYTHON_3_11,
+        handler: "similarquotes_handler.lambda_handler",
+        code: lambda.Code.fromAsset(path.join(__dirname, "../lambda")),
+        environment: {
+          QUOTES_TABLE: table.tableName,
+          ...profilingEnvironment,
+        },
+      }
+    );
+
     const userPool = new cognito.UserPool(this, "NovaMuseUserPool", {
       userPoolName: "NovaMuseUsers",
       signInAliases: {
@@ -149,8 +466,8 @@ export class NovaMuseStack extends cdk.Stack {
           "http://localhost:5173",
           "https://novamusequotes.c3devs.com",
         ],
-        allowMethods: ["GET", "POST", "OPTIONS"],
-        allowHeaders: ["Content-Type", "Authorization"],
+        allowMethods: ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        allowHeaders: ["Content-Type", "Authorization", "Idempotency-Key"],
       },
     });
 
@@ -189,11 +506,81 @@ export class NovaMuseStack extends cdk.Stack {
       .addResource("authors")
       .addMethod("GET", new apigateway.LambdaIntegration(listAuthorsLambda));
 
+    quoteResource
+      .addResource("sources")
+      .addMethod("GET", new apigateway.LambdaIntegration(listSourcesLambda));
+
+    quoteResource
+      .addResource("bootstrap")
+      .addMethod("GET", new apigateway.LambdaIntegration(bootstrapLambda));
+
+    quoteResource
+      .addResource("bulk")
+      .addMethod("GET", new apigateway.LambdaIntegration(bulkQuotesLambda));
+
+    quoteResource
+      .addResource("today")
+      .addMethod("GET", new apigateway.LambdaIntegration(quoteOfTheDayLambda));
+
+    quoteResource
+      .addResource("top")
+      .addMethod("GET", new apigateway.LambdaIntegration(topQuotesLambda));
+
+    const quoteIdResource = quoteResource.addResource("{quoteId}");
+    quoteIdResource.addMethod(
+      "PUT",
+      new apigateway.LambdaIntegration(updateQuoteLambda),
+      {
+        authorizer,
+        authorizationType: apigateway.AuthorizationType.COGNITO,
+      }
+    );
+    quoteIdResource.addMethod(
+      "DELETE",
+      new apigateway.LambdaIntegration(deleteQuoteLambda),
+      {
+        authorizer,
+        authorizationType: apigateway.AuthorizationType.COGNITO,
+      }
+    );
+    quoteIdResource
+      .addResource("share")
+      .addMethod("POST", new apigateway.LambdaIntegration(shareQuoteLambda));
+    quoteIdResource
+      .addResource("similar")
+      .addMethod("GET", new apigateway.LambdaIntegration(similarQuotesLambda));
+
     table.grantReadWriteData(createQuotesLambda);
+    table.grantReadWriteData(updateQuoteLambda);
+    table.grantReadWriteData(deleteQuoteLambda);
     table.grantReadData(quotesLambda);
     table.grantReadData(browseQuotesLambda);
     table.grantReadData(listGenresLambda);
     table.grantReadData(listAuthorsLambda);
+    table.grantReadData(bootstrapLambda);
+    table.grantReadData(bulkQuotesLambda);
+    table.grantReadData(topQuotesLambda);
+    table.grantReadData(listSourcesLambda);
+    table.grantReadData(similarQuotesLambda);
+    // Reads the catalog and records the published version
+    table.grantReadWriteData(publishSnapshotsLambda);
+    frontendBucket.grantPut(publishSnapshotsLambda, "catalog/*");
+    frontendBucket.grantRead(quotesLambda, "catalog/*");
+    frontendBucket.grantRead(listGenresLambda, "catalog/*");
+    frontendBucket.grantRead(listAuthorsLambda, "catalog/*");
+    frontendBucket.grantRead(bootstrapLambda, "catalog/*");
+    // Cursor signing key, read once per cold start
+    cursorSecret.grantRead(browseQuotesLambda);
+    cursorSecret.grantRead(bulkQuotesLambda);
+    cursorSecret.grantRead(publishSnapshotsLambda);
+    // View/share counters are flushed from the read paths; list pages
+    // aren't counted, so browse stays read-only
+    table.grantWriteData(quotesLambda);
+    table.grantWriteData(bootstrapLambda);
+    table.grantReadWriteData(shareQuoteLambda);
+    // Serving only reads; the schedule builds the day's item
+    table.grantReadData(quoteOfTheDayLambda);
+    table.grantReadWriteData(buildQuoteOfTheDayLambda);
 
     new cdk.CfnOutput(this, "CognitoLoginUrl", {
       value: `https://novamuse.auth.${this.region}.amazoncognito.com/login?client_id=${userPoolClient.userPoolClientId}&response_type=code&scope=email+openid+profile&redirect_uri=https://novamusequotes.c3devs.com`,
@@ -0,0 +1,457 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "lambda"))
+
+from changes import change_keys
+from genre_shards import genre_partition_key
+from item_format import (
+    COMPRESSED_TEXT,
+    FORMAT_ATTR,
+    ITEM_FORMAT,
+    decode_item,
+    pack_text,
+)
+from quote_text import TEXT_HASH_ATTR, claim_text, text_hash, text_key
+from sources import register_source_action, source_partition_key
+from thread_tables import thread_table
+
+# Online migrations over every QUOTE# item.
+#
+#   python migrate.py list
+#   python migrate.py run source-index --segments 8 --rate 200 [--dry-run]
+#   python migrate.py status source-index
+#
+# A migration is a transform(item) -> {attribute: new value} (REMOVE drops
+# the attribute; an empty result leaves the item alone). The runner scans
+# the table in parallel segments, rate-limits writes with a token bucket,
+# and records each segment's position under MIGRATION#<name> so an
+# interrupted run resumes where it stopped. Every write is conditional on
+# the attributes it changes still holding what the scan saw, so re-runs
+# and concurrent edits are safe. Bookkeeping that goes with an item (see
+# Migration.extra_writes) commits in the same transaction.
+
+REMOVE = object()
+
+MIGRATIONS = {}
+
+
+class Migration:
+    def __init__(
+        self, name, transform, description="", extra_writes=None, on_rejected=None
+    ):
+        self.name = name
+        self.transform = transform
+        self.description = description
+        # Optional extra_writes(table_name, item, changes) -> TransactWriteItems
+        # actions (e.g. registry counters) committed together with the item
+        # update, so an interrupted run can't apply one without the other
+        self.extra_writes = extra_writes
+        # Optional on_rejected(table, item, changes) for when one of those
+        # extra actions' own conditions fails; returns True if it wrote
+        self.on_rejected = on_rejected
+
+
+def register(name, description="", extra_writes=None, on_rejected=None):
+    def decorator(transform):
+        MIGRATIONS[name] = Migration(
+            name, transform, description, extra_writes, on_rejected
+        )
+        return transform
+
+    return decorator
+
+
+class TokenBucket:
+    # Shared by all segment workers: `rate` writes per second on average,
+    # bursts of up to `burst`
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst or max(rate, 1)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.burst
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        # Reserve now and sleep off any debt outside the lock, so waiting
+        # workers queue up in order instead of polling
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate
+        if wait > 0:
+            self.sleep(wait)
+
+
+class Progress:
+    # Thread-safe counters plus a periodic throughput line
+
+    FIELDS = ("scanned", "updated", "unchanged", "conflicts")
+
+    def __init__(self, report_every=10.0, clock=time.monotonic):
+        self.counts = dict.fromkeys(self.FIELDS, 0)
+        self.started = self.reported = clock()
+        self.report_every = report_every
+        self.clock = clock
+        self.lock = threading.Lock()
+
+    def add(self, **counts):
+        with self.lock:
+            for name, value in counts.items():
+                self.counts[name] += value
+            now = self.clock()
+            if self.report_every and now - self.reported >= self.report_every:
+                self.reported = now
+                print(self.summary())
+
+    def summary(self):
+        elapsed = max(self.clock() - self.started, 1e-9)
+        counts = self.counts
+        return (
+            f"{counts['scanned']} scanned ({counts['scanned'] / elapsed:.0f}/s), "
+            f"{counts['updated']} updated ({counts['updated'] / elapsed:.0f}/s), "
+            f"{counts['unchanged']} unchanged, {counts['conflicts']} conflicts"
+        )
+
+
+def checkpoint_key(name, segment, segments):
+    return {"PK": f"MIGRATION#{name}", "SK": f"SEGMENT#{segment:04d}/{segments:04d}"}
+
+
+def update_request(item, changes):
+    names, values, sets, removes, conditions = {}, {}, [], [], []
+    for i, (name, value) in enumerate(changes.items()):
+        names[f"#a{i}"] = name
+        if value is REMOVE:
+            removes.append(f"#a{i}")
+        else:
+            values[f":v{i}"] = value
+            sets.append(f"#a{i} = :v{i}")
+        # Unchanged since the scan read it
+        if name in item:
+            values[f":o{i}"] = item[name]
+            conditions.append(f"#a{i} = :o{i}")
+        else:
+            conditions.append(f"attribute_not_exists(#a{i})")
+    expression = " ".join(
+        part
+        for part in (
+            "SET " + ", ".join(sets) if sets else "",
+            "REMOVE " + ", ".join(removes) if removes else "",
+        )
+        if part
+    )
+    request = {
+        "Key": {"PK": item["PK"], "SK": item["SK"]},
+        "UpdateExpression": expression,
+        "ConditionExpression": " AND ".join(["attribute_exists(PK)", *conditions]),
+        "ExpressionAttributeNames": names,
+    }
+    if values:
+        request["ExpressionAttributeValues"] = values
+    return request
+
+
+def write(table, migration, item, changes, bucket):
+    """Apply ``changes`` to ``item`` plus the migration's extra writes.
+
+    Returns "updated", or "conflicts" when the item changed since the scan
+    or an extra write was rejected (and on_rejected wrote nothing).
+    """
+    request = update_request(item, changes)
+    extra = (
+        migration.extra_writes(table.name, item, changes)
+        if migration.extra_writes
+        else []
+    )
+    bucket.acquire(1 + len(extra))
+    try:
+        if not extra:
+            table.update_item(**request)
+            return "updated"
+        update = {"Update": {"TableName": table.name, **request}}
+        table.meta.client.transact_write_items(TransactItems=[update, *extra])
+        return "updated"
+    except ClientError as e:
+        code = e.response["Error"]["Code"]
+        if code == "ConditionalCheckFailedException":
+            return "conflicts"
+        if code != "TransactionCanceledException":
+            raise
+        reasons = e.response.get("CancellationReasons") or []
+        failed = [r.get("Code") == "ConditionalCheckFailed" for r in reasons]
+        if not any(failed[1:]) or (failed and failed[0]):
+            # The item itself moved on, or the transaction lost a race
+            return "conflicts"
+    if migration.on_rejected:
+        bucket.acquire()
+        if migration.on_rejected(table, item, changes):
+            return "updated"
+    return "conflicts"
+
+
+def run_segment(
+    table, migration, segment, segments, bucket, progress, dry_run, page_size=None
+):
+    # Segments run on worker threads, each through its own Table
+    table = thread_table(table)
+    key = checkpoint_key(migration.name, segment, segments)
+    start_key = None
+    if not dry_run:
+        state = table.get_item(Key=key).get("Item") or {}
+        if state.get("done"):
+            return
+        if state.get("lastKey"):
+            start_key = json.loads(state["lastKey"])
+
+    while True:
+        kwargs = {
+            "Segment": segment,
+            "TotalSegments": segments,
+            "FilterExpression": Attr("PK").begins_with("QUOTE#")
+            & Attr("SK").eq("METADATA"),
+        }
+        if page_size:
+            kwargs["Limit"] = page_size
+        if start_key:
+            kwargs["ExclusiveStartKey"] = start_key
+        resp = table.scan(**kwargs)
+
+        items = resp.get("Items", [])
+        updated = unchanged = conflicts = 0
+        for item in items:
+            changes = migration.transform(item)
+            changes = {
+                name: value
+                for name, value in (changes or {}).items()
+                if ((name in item) if value is REMOVE else item.get(name) != value)
+            }
+            if not changes:
+                unchanged += 1
+                continue
+            if dry_run:
+                print(f"{item['PK']}: {sorted(changes)}")
+                updated += 1
+                continue
+            if write(table, migration, item, changes, bucket) == "updated":
+                updated += 1
+            else:
+                conflicts += 1
+
+        start_key = resp.get("LastEvaluatedKey")
+        if not dry_run:
+            # Persisted per page; a restart redoes at most one page, which
+            # the conditional writes turn into no-ops
+            state = {**key, "migration": migration.name, "done": not start_key}
+            if start_key:
+                state["lastKey"] = json.dumps(start_key)
+            table.put_item(Item=state)
+        progress.add(
+            scanned=len(items),
+            updated=updated,
+            unchanged=unchanged,
+            conflicts=conflicts,
+        )
+        if not start_key:
+            return
+
+
+def run(
+    table,
+    name,
+    segments=4,
+    rate=100,
+    dry_run=False,
+    restart=False,
+    page_size=None,
+    report_every=10.0,
+    workers=None,
+):
+    # ``workers`` threads share the segments (default: one per segment)
+    migration = MIGRATIONS[name]
+    if restart and not dry_run:
+        reset(table, name, segments)
+    bucket = TokenBucket(rate)
+    progress = Progress(report_every)
+    with ThreadPoolExecutor(max_workers=workers or segments) as pool:
+        futures = [
+            pool.submit(
+                run_segment,
+                table,
+                migration,
+                segment,
+                segments,
+                bucket,
+                progress,
+                dry_run,
+                page_size,
+            )
+            for segment in range(segments)
+        ]
+        for future in futures:
+            future.result()
+    print(progress.summary())
+    return progress.counts
+
+
+def reset(table, name, segments):
+    for segment in range(segments):
+        table.delete_item(Key=checkpoint_key(name, segment, segments))
+
+
+def status(table, name):
+    resp = table.query(
+        KeyConditionExpression="PK = :pk",
+        ExpressionAttributeValues={":pk": f"MIGRATION#{name}"},
+    )
+    return resp.get("Items", [])
+
+
+# Rollout for a new shard count, from <m> (1 = unsharded) to <n>:
+#   1. deploy with GENRE_SHARDS=<n> and GENRE_SHARDS_PREVIOUS=<m> so readers
+#      see both the old and the new partitions while items move
+#   2. GENRE_SHARDS=<n> python migrate.py run genre-shards
+#   3. redeploy without GENRE_SHARDS_PREVIOUS
+@register("genre-shards", "Move GSI1PK onto the GENRE_SHARDS layout")
+def reshard_genre(item):
+    if not item.get("GSI1PK"):
+        return None
+    return {"GSI1PK": genre_partition_key(item["genre"], item["quoteId"])}
+
+
+def _count_source(table_name, item, changes):
+    return [register_source_action(table_name, item["source"])]
+
+
+@register(
+    "source-index",
+    "Add GSI4-Source keys and register sources",
+    extra_writes=_count_source,
+)
+def index_source(item):
+    if "source" not in item or "GSI4PK" in item:
+        return None
+    return {
+        "GSI4PK": source_partition_key(item["source"]),
+        "GSI4SK": f"CREATED#{item.get('createdAt', '')}",
+    }
+
+
+@register("compact-text", "Compress long quote text (item format 2)")
+def compact_text(item):
+    if not isinstance(item.get("text"), str):
+        return None
+    packed = pack_text(item["text"])
+    if packed is None:
+        return None
+    return {"text": REMOVE, COMPRESSED_TEXT: packed, FORMAT_ATTR: ITEM_FORMAT}
+
+
+@register("change-feed", "Add updatedAt and GSI5-Changes keys")
+def index_changes(item):
+    # Never edited since the feed existed: the last change is the creation
+    if "updatedAt" in item or "createdAt" not in item:
+        return None
+    return {
+        "updatedAt": item["createdAt"],
+        **change_keys(item["quoteId"], item["createdAt"]),
+    }
+
+
+def _guard_text(table_name, item, changes):
+    guard = {
+        **text_key(changes[TEXT_HASH_ATTR]),
+        "quoteId": item["quoteId"],
+        "claimedAt": int(time.time()),
+    }
+    return [
+        {
+            "Put": {
+                "TableName": table_name,
+                "Item": guard,
+                "ConditionExpression": "attribute_not_exists(PK)",
+            }
+        }
+    ]
+
+
+def _text_taken(table, item, changes):
+    # The guard exists. It may be ours (a create that failed half way, or
+    # a dangling one claim_text takes over); otherwise the quote was created
+    # twice under the old scheme and is left unguarded for an admin to merge
+    owner = claim_text(table, changes[TEXT_HASH_ATTR], item["quoteId"])
+    if owner != item["quoteId"]:
+        print(f"{item['quoteId']}: duplicate of {owner}")
+        return False
+    try:
+        table.update_item(**update_request(item, changes))
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return False
+    return True
+
+
+@register(
+    "text-hash",
+    "Add textHash and claim the TEXT# duplicate guards",
+    extra_writes=_guard_text,
+    on_rejected=_text_taken,
+)
+def hash_text(item):
+    if TEXT_HASH_ATTR in item:
+        return None
+    return {TEXT_HASH_ATTR: text_hash(decode_item(dict(item))["text"])}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run an online item migration")
+    parser.add_argument("--table", default="NovaMuseQuotes")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list")
+    run_parser = commands.add_parser("run")
+    run_parser.add_argument("name", choices=sorted(MIGRATIONS))
+    run_parser.add_argument("--segments", type=int, default=4)
+    run_parser.add_argument("--rate", type=float, default=100, help="writes/s")
+    run_parser.add_argument("--dry-run", action="store_true")
+    run_parser.add_argument("--restart", action="store_true")
+    run_parser.add_argument("--page-size", type=int, help="items per scan page")
+    status_parser = commands.add_parser("status")
+    status_parser.add_argument("name", choices=sorted(MIGRATIONS))
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for migration in MIGRATIONS.values():
+            print(f"{migration.name:<16} {migration.description}")
+        sys.exit(0)
+
+    dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+    table = dynamodb.Table(args.table)
+    if args.command == "run":
+        run(
+            table,
+            args.name,
+            args.segments,
+            args.rate,
+            args.dry_run,
+            args.restart,
+            args.page_size,
+        )
+    else:
+        for state in status(table, args.name):
+            print(f"{state['SK']}: {'done' if state.get('done') else 'in progress'}")
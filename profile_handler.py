@@ -0,0 +1,77 @@
+import argparse
+import cProfile
+import importlib
+import json
+import os
+import pstats
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "lambda"))
+
+import profiling
+
+# Replays an event through a handler under the profiler, against whatever
+# table QUOTES_TABLE and the AWS environment point at.
+#
+#   python profile_handler.py listauthors_handler event.json
+#   python profile_handler.py browsequotes_handler record.json --memory --repeat 5
+#
+# The event file is an API Gateway event, or a profile record logged with
+# PROFILE_CAPTURE_EVENT=1 (its "event" is replayed). The first invocation
+# of a fresh process includes module-level setup; --repeat shows warm ones.
+
+
+def load_event(path):
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict) and "Profile" in data:
+        return data.get("event") or {}
+    return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile a handler on one event")
+    parser.add_argument("handler", help="module in lambda/, e.g. quotes_handler")
+    parser.add_argument("event", help="event JSON or captured profile record")
+    parser.add_argument("--repeat", type=int, default=1, help="invocations")
+    parser.add_argument("--memory", action="store_true", help="trace allocations")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument(
+        "--sort", default="tottime", choices=("tottime", "cumulative", "ncalls")
+    )
+    parser.add_argument("--output", help="also write the raw profile (pstats)")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("QUOTES_TABLE", "NovaMuseQuotes")
+    event = load_event(args.event)
+    module = importlib.import_module(args.handler)
+    # The undecorated handler, so sampling settings don't matter here
+    handler = getattr(module.lambda_handler, "__wrapped__", module.lambda_handler)
+
+    profiling.PROFILE_TOP_N = args.top
+    records = []
+    for _ in range(args.repeat):
+        profiler = cProfile.Profile()
+        response, record = profiling.run_profiled(
+            handler,
+            args.handler,
+            (event, None),
+            {},
+            memory=args.memory,
+            profiler=profiler,
+        )
+        records.append(record)
+    durations = ", ".join(f"{record['durationMs']:.1f}" for record in records)
+    print(f"\nstatus {response.get('statusCode')}, durations (ms): {durations}")
+
+    # Full pstats listing for the last of those invocations (not another
+    # run: the handler may create, edit or delete)
+    stats = pstats.Stats(profiler)
+    stats.sort_stats(args.sort).print_stats(args.top)
+    if args.output:
+        stats.dump_stats(args.output)
+    return records
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,21 @@
+import os
+import sys
 import boto3
 import uuid
-import hashlib
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "lambda"))
+
+from catalog_version import bump_version
+from changes import stamp
+from checkpoints import record_item
+from facets import record_pair
+from item_format import encode_item
+from quote_items import build_item
+from quote_text import TEXT_HASH_ATTR, claim_text, find_quote_id, new_quote_id
+from sources import register_source
+from tags import add_tags, parse_tags
+
 # Initialize DynamoDB
 dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
 table_name = "NovaMuseQuotes"
@@ -15,24 +28,28 @@ quotes = [
         "author": "Yoda",
         "genre": "sci-fi",
         "source": "Star Wars: The Empire Strikes Back",
+        "tags": ["courage", "wisdom"],
     },
     {
         "text": "Fear is the mind-killer.",
         "author": "Paul Atreides",
         "genre": "sci-fi",
         "source": "Dune Messiah",
+        "tags": ["courage", "fear"],
     },
     {
         "text": "All we have to decide is what to do with the time that is given us.",
         "author": "Gandalf",
         "genre": "fantasy",
         "source": "The Lord of the Rings",
+        "tags": ["time", "wisdom"],
     },
     {
         "text": "It is our choices, Harry, that show what we truly are, far more than our abilities.",
         "author": "Dumbledore",
         "genre": "fantasy",
         "source": "Harry Potter and the Chamber of Secrets",
+        "tags": ["choice", "wisdom"],
     },
     {
         "text": "I am Groot.",
@@ -45,34 +62,40 @@ quotes = [
         "author": "Bilbo Baggins",
         "genre": "fantasy",
         "source": "The Hobbit",
+        "tags": ["journey"],
     },
 ]
 
+inserted = 0
 for q in quotes:
-    quote_id = hashlib.md5(q["text"].encode("utf-8")).hexdigest()[:8]
-    created_at = datetime.utcnow().isoformat() + "Z"
-
-    existing = table.get_item(Key={"PK": f"QUOTE#{quote_id}", "SK": "METADATA"})
-    if "Item" in existing:
+    # Same normalization as the API, so re-running (or seeding a quote an
+    # admin already added) doesn't create a duplicate
+    if find_quote_id(table, q["text"]):
         print(f"Quote already exists: {q['author']} - {q['text'][:30]}...")
         continue
 
-    item = {
-        "PK": f"QUOTE#{quote_id}",
-        "SK": "METADATA",
-        "quoteId": quote_id,
-        "text": q["text"],
-        "author": q["author"],
-        "genre": q["genre"],
-        "source": q["source"],
-        "createdAt": created_at,
-        # GSI1 - Genre
-        "GSI1PK": f"GENRE#{q['genre']}",
-        "GSI1SK": f"CREATED#{created_at}",
-        # GSI2 - Author
-        "GSI2PK": f"AUTHOR#{q['author']}",
-        "GSI2SK": f"CREATED#{created_at}",
-    }
+    quote_id = new_quote_id()
+    created_at = datetime.utcnow().isoformat() + "Z"
+    tags = parse_tags(q.get("tags"))
+    item = build_item(
+        quote_id, q["text"], q["author"], q["genre"], q["source"], created_at, tags
+    )
+    stamp(item, created_at)
+    if claim_text(table, item[TEXT_HASH_ATTR], quote_id) != quote_id:
+        print(f"Quote already exists: {q['author']} - {q['text'][:30]}...")
+        continue
 
-    table.put_item(Item=item)
+    table.put_item(Item=encode_item(item))
+    # Same bookkeeping as createquotes_handler, so jump-to-page and the
+    # browse caches see the seeded quotes
+    record_item(table, f"GENRE#{q['genre']}", item, "GSI1SK")
+    record_item(table, f"AUTHOR#{q['author']}", item, "GSI2SK")
+    register_source(table, q["source"])
+    record_pair(table, q["genre"], q["author"])
+    add_tags(table, quote_id, tags)
+    inserted += 1
     print(f"Inserted quote {quote_id} by {q['author']}")
+
+if inserted:
+    # Invalidates cached browse pages in every container
+    bump_version(table)
@@ -0,0 +1,4 @@
+import os
+
+# Handlers refuse to sign pagination cursors without a key
+os.environ.setdefault("CURSOR_SECRET", "test-cursor-key")
@@ -0,0 +1,151 @@
+import os
+import sys
+import json
+from unittest.mock import Mock, patch
+import pytest
+from moto import mock_dynamodb
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+import bootstrap_handler
+import catalog_version
+import quotes_handler
+from bootstrap_handler import lambda_handler
+from catalog_version import bump_version
+
+TABLE_NAME = "NovaMuseQuotes"
+
+
+@pytest.fixture
+def dynamodb_table(monkeypatch):
+    monkeypatch.setattr(catalog_version, "VERSION_TTL", 0)
+    monkeypatch.setattr(quotes_handler, "GENRE_CACHE", None)
+    monkeypatch.setattr(quotes_handler, "warm", None)
+    monkeypatch.setattr(bootstrap_handler, "_lists", {})
+    with mock_dynamodb():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+                {"AttributeName": "GSI1PK", "AttributeType": "S"},
+                {"AttributeName": "GSI1SK", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "GSI1-Genre",
+                    "KeySchema": [
+                        {"AttributeName": "GSI1PK", "KeyType": "HASH"},
+                        {"AttributeName": "GSI1SK", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        for i, (genre, author) in enumerate(
+            [("fantasy", "Terry Goodkind"), ("sci-fi", "Isaac Asimov")]
+        ):
+            table.put_item(
+                Item={
+                    "PK": f"QUOTE#{i}",
+                    "SK": "METADATA",
+                    "quoteId": str(i),
+                    "text": f"Quote number {i}",
+                    "author": author,
+                    "genre": genre,
+                    "createdAt": f"2024-01-01T00:00:0{i}Z",
+                    "GSI1PK": f"GENRE#{genre}",
+                    "GSI1SK": f"CREATED#2024-01-01T00:00:0{i}Z",
+                    "GSI2PK": f"AUTHOR#{author}",
+                }
+            )
+        bump_version(table)
+        yield table
+
+
+def test_bootstrap_combines_lists_and_quote(dynamodb_table):
+    response = lambda_handler({"queryStringParameters": None}, None)
+    body = json.loads(response["body"])
+
+    assert response["statusCode"] == 200
+    assert response["headers"]["Cache-Control"].startswith("public, max-age=")
+    assert body["genres"] == {"version": 1, "items": ["fantasy", "sci-fi"]}
+    assert body["authors"] == {
+        "version": 1,
+        "items": ["Isaac Asimov", "Terry Goodkind"],
+    }
+    assert body["quote"]["version"] == 1
+    assert body["quote"]["item"]["text"].startswith("Quote number")
+
+
+def test_current_client_versions_skip_lookups(dynamodb_table):
+    event = {
+        "queryStringParameters": {
+            "genresVersion": "1",
+            "authorsVersion": "1",
+            "fields": "text",
+        }
+    }
+    with patch.object(bootstrap_handler, "load_list") as mock_load:
+        body = json.loads(lambda_handler(event, None)["body"])
+    mock_load.assert_not_called()
+    assert body["genres"] == {"version": 1}
+    assert body["authors"] == {"version": 1}
+    assert list(body["quote"]["item"]) == ["text"]
+
+    # A change bumps the version, so the stale copy is replaced
+    bump_version(dynamodb_table)
+    body = json.loads(lambda_handler(event, None)["body"])
+    assert body["genres"]["version"] == 2
+    assert body["genres"]["items"] == ["fantasy", "sci-fi"]
+
+
+def test_lists_are_reused_within_a_version(dynamodb_table):
+    lambda_handler({}, None)
+    scans = {name: Mock() for name in bootstrap_handler.LISTS}
+    with patch.dict(bootstrap_handler.LISTS, scans):
+        body = json.loads(lambda_handler({}, None)["body"])
+    for scan in scans.values():
+        scan.assert_not_called()
+    assert body["authors"]["items"] == ["Isaac Asimov", "Terry Goodkind"]
+
+
+def test_lookups_use_their_own_table(dynamodb_table):
+    seen = []
+
+    def scan(table):
+        seen.append(table)
+        return []
+
+    with patch.dict(bootstrap_handler.LISTS, genres=scan, authors=scan):
+        lambda_handler({}, None)
+    assert len(seen) == 2
+    assert all(table is not bootstrap_handler.table for table in seen)
+    assert {table.name for table in seen} == {bootstrap_handler.table.name}
+
+
+def test_failed_lookup_leaves_the_rest(dynamodb_table):
+    failing = Mock(side_effect=RuntimeError("boom"))
+    with patch.dict(bootstrap_handler.LISTS, authors=failing):
+        response = lambda_handler({}, None)
+    body = json.loads(response["body"])
+    assert response["headers"]["Cache-Control"] == "no-store"
+    assert body["authors"]["error"] == "authors unavailable"
+    assert body["genres"]["items"] == ["fantasy", "sci-fi"]
+
+
+def test_unknown_field_is_rejected(dynamodb_table):
+    event = {"queryStringParameters": {"fields": "secret"}}
+    assert lambda_handler(event, None)["statusCode"] == 400
@@ -16,6 +16,7 @@ sys.path.insert(
 os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
 
 from browsequotes_handler import lambda_handler, encode_cursor, decode_cursor
+from cursors import genre_scope
 
 TABLE_NAME = "NovaMuseQuotes"
 
@@ -231,9 +232,16 @@ def test_scan_exception(monkeypatch):
 def test_empty_genre_query(dynamodb_table):
     # Use a genre that exists but with cursor beyond data
     event = {"queryStringParameters": {"limit": "5", "genre": "sci-fi"}}
-    # simulate start at last key
-    last_key = {"PK": "QUOTE#999", "SK": "METADATA"}
-    event["queryStringParameters"]["cursor"] = encode_cursor(last_key)
+    # simulate start past the oldest sci-fi quote
+    last_key = {
+        "PK": "QUOTE#999",
+        "SK": "METADATA",
+        "GSI1PK": "GENRE#sci-fi",
+        "GSI1SK": "CREATED#0000",
+    }
+    event["queryStringParameters"]["cursor"] = encode_cursor(
+        last_key, genre_scope("sci-fi")
+    )
     response = lambda_handler(event, None)
     body = json.loads(response["body"])
     assert body["items"] == []
@@ -272,6 +280,26 @@ def test_full_table_scan(dynamodb_table):
     assert all("text" in item for item in body["items"])
 
 
+def test_full_table_pages_fill_past_bookkeeping_items(dynamodb_table):
+    for i in range(40):
+        dynamodb_table.put_item(
+            Item={"PK": f"CHECKPOINTS#GENRE#g{i}", "SK": "META", "itemCount": 1}
+        )
+    texts, cursor = [], None
+    while True:
+        params = {"limit": "5"}
+        if cursor:
+            params["cursor"] = cursor
+        response = lambda_handler({"queryStringParameters": params}, None)
+        body = json.loads(response["body"])
+        texts += [item["text"] for item in body["items"]]
+        cursor = body["nextCursor"]
+        if not cursor:
+            break
+        # Every page before the last is full
+        assert len(body["items"]) == 5
+    assert sorted(texts) == sorted(f"Quote number {i}" for i in range(1, 21))
+
 def test_limit_exceeds_total(dynamodb_table):
     event = {"queryStringParameters": {"genre": "fantasy", "limit": "50"}}
     response = lambda_handler(event, None)
@@ -330,3 +358,31 @@ def test_genre_and_author_filter_returns_only_matching_items(dynamodb_table):
 
     assert all(item["author"] == "Author B" for item in body["items"])
     assert all(item["genre"] == "sci-fi" for item in body["items"])
+
+
+def test_sparse_fields(dynamodb_table):
+    event = {"queryStringParameters": {"genre": "sci-fi", "fields": "text,author"}}
+    response = lambda_handler(event, None)
+    body = json.loads(response["body"])
+    assert all(set(item) == {"text", "author"} for item in body["items"])
+
+
+def test_sparse_fields_with_author_filter(dynamodb_table):
+    event = {
+        "queryStringParameters": {
+            "genre": "sci-fi",
+            "author": "Author A",
+            "fields": "text",
+            "limit": "10",
+        }
+    }
+    response = lambda_handler(event, None)
+    body = json.loads(response["body"])
+    assert len(body["items"]) == 5
+    assert all(set(item) == {"text"} for item in body["items"])
+
+
+def test_unknown_field_rejected(dynamodb_table):
+    event = {"queryStringParameters": {"fields": "text,GSI1PK"}}
+    response = lambda_handler(event, None)
+    assert response["statusCode"] == 400
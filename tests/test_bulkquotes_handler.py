@@ -0,0 +1,165 @@
+import os
+import sys
+import json
+import pytest
+from moto import mock_dynamodb
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+import bulkquotes_handler
+import migrate
+from bulkquotes_handler import lambda_handler
+from changes import now
+from createquotes_handler import lambda_handler as create_lambda
+from deletequote_handler import lambda_handler as delete_lambda
+from quote_items import build_item
+from quote_text import find_quote_id
+from updatequote_handler import lambda_handler as update_lambda
+
+TABLE_NAME = "NovaMuseQuotes"
+ADMIN = {"authorizer": {"claims": {"cognito:groups": "admins"}}}
+QUOTES = [
+    ("Fear is the mind-killer.", "Paul Atreides", "sci-fi"),
+    ("Not all those who wander are lost.", "Bilbo Baggins", "fantasy"),
+    ("I am Groot.", "Groot", "sci-fi"),
+]
+
+
+@pytest.fixture
+def dynamodb_table():
+    with mock_dynamodb():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": name, "AttributeType": "S"}
+                for name in ("PK", "SK", "GSI5PK", "GSI5SK")
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "GSI5-Changes",
+                    "KeySchema": [
+                        {"AttributeName": "GSI5PK", "KeyType": "HASH"},
+                        {"AttributeName": "GSI5SK", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        for text, author, genre in QUOTES:
+            event = {
+                "requestContext": ADMIN,
+                "body": json.dumps(
+                    {"text": text, "author": author, "genre": genre, "source": "s"}
+                ),
+            }
+            assert create_lambda(event, None)["statusCode"] == 201
+        yield table
+
+
+def bulk(**params):
+    response = lambda_handler({"queryStringParameters": params}, None)
+    assert response["statusCode"] == 200, response["body"]
+    assert response["headers"]["Content-Type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response["body"].splitlines()]
+    return lines[:-1], lines[-1]
+
+
+def edit(quote_id, body):
+    event = {
+        "requestContext": ADMIN,
+        "pathParameters": {"quoteId": quote_id},
+        "body": json.dumps(body),
+    }
+    return update_lambda(event, None)
+
+
+def test_full_sync_lists_every_quote(dynamodb_table):
+    quotes, trailer = bulk()
+    assert sorted(q["text"] for q in quotes) == sorted(t for t, _, _ in QUOTES)
+    assert all(q["updatedAt"] == q["createdAt"] for q in quotes)
+    assert "PK" not in quotes[0] and "GSI5SK" not in quotes[0]
+    assert trailer["done"] and trailer["count"] == 3
+    assert trailer["nextUpdatedSince"]
+
+
+def test_incremental_sync_returns_only_changes(dynamodb_table):
+    since = now()
+    groot = find_quote_id(dynamodb_table, "I am Groot.")
+    fear = find_quote_id(dynamodb_table, QUOTES[0][0])
+    assert edit(groot, {"genre": "comics"})["statusCode"] == 200
+    event = {"requestContext": ADMIN, "pathParameters": {"quoteId": fear}}
+    assert delete_lambda(event, None)["statusCode"] == 200
+    # Rewording keeps the id
+    assert edit(groot, {"text": "We are Groot."})["statusCode"] == 200
+
+    # Each id appears once, in its latest state, oldest change first
+    lines, trailer = bulk(updatedSince=since, fields="text,genre")
+    assert [(line["quoteId"], line.get("deleted", False)) for line in lines] == [
+        (fear, True),
+        (groot, False),
+    ]
+    assert lines[1] == {
+        "quoteId": groot,
+        "text": "We are Groot.",
+        "genre": "comics",
+        "updatedAt": lines[1]["updatedAt"],
+    }
+    assert trailer["count"] == 2
+
+    # Nothing has changed since
+    lines, _ = bulk(updatedSince=now())
+    assert lines == []
+
+
+def test_responses_split_at_the_size_limit(dynamodb_table, monkeypatch):
+    monkeypatch.setattr(bulkquotes_handler, "BULK_MAX_BYTES", 150)
+    seen, params, requests = [], {}, 0
+    while True:
+        lines, trailer = bulk(**params)
+        seen += [line["quoteId"] for line in lines]
+        requests += 1
+        if trailer["done"]:
+            break
+        params = {"cursor": trailer["cursor"]}
+    assert requests > 1
+    expected = [find_quote_id(dynamodb_table, text) for text, _, _ in QUOTES]
+    assert sorted(seen) == sorted(expected)
+
+
+def test_rejects_bad_parameters(dynamodb_table):
+    for params in (
+        {"updatedSince": "yesterday"},
+        {"updatedSince": "2001-01-01T00:00:00Z"},
+        {"cursor": "not-a-cursor"},
+        {"fields": "secret"},
+    ):
+        event = {"queryStringParameters": params}
+        assert lambda_handler(event, None)["statusCode"] == 400
+
+
+def test_change_feed_migration_indexes_legacy_quotes(dynamodb_table):
+    created_at = now()
+    dynamodb_table.put_item(
+        Item=build_item("legacy01", "Old quote.", "A", "history", "s", created_at)
+    )
+    lines, _ = bulk(updatedSince=created_at)
+    assert lines == []
+
+    migrate.run(dynamodb_table, "change-feed", segments=1)
+    lines, _ = bulk(updatedSince=created_at)
+    assert [(line["quoteId"], line["updatedAt"]) for line in lines] == [
+        ("legacy01", created_at)
+    ]
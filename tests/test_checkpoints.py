@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import pytest
+from moto import mock_dynamodb
+import boto3
+from boto3.dynamodb.conditions import Key
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+import checkpoints
+from checkpoints import locate_page, checkpoint_pk
+from browsequotes_handler import lambda_handler as browse_lambda
+from createquotes_handler import lambda_handler as create_lambda
+from build_checkpoints import build_all
+import quotes_handler
+
+TABLE_NAME = "NovaMuseQuotes"
+
+
+@pytest.fixture
+def dynamodb_table():
+    with mock_dynamodb():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+                {"AttributeName": "GSI1PK", "AttributeType": "S"},
+                {"AttributeName": "GSI1SK", "AttributeType": "S"},
+                {"AttributeName": "GSI2PK", "AttributeType": "S"},
+                {"AttributeName": "GSI2SK", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "GSI1-Genre",
+                    "KeySchema": [
+                        {"AttributeName": "GSI1PK", "KeyType": "HASH"},
+                        {"AttributeName": "GSI1SK", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+                {
+                    "IndexName": "GSI2-Author",
+                    "KeySchema": [
+                        {"AttributeName": "GSI2PK", "KeyType": "HASH"},
+                        {"AttributeName": "GSI2SK", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield table
+
+
+def put_quotes(table, count):
+    for i in range(count):
+        created_at = f"2024-01-01T00:00:{i:02d}Z"
+        table.put_item(
+            Item={
+                "PK": f"QUOTE#{i:03d}",
+                "SK": "METADATA",
+                "quoteId": f"{i:03d}",
+                "text": f"Quote number {i}",
+                "author": "Author A",
+                "genre": "sci-fi",
+                "source": "Test Source",
+                "createdAt": created_at,
+                "GSI1PK": "GENRE#sci-fi",
+                "GSI1SK": f"CREATED#{created_at}",
+                "GSI2PK": "AUTHOR#Author A",
+                "GSI2SK": f"CREATED#{created_at}",
+            }
+        )
+
+
+def test_create_records_checkpoints(dynamodb_table, monkeypatch):
+    monkeypatch.setattr(checkpoints, "CHECKPOINT_EVERY", 2)
+    for i in range(5):
+        event = {
+            "requestContext": {"authorizer": {"claims": {"cognito:groups": "admins"}}},
+            "body": json.dumps(
+                {
+                    "text": f"Checkpoint quote {i}",
+                    "author": "Tester",
+                    "genre": "sci-fi",
+                    "source": "Book",
+                }
+            ),
+        }
+        assert create_lambda(event, None)["statusCode"] == 201
+
+    items = dynamodb_table.query(
+        KeyConditionExpression=Key("PK").eq(checkpoint_pk("GENRE#sci-fi"))
+    )["Items"]
+    meta = [i for i in items if i["SK"] == "META"][0]
+    offsets = sorted(int(i["offset"]) for i in items if i["SK"] != "META")
+    assert meta["itemCount"] == 5
+    assert offsets == [0, 2, 4]
+
+
+def test_locate_page_uses_nearest_checkpoint(dynamodb_table):
+    put_quotes(dynamodb_table, 20)
+    build_all(dynamodb_table, every=5)
+
+    # Page 1 always starts at the top
+    assert locate_page(dynamodb_table, "GENRE#sci-fi", 1, 5) == (20, None, 0)
+
+    # Page 2 of 5 ends at position 15, exactly a checkpoint
+    total, checkpoint, skip = locate_page(dynamodb_table, "GENRE#sci-fi", 2, 5)
+    assert checkpoint["itemPK"] == "QUOTE#015"
+    assert skip == 0
+
+    # Page 3 of 4 ends at 12; the nearest checkpoint above is 15
+    total, checkpoint, skip = locate_page(dynamodb_table, "GENRE#sci-fi", 3, 4)
+    assert checkpoint["itemPK"] == "QUOTE#015"
+    assert skip == 3
+
+    # Nothing above 17 but the newest end itself
+    total, checkpoint, skip = locate_page(dynamodb_table, "GENRE#sci-fi", 2, 3)
+    assert checkpoint is None
+    assert skip == 3
+
+
+def test_browse_page_reports_page_numbers(dynamodb_table):
+    put_quotes(dynamodb_table, 20)
+    build_all(dynamodb_table, every=5)
+
+    event = {"queryStringParameters": {"genre": "sci-fi", "limit": "5", "page": "2"}}
+    response = browse_lambda(event, None)
+    body = json.loads(response["body"])
+    assert response["statusCode"] == 200
+    assert body["page"] == 2
+    assert body["totalPages"] == 4
+    assert 0 < len(body["items"]) <= 5
+
+    event["queryStringParameters"]["page"] = "9"
+    body = json.loads(browse_lambda(event, None)["body"])
+    assert body["items"] == []
+
+
+def test_browse_page_requires_single_listing(dynamodb_table):
+    event = {"queryStringParameters": {"page": "2"}}
+    assert browse_lambda(event, None)["statusCode"] == 400
+
+    event = {"queryStringParameters": {"genre": "sci-fi", "page": "zero"}}
+    assert browse_lambda(event, None)["statusCode"] == 400
+
+
+def test_random_position_covers_every_offset(dynamodb_table):
+    put_quotes(dynamodb_table, 23)
+    build_all(dynamodb_table, every=5)
+
+    offsets = set()
+    for _ in range(400):
+        checkpoint, skip = checkpoints.random_position(
+            dynamodb_table, "GENRE#sci-fi", 5
+        )
+        first = int(checkpoint["offset"]) + 1 if checkpoint else 0
+        offsets.add(first + skip)
+    assert offsets == set(range(23))
+
+
+def test_random_samples_reach_every_quote(dynamodb_table, monkeypatch):
+    put_quotes(dynamodb_table, 23)
+    build_all(dynamodb_table, every=5)
+    monkeypatch.setattr(checkpoints, "CHECKPOINT_EVERY", 5)
+    monkeypatch.setattr(quotes_handler, "RANDOM_POOL", 2)
+
+    seen = set()
+    for _ in range(300):
+        ids, _ = quotes_handler.sample_ids("sci-fi", 1)
+        seen.update(ids)
+    assert seen == {f"{i:03d}" for i in range(23)}
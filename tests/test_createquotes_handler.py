@@ -15,6 +15,7 @@ sys.path.insert(
 # MUST be set before importing lambda
 os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
 
+import createquotes_handler
 from createquotes_handler import lambda_handler
 
 TABLE_NAME = "NovaMuseQuotes"
@@ -96,7 +97,7 @@ def test_create_quote_success(dynamodb_table):
     assert body["message"] == "Quote created successfully"
 
     # Verify item exists in DynamoDB
-    items = dynamodb_table.scan()["Items"]
+    items = [i for i in dynamodb_table.scan()["Items"] if i["PK"].startswith("QUOTE#")]
     assert len(items) == 1
     assert items[0]["author"] == "Yoda"
 
@@ -186,10 +187,11 @@ def test_create_quote_dynamodb_failure(dynamodb_table):
         ),
     }
 
-    with patch("createquotes_handler.table.put_item") as mock_put:
+    client = createquotes_handler.table.meta.client
+    with patch.object(client, "transact_write_items") as mock_put:
         mock_put.side_effect = ClientError(
             error_response={"Error": {"Code": "SomeOtherError", "Message": "fail"}},
-            operation_name="PutItem",
+            operation_name="TransactWriteItems",
         )
         with pytest.raises(ClientError):
             lambda_handler(event, None)
@@ -208,11 +210,12 @@ def test_create_quote_fields_present(dynamodb_table):
         ),
     }
     response = lambda_handler(event, None)
-    items = dynamodb_table.scan()["Items"]
+    items = [i for i in dynamodb_table.scan()["Items"] if i["PK"].startswith("QUOTE#")]
     item = items[0]
     assert "createdAt" in item
     assert "quoteId" in item
-    assert len(item["quoteId"]) == 8
+    assert len(item["quoteId"]) == 16
+    assert json.loads(response["body"])["quoteId"] == item["quoteId"]
 
 
 def test_create_quote_groups_as_list(dynamodb_table):
@@ -245,13 +248,14 @@ def test_create_quote_dynamodb_unexpected_error(dynamodb_table):
         ),
     }
 
-    # Patch the table's put_item to raise a different ClientError
-    with patch("createquotes_handler.table.put_item") as mock_put:
+    # Patch the quote's transaction to raise a different ClientError
+    client = createquotes_handler.table.meta.client
+    with patch.object(client, "transact_write_items") as mock_put:
         mock_error = ClientError(
             error_response={
                 "Error": {"Code": "ProvisionedThroughputExceededException"}
             },
-            operation_name="PutItem",
+            operation_name="TransactWriteItems",
         )
         mock_put.side_effect = mock_error
 
@@ -0,0 +1,155 @@
+import os
+import sys
+import json
+import base64
+from unittest.mock import patch
+import pytest
+import boto3
+from moto import mock_secretsmanager
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+import browsequotes_handler
+import cursors
+from cursors import (
+    CursorError,
+    CursorScope,
+    ShardedKeys,
+    decode_cursor,
+    encode_cursor,
+    genre_scope,
+    index_scope,
+    table_scope,
+    tags_scope,
+)
+
+GENRE_KEY = {
+    "PK": "QUOTE#1a2b3c4d",
+    "SK": "METADATA",
+    "GSI1PK": "GENRE#sci-fi",
+    "GSI1SK": "CREATED#2024-05-01T10:00:00.123456Z",
+}
+
+
+def legacy_cursor(key):
+    # The previous format: the whole LastEvaluatedKey as base64 JSON
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def test_round_trips_and_shrinks():
+    author_key = {
+        **GENRE_KEY,
+        "GSI2PK": "AUTHOR#Isaac Asimov",
+        "GSI2SK": GENRE_KEY["GSI1SK"],
+    }
+    del author_key["GSI1PK"], author_key["GSI1SK"]
+    cases = [
+        (table_scope(), {"PK": "QUOTE#1a2b3c4d", "SK": "METADATA"}),
+        (genre_scope("sci-fi"), GENRE_KEY),
+        (
+            index_scope("GSI2-Author", "GSI2PK", "GSI2SK", "AUTHOR#Isaac Asimov"),
+            author_key,
+        ),
+        (
+            tags_scope(["hope", "fear"]),
+            {"PK": "TAG#hope", "SK": "QUOTE#1a2b3c4d"},
+        ),
+    ]
+    for scope, key in cases:
+        cursor = encode_cursor(key, scope)
+        assert decode_cursor(cursor, scope) == key
+        assert len(cursor) < len(legacy_cursor(key))
+    # Index keys shrink the most: the partition comes from the request
+    cursor = encode_cursor(GENRE_KEY, genre_scope("sci-fi"))
+    assert len(cursor) < len(legacy_cursor(GENRE_KEY)) / 2
+
+
+def test_sharded_genre_positions(monkeypatch):
+    monkeypatch.setattr(
+        cursors,
+        "genre_partition_keys",
+        lambda genre: [f"GENRE#{genre}#{n}" for n in range(3)],
+    )
+    scope = genre_scope("sci-fi")
+    assert isinstance(scope.layout, ShardedKeys)
+    position = {
+        "shards": {
+            "GENRE#sci-fi#0": {**GENRE_KEY, "GSI1PK": "GENRE#sci-fi#0"},
+            "GENRE#sci-fi#2": None,
+        }
+    }
+    cursor = encode_cursor(position, scope)
+    assert decode_cursor(cursor, scope) == position
+    assert len(cursor) < len(legacy_cursor(position)) / 2
+
+
+def test_unexpected_keys_fall_back_to_signed_json():
+    scope = genre_scope("sci-fi")
+    key = {**GENRE_KEY, "GSI1PK": "GENRE#sci-fi#7"}
+    assert decode_cursor(encode_cursor(key, scope), scope) == key
+    assert decode_cursor(encode_cursor({"a": 1}, CursorScope("x")), CursorScope("x"))
+
+
+def test_rejects_tampered_and_foreign_cursors():
+    scope = genre_scope("sci-fi")
+    cursor = encode_cursor(GENRE_KEY, scope)
+    flipped = cursor[:10] + ("A" if cursor[10] != "A" else "B") + cursor[11:]
+    for bad in (flipped, cursor[:-3], "x", "!!!!", legacy_cursor(GENRE_KEY)):
+        with pytest.raises(CursorError):
+            decode_cursor(bad, scope)
+    with pytest.raises(CursorError, match="different listing"):
+        decode_cursor(cursor, genre_scope("fantasy"))
+    with pytest.raises(CursorError, match="different listing"):
+        decode_cursor(cursor, genre_scope("sci-fi", author="Isaac Asimov"))
+
+
+def test_signed_with_the_configured_secret(monkeypatch):
+    cursor = encode_cursor(GENRE_KEY, genre_scope("sci-fi"))
+    monkeypatch.setattr(cursors, "CURSOR_SECRET", "rotated")
+    with pytest.raises(CursorError):
+        decode_cursor(cursor, genre_scope("sci-fi"))
+
+
+def test_missing_secret_fails_closed(monkeypatch):
+    cursor = encode_cursor(GENRE_KEY, genre_scope("sci-fi"))
+    monkeypatch.setattr(cursors, "CURSOR_SECRET", None)
+    with pytest.raises(RuntimeError, match="CURSOR_SECRET"):
+        encode_cursor(GENRE_KEY, genre_scope("sci-fi"))
+    with pytest.raises(RuntimeError, match="CURSOR_SECRET"):
+        decode_cursor(cursor, genre_scope("sci-fi"))
+
+
+def test_secret_read_from_secrets_manager(monkeypatch):
+    monkeypatch.delenv("CURSOR_SECRET")
+    assert cursors._load_secret() is None
+    with mock_secretsmanager():
+        client = boto3.client("secretsmanager", region_name="us-east-1")
+        arn = client.create_secret(Name="cursor", SecretString="from-arn")["ARN"]
+        monkeypatch.setenv("CURSOR_SECRET_ARN", arn)
+        assert cursors._load_secret() == "from-arn"
+        # A plain key still wins
+        monkeypatch.setenv("CURSOR_SECRET", "local")
+        assert cursors._load_secret() == "local"
+
+
+def test_browse_rejects_bad_cursor_before_dynamodb():
+    cursor = encode_cursor(GENRE_KEY, genre_scope("sci-fi"))
+    with patch.object(browsequotes_handler.table, "query") as mock_query, patch.object(
+        browsequotes_handler.table, "scan"
+    ) as mock_scan:
+        for params in (
+            {"genre": "fantasy", "cursor": cursor},
+            {"author": "Isaac Asimov", "cursor": cursor},
+            {"genre": "sci-fi", "cursor": cursor[:-2]},
+            {"cursor": legacy_cursor(GENRE_KEY)},
+        ):
+            event = {"queryStringParameters": params}
+            response = browsequotes_handler.lambda_handler(event, None)
+            assert response["statusCode"] == 400
+    mock_query.assert_not_called()
+    mock_scan.assert_not_called()
@@ -0,0 +1,144 @@
+import os
+import sys
+import json
+import pytest
+from moto import mock_dynamodb
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+from browsequotes_handler import lambda_handler as browse_lambda
+from build_facets import build
+from createquotes_handler import lambda_handler as create_lambda
+from deletequote_handler import lambda_handler as delete_lambda
+from facets import facet_counts, facet_keys
+from updatequote_handler import lambda_handler as update_lambda
+
+TABLE_NAME = "NovaMuseQuotes"
+ADMIN = {"authorizer": {"claims": {"cognito:groups": "admins"}}}
+QUOTES = [
+    ("Fear is the mind-killer.", "Paul Atreides", "sci-fi"),
+    ("I must not fear.", "Paul Atreides", "sci-fi"),
+    ("The spice must flow.", "Baron", "sci-fi"),
+    ("He who controls the spice controls the universe.", "Baron", "sci-fi"),
+    ("Long live the fighters.", "Baron", "sci-fi"),
+    ("Not all those who wander are lost.", "Bilbo Baggins", "fantasy"),
+    ("The desert takes the weak.", "Paul Atreides", "fantasy"),
+]
+
+
+@pytest.fixture
+def dynamodb_table():
+    with mock_dynamodb():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": name, "AttributeType": "S"}
+                for name in ("PK", "SK", "GSI1PK", "GSI1SK", "GSI2PK", "GSI2SK")
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": f"GSI{n}-{name}",
+                    "KeySchema": [
+                        {"AttributeName": f"GSI{n}PK", "KeyType": "HASH"},
+                        {"AttributeName": f"GSI{n}SK", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                }
+                for n, name in ((1, "Genre"), (2, "Author"))
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        for text, author, genre in QUOTES:
+            event = {
+                "requestContext": ADMIN,
+                "body": json.dumps(
+                    {"text": text, "author": author, "genre": genre, "source": "s"}
+                ),
+            }
+            assert create_lambda(event, None)["statusCode"] == 201
+        yield table
+
+
+def browse(**params):
+    response = browse_lambda({"queryStringParameters": params}, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def quote_id(table, text):
+    items = table.scan()["Items"]
+    return next(i["quoteId"] for i in items if i.get("text") == text)
+
+
+def test_genre_page_lists_authors_largest_first(dynamodb_table):
+    status, body = browse(genre="sci-fi", limit="2", facets="true")
+    assert status == 200
+    assert len(body["items"]) == 2
+    assert body["facets"] == {"author": {"Baron": 3, "Paul Atreides": 2}}
+
+    status, body = browse(author="Paul Atreides", facets="true", page="1")
+    assert status == 200
+    assert body["facets"] == {"genre": {"sci-fi": 2, "fantasy": 1}}
+
+    # Off by default
+    assert "facets" not in browse(genre="sci-fi")[1]
+
+
+def test_edits_and_deletes_move_counts(dynamodb_table):
+    event = {
+        "requestContext": ADMIN,
+        "pathParameters": {"quoteId": quote_id(dynamodb_table, "The spice must flow.")},
+        "body": json.dumps({"genre": "fantasy", "author": "Paul Atreides"}),
+    }
+    assert update_lambda(event, None)["statusCode"] == 200
+    assert facet_counts(dynamodb_table, "genre", "sci-fi") == {
+        "Baron": 2,
+        "Paul Atreides": 2,
+    }
+    assert facet_counts(dynamodb_table, "author", "Paul Atreides") == {
+        "fantasy": 2,
+        "sci-fi": 2,
+    }
+
+    event = {
+        "requestContext": ADMIN,
+        "pathParameters": {"quoteId": quote_id(dynamodb_table, QUOTES[5][0])},
+    }
+    assert delete_lambda(event, None)["statusCode"] == 200
+    # Empty pairs drop out
+    assert facet_counts(dynamodb_table, "genre", "fantasy") == {"Paul Atreides": 2}
+
+
+def test_rebuild_repairs_drift(dynamodb_table):
+    for key in facet_keys("sci-fi", "Baron"):
+        dynamodb_table.delete_item(Key=key)
+    dynamodb_table.put_item(
+        Item={
+            **facet_keys("horror", "Nobody")[0],
+            "genre": "horror",
+            "author": "Nobody",
+            "quoteCount": 4,
+        }
+    )
+    assert build(dynamodb_table) == 4
+    assert facet_counts(dynamodb_table, "genre", "sci-fi")["Baron"] == 3
+    assert facet_counts(dynamodb_table, "author", "Baron") == {"sci-fi": 3}
+    assert facet_counts(dynamodb_table, "genre", "horror") == {}
+
+
+def test_facets_need_genre_or_author(dynamodb_table):
+    assert browse(facets="true")[0] == 400
+    assert browse(source="s", facets="true")[0] == 400
+    assert browse(genre="sci-fi", tags="fear", facets="true")[0] == 400
+    assert browse(genre="sci-fi", facets="yes")[0] == 400
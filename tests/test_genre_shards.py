@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import pytest
+from moto import mock_dynamodb
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+import genre_shards
+from genre_shards import (
+    genre_from_partition_key,
+    genre_partition_key,
+    genre_partition_keys,
+    query_genre,
+)
+from browsequotes_handler import lambda_handler as browse_lambda
+from listgenres_handler import lambda_handler as genres_lambda
+import migrate
+
+TABLE_NAME = "NovaMuseQuotes"
+
+
+@pytest.fixture
+def dynamodb_table():
+    with mock_dynamodb():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+                {"AttributeName": "GSI1PK", "AttributeType": "S"},
+                {"AttributeName": "GSI1SK", "AttributeType": "S"},
+                {"AttributeName": "GSI2PK", "AttributeType": "S"},
+                {"AttributeName": "GSI2SK", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "GSI1-Genre",
+                    "KeySchema": [
+                        {"AttributeName": "GSI1PK", "KeyType": "HASH"},
+                        {"AttributeName": "GSI1SK", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+                {
+                    "IndexName": "GSI2-Author",
+                    "KeySchema": [
+                        {"AttributeName": "GSI2PK", "KeyType": "HASH"},
+                        {"AttributeName": "GSI2SK", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield table
+
+
+def put_quotes(table, count, shards):
+    for i in range(count):
+        created_at = f"2024-01-01T00:00:{i:02d}Z"
+        quote_id = f"q{i:03d}"
+        table.put_item(
+            Item={
+                "PK": f"QUOTE#{quote_id}",
+                "SK": "METADATA",
+                "quoteId": quote_id,
+                "text": f"Quote number {i}",
+                "author": "Author A",
+                "genre": "sci-fi",
+                "source": "Test Source",
+                "createdAt": created_at,
+                "GSI1PK": genre_partition_key("sci-fi", quote_id, shards),
+                "GSI1SK": f"CREATED#{created_at}",
+                "GSI2PK": "AUTHOR#Author A",
+                "GSI2SK": f"CREATED#{created_at}",
+            }
+        )
+
+
+def test_partition_keys():
+    assert genre_partition_key("sci-fi", "abc", 1) == "GENRE#sci-fi"
+    assert genre_partition_key("sci-fi", "abc", 4).startswith("GENRE#sci-fi#")
+    assert len(genre_partition_keys("sci-fi", 4, previous=0)) == 4
+    assert "GENRE#sci-fi" in genre_partition_keys("sci-fi", 4, previous=1)
+    # 4 -> 6 shards: the old layout's partitions are all among the new ones
+    assert len(genre_partition_keys("sci-fi", 6, previous=4)) == 6
+    assert len(genre_partition_keys("sci-fi", 2, previous=4)) == 4
+    assert genre_from_partition_key("GENRE#sci-fi#3", 4) == "sci-fi"
+    assert genre_from_partition_key("GENRE#sci-fi", 4) == "sci-fi"
+    # Without sharding a trailing number is part of the name
+    assert genre_from_partition_key("GENRE#top#10", 1) == "top#10"
+    assert genre_from_partition_key("GENRE#top#10", 4) == "top#10"
+
+
+def test_sharded_query_merges_in_order(dynamodb_table):
+    put_quotes(dynamodb_table, 20, 4)
+
+    seen = []
+    start = None
+    while True:
+        items, start = query_genre(dynamodb_table, "sci-fi", 6, start=start, shards=4)
+        seen.extend(item["text"] for item in items)
+        if not start:
+            break
+
+    assert seen == [f"Quote number {i}" for i in range(20)]
+
+
+def test_browse_pages_across_shards(dynamodb_table, monkeypatch):
+    monkeypatch.setattr(genre_shards, "GENRE_SHARDS", 4)
+    put_quotes(dynamodb_table, 12, 4)
+
+    # moto applies Limit before reversing descending queries, so paging order
+    # is covered by the ascending test above
+    event = {"queryStringParameters": {"genre": "sci-fi", "limit": "50"}}
+    body = json.loads(browse_lambda(event, None)["body"])
+
+    assert sorted(i["text"] for i in body["items"]) == sorted(
+        f"Quote number {i}" for i in range(12)
+    )
+    assert all("GSI1SK" not in item for item in body["items"])
+    assert body["nextCursor"] is None
+
+
+def test_list_genres_strips_shard_suffix(dynamodb_table, monkeypatch):
+    monkeypatch.setattr(genre_shards, "GENRE_SHARDS", 4)
+    put_quotes(dynamodb_table, 8, 4)
+    body = json.loads(genres_lambda({}, None)["body"])
+    assert body == ["sci-fi"]
+
+
+def test_migrate_moves_legacy_items(dynamodb_table, monkeypatch):
+    put_quotes(dynamodb_table, 10, 1)
+    monkeypatch.setattr(genre_shards, "GENRE_SHARDS", 4)
+
+    counts = migrate.run(dynamodb_table, "genre-shards", segments=1)
+    assert (counts["updated"], counts["unchanged"]) == (10, 0)
+
+    items, _ = query_genre(dynamodb_table, "sci-fi", 50, shards=4)
+    assert len(items) == 10
+
+    # Re-running is a no-op
+    counts = migrate.run(dynamodb_table, "genre-shards", segments=1, restart=True)
+    assert (counts["updated"], counts["unchanged"]) == (0, 10)
+
+
+def test_reads_cover_both_layouts_while_resharding(dynamodb_table, monkeypatch):
+    put_quotes(dynamodb_table, 12, 3)
+    monkeypatch.setattr(genre_shards, "GENRE_SHARDS", 2)
+    monkeypatch.setattr(genre_shards, "PREVIOUS_SHARDS", 3)
+    # Half way through the move from 3 shards to 2
+    for item in dynamodb_table.scan()["Items"][:6]:
+        changes = migrate.reshard_genre(item)
+        dynamodb_table.update_item(
+            Key={"PK": item["PK"], "SK": item["SK"]},
+            UpdateExpression="SET GSI1PK = :pk",
+            ExpressionAttributeValues={":pk": changes["GSI1PK"]},
+        )
+
+    items, _ = query_genre(dynamodb_table, "sci-fi", 50)
+    assert sorted(i["text"] for i in items) == sorted(
+        f"Quote number {i}" for i in range(12)
+    )
@@ -0,0 +1,249 @@
+import os
+import sys
+import json
+from unittest.mock import patch
+import pytest
+from moto import mock_dynamodb
+import boto3
+from botocore.exceptions import ClientError
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+import idempotency
+import write_path
+import createquotes_handler
+from createquotes_handler import lambda_handler
+from write_path import WriteTimer
+
+TABLE_NAME = "NovaMuseQuotes"
+THROTTLED = ClientError(
+    error_response={"Error": {"Code": "ProvisionedThroughputExceededException"}},
+    operation_name="TransactWriteItems",
+)
+
+
+@pytest.fixture
+def dynamodb_table(monkeypatch):
+    monkeypatch.setattr(write_path, "WRITE_BASE_DELAY", 0)
+    with mock_dynamodb():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield table
+
+
+def create_event(text="Do or do not.", key=None):
+    event = {
+        "requestContext": {
+            "authorizer": {"claims": {"cognito:groups": "admins", "sub": "admin-1"}}
+        },
+        "body": json.dumps(
+            {"text": text, "author": "Yoda", "genre": "sci-fi", "source": "ESB"}
+        ),
+    }
+    if key:
+        event["headers"] = {"idempotency-key": key}
+    return event
+
+
+def quote_count(table):
+    items = table.scan()["Items"]
+    return len([i for i in items if i["PK"].startswith("QUOTE#")])
+
+
+def genre_count(table):
+    meta = table.get_item(Key={"PK": "CHECKPOINTS#GENRE#sci-fi", "SK": "META"})
+    return int(meta["Item"]["itemCount"])
+
+
+def test_retry_with_same_key_replays(dynamodb_table):
+    first = lambda_handler(create_event(key="import-1"), None)
+    second = lambda_handler(create_event(key="import-1"), None)
+
+    assert first["statusCode"] == second["statusCode"] == 201
+    assert second["body"] == first["body"]
+    assert second["headers"]["Idempotent-Replayed"] == "true"
+    assert quote_count(dynamodb_table) == 1
+    assert genre_count(dynamodb_table) == 1
+
+
+def test_real_duplicate_without_key_conflicts(dynamodb_table):
+    assert lambda_handler(create_event(), None)["statusCode"] == 201
+    assert lambda_handler(create_event(), None)["statusCode"] == 409
+
+
+def test_key_reused_for_other_body(dynamodb_table):
+    lambda_handler(create_event(key="k"), None)
+    response = lambda_handler(create_event(text="Something else.", key="k"), None)
+    assert response["statusCode"] == 422
+
+
+def test_key_in_progress(dynamodb_table):
+    body = json.loads(create_event()["body"])
+    idempotency.begin(dynamodb_table, "admin-1", "k", idempotency.request_hash(body))
+    assert lambda_handler(create_event(key="k"), None)["statusCode"] == 409
+
+
+def test_expired_record_can_be_reclaimed(dynamodb_table):
+    fingerprint = idempotency.request_hash({"a": 1})
+    assert idempotency.begin(dynamodb_table, "s", "k", fingerprint, now=0) is None
+    later = idempotency.IDEMPOTENCY_TTL + 1
+    assert idempotency.begin(dynamodb_table, "s", "k", fingerprint, now=later) is None
+
+
+def test_throttled_put_is_retried(dynamodb_table):
+    client = createquotes_handler.table.meta.client
+    real_write = client.transact_write_items
+    with patch.object(client, "transact_write_items") as mock_write:
+        mock_write.side_effect = iter_effects(THROTTLED, real_write)
+        response = lambda_handler(create_event(), None)
+
+    assert response["statusCode"] == 201
+    assert "put;dur=" in response["headers"]["Server-Timing"]
+    assert quote_count(dynamodb_table) == 1
+
+
+def test_applied_but_throttled_write_is_not_a_duplicate(dynamodb_table):
+    client = createquotes_handler.table.meta.client
+    real_write = client.transact_write_items
+
+    def applied_then_throttled(**kwargs):
+        real_write(**kwargs)
+        raise THROTTLED
+
+    with patch.object(client, "transact_write_items") as mock_write:
+        mock_write.side_effect = iter_effects(applied_then_throttled, real_write)
+        response = lambda_handler(create_event(), None)
+
+    assert response["statusCode"] == 201
+    assert genre_count(dynamodb_table) == 1
+
+
+def test_failed_write_releases_key(dynamodb_table):
+    client = createquotes_handler.table.meta.client
+    with patch.object(client, "transact_write_items", side_effect=THROTTLED):
+        with pytest.raises(ClientError):
+            lambda_handler(create_event(key="k"), None)
+
+    # Nothing of the failed attempt was written, bookkeeping included
+    assert quote_count(dynamodb_table) == 0
+    assert lambda_handler(create_event(key="k"), None)["statusCode"] == 201
+    assert genre_count(dynamodb_table) == 1
+
+
+def test_bookkeeping_commits_with_the_quote(dynamodb_table):
+    assert lambda_handler(create_event(), None)["statusCode"] == 201
+    keys = {(item["PK"], item["SK"]) for item in dynamodb_table.scan()["Items"]}
+    assert {
+        ("CHECKPOINTS#GENRE#sci-fi", "META"),
+        ("CHECKPOINTS#AUTHOR#Yoda", "META"),
+        ("FACETS#GENRE#sci-fi", "AUTHOR#Yoda"),
+        ("FACETS#AUTHOR#Yoda", "GENRE#sci-fi"),
+        ("META#CATALOG", "VERSION"),
+    } <= keys
+    assert any(pk.startswith("TEXT#") for pk, _ in keys)
+
+
+def test_abandoned_claim_expires_after_the_lease(dynamodb_table):
+    fingerprint = idempotency.request_hash({"a": 1})
+    assert idempotency.begin(dynamodb_table, "s", "k", fingerprint, now=0) is None
+    with pytest.raises(idempotency.IdempotencyError):
+        idempotency.begin(dynamodb_table, "s", "k", fingerprint, now=1)
+    later = idempotency.IDEMPOTENCY_LEASE + 1
+    assert idempotency.begin(dynamodb_table, "s", "k", fingerprint, now=later) is None
+
+    # A completed record is replayed for the full TTL
+    response = {"statusCode": 201, "body": "{}"}
+    idempotency.complete(dynamodb_table, "s", "k", response, now=later)
+    stored = idempotency.begin(dynamodb_table, "s", "k", fingerprint, now=later * 2)
+    assert stored == response
+
+
+def test_non_throttle_errors_are_not_retried():
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise ClientError({"Error": {"Code": "ValidationException"}}, "PutItem")
+
+    timer = WriteTimer(sleep=lambda _: None)
+    with pytest.raises(ClientError):
+        timer.call(fail)
+    assert len(calls) == 1
+    assert timer.retries == 0
+
+
+def test_counters_are_not_retried_after_unknown_outcomes():
+    calls = []
+    unavailable = ClientError({"Error": {"Code": "ServiceUnavailable"}}, "UpdateItem")
+
+    class Table:
+        def update_item(self, **kwargs):
+            calls.append(kwargs["UpdateExpression"])
+            if len(calls) == 1:
+                raise unavailable
+
+    writer = WriteTimer(sleep=lambda _: None).wrap(Table())
+    # A SET can simply be repeated...
+    writer.update_item(UpdateExpression="SET genre = :g")
+    assert calls == ["SET genre = :g"] * 2
+
+    # ...but the failed ADD may have been applied already
+    calls.clear()
+    with pytest.raises(ClientError):
+        writer.update_item(UpdateExpression="ADD itemCount :one")
+    assert len(calls) == 1
+
+
+def test_batch_get_chunks_and_retries_unprocessed_keys(monkeypatch):
+    monkeypatch.setattr(write_path, "WRITE_BASE_DELAY", 0)
+    requests = []
+
+    class Client:
+        def batch_get_item(self, RequestItems):
+            keys = RequestItems["t"]["Keys"]
+            requests.append(len(keys))
+            # The first request of each chunk leaves its last key unprocessed
+            unprocessed = {}
+            if len(requests) in (1, 3):
+                unprocessed = {"t": {**RequestItems["t"], "Keys": keys[-1:]}}
+                keys = keys[:-1]
+            return {"Responses": {"t": keys}, "UnprocessedKeys": unprocessed}
+
+    class Table:
+        name = "t"
+        meta = type("Meta", (), {"client": Client()})
+
+    keys = [{"PK": f"QUOTE#{i}", "SK": "METADATA"} for i in range(150)]
+    found = write_path.batch_get(Table(), keys, ProjectionExpression="PK")
+    assert requests == [100, 1, 50, 1]
+    assert sorted(item["PK"] for item in found) == sorted(k["PK"] for k in keys)
+
+def iter_effects(*effects):
+    # Call-by-call behaviour: exceptions are raised, callables are invoked;
+    # the last one repeats
+    last = effects[-1]
+    effects = iter(effects)
+
+    def side_effect(**kwargs):
+        effect = next(effects, last)
+        if isinstance(effect, Exception):
+            raise effect
+        return effect(**kwargs)
+
+    return side_effect
@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import zlib
+import pytest
+from moto import mock_dynamodb
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+import migrate
+from browsequotes_handler import lambda_handler as browse_lambda
+from createquotes_handler import lambda_handler as create_lambda
+from deletequote_handler import lambda_handler as delete_lambda
+from item_format import (
+    COMPRESSED_TEXT,
+    FORMAT_ATTR,
+    decode_item,
+    encode_item,
+    pack_text,
+)
+from quote_items import build_item
+from quote_text import find_quote_id
+from storage import SqliteStorage
+from topquotes_handler import lambda_handler as top_lambda
+from updatequote_handler import lambda_handler as update_lambda
+
+TABLE_NAME = "NovaMuseQuotes"
+ADMIN = {"authorizer": {"claims": {"cognito:groups": "admins"}}}
+LONG_TEXT = (
+    "It is not the critic who counts; not the man who points out how the "
+    "strong man stumbles, or where the doer of deeds could have done them "
+    "better. The credit belongs to the man who is actually in the arena, "
+    "whose face is marred by dust and sweat and blood; who strives valiantly; "
+    "who errs, who comes short again and again, because there is no effort "
+    "without error and shortcoming."
+)
+
+
+def gsi(name, pk, sk, **projection):
+    return {
+        "IndexName": name,
+        "KeySchema": [
+            {"AttributeName": pk, "KeyType": "HASH"},
+            {"AttributeName": sk, "KeyType": "RANGE"},
+        ],
+        "Projection": projection or {"ProjectionType": "ALL"},
+    }
+
+
+@pytest.fixture
+def dynamodb_table():
+    with mock_dynamodb():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": name, "AttributeType": "S"}
+                for name in ("PK", "SK", "GSI1PK", "GSI1SK", "GSI3PK")
+            ]
+            + [{"AttributeName": "score", "AttributeType": "N"}],
+            GlobalSecondaryIndexes=[
+                gsi("GSI1-Genre", "GSI1PK", "GSI1SK"),
+                # Same projection as the stack: no compressed text
+                gsi(
+                    "GSI3-Top",
+                    "GSI3PK",
+                    "score",
+                    ProjectionType="INCLUDE",
+                    NonKeyAttributes=[
+                        "quoteId",
+                        "text",
+                        "author",
+                        "genre",
+                        "source",
+                        "tags",
+                        "createdAt",
+                        "views",
+                        "shares",
+                    ],
+                ),
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        event = {
+            "requestContext": ADMIN,
+            "body": json.dumps(
+                {
+                    "text": LONG_TEXT,
+                    "author": "Theodore Roosevelt",
+                    "genre": "history",
+                    "source": "Citizenship in a Republic",
+                }
+            ),
+        }
+        assert create_lambda(event, None)["statusCode"] == 201
+        yield table
+
+
+def stored(table, quote_id):
+    key = {"PK": f"QUOTE#{quote_id}", "SK": "METADATA"}
+    return table.get_item(Key=key).get("Item")
+
+
+def test_encode_and_decode():
+    item = build_item("q1", LONG_TEXT, "A", "g", "s", "2024-01-01T00:00:00Z")
+    encoded = encode_item(item)
+    assert "text" not in encoded
+    assert encoded[FORMAT_ATTR] == 2
+    assert len(encoded[COMPRESSED_TEXT]) < len(LONG_TEXT)
+    assert decode_item(dict(encoded)) == item
+
+    # Short text stays plain (as does everything with compression off);
+    # plain items decode unchanged
+    short = build_item("q2", "I am Groot.", "Groot", "g", "s", "t")
+    assert encode_item(short) == short
+    assert pack_text(LONG_TEXT, minimum=0) is None
+    assert decode_item(dict(short)) == short
+
+    with pytest.raises(ValueError):
+        decode_item({**encoded, FORMAT_ATTR: 99})
+
+
+def test_unchanged_text_keeps_stored_bytes():
+    item = build_item("q1", LONG_TEXT, "A", "g", "s", "t")
+    # Bytes written by some other zlib build must not look like an edit
+    packed = zlib.compress(LONG_TEXT.encode(), 1)
+    old = decode_item(
+        {**encode_item(item), COMPRESSED_TEXT: packed}, keep_stored=True
+    )
+    assert encode_item(old)[COMPRESSED_TEXT] == packed
+    assert encode_item({**old, "text": LONG_TEXT + "!"})[COMPRESSED_TEXT] != packed
+
+
+def test_long_quote_is_stored_compressed_and_read_plain(dynamodb_table):
+    quote_id = find_quote_id(dynamodb_table, LONG_TEXT)
+    item = stored(dynamodb_table, quote_id)
+    assert "text" not in item and COMPRESSED_TEXT in item
+
+    event = {"queryStringParameters": {"genre": "history"}}
+    body = json.loads(browse_lambda(event, None)["body"])
+    assert body["items"][0]["text"] == LONG_TEXT
+    assert COMPRESSED_TEXT not in body["items"][0]
+
+
+def test_admin_edits_compressed_quote(dynamodb_table):
+    quote_id = find_quote_id(dynamodb_table, LONG_TEXT)
+    event = {
+        "requestContext": ADMIN,
+        "pathParameters": {"quoteId": quote_id},
+        "body": json.dumps({"genre": "speeches"}),
+    }
+    assert update_lambda(event, None)["statusCode"] == 200
+    assert stored(dynamodb_table, quote_id)["genre"] == "speeches"
+
+    event["body"] = json.dumps({"text": LONG_TEXT + " Who at best knows triumph."})
+    response = update_lambda(event, None)
+    new_id = json.loads(response["body"])["quoteId"]
+    assert decode_item(stored(dynamodb_table, new_id))["text"].endswith("triumph.")
+
+    event = {"requestContext": ADMIN, "pathParameters": {"quoteId": new_id}}
+    assert delete_lambda(event, None)["statusCode"] == 200
+    assert stored(dynamodb_table, new_id) is None
+
+
+def test_top_quotes_fill_text_missing_from_index(dynamodb_table):
+    quote_id = find_quote_id(dynamodb_table, LONG_TEXT)
+    dynamodb_table.update_item(
+        Key={"PK": f"QUOTE#{quote_id}", "SK": "METADATA"},
+        UpdateExpression="SET GSI3PK = :pk, score = :score",
+        ExpressionAttributeValues={":pk": "TOP#history", ":score": 5},
+    )
+    event = {"queryStringParameters": {"genre": "history"}}
+    body = json.loads(top_lambda(event, None)["body"])
+    assert body["items"][0]["text"] == LONG_TEXT
+
+
+def test_sqlite_storage_round_trips_binary():
+    storage = SqliteStorage(":memory:")
+    item = encode_item(build_item("q1", LONG_TEXT, "A", "g", "s", "t"))
+    storage.put(item)
+    assert decode_item(storage.get(item["PK"], "METADATA"))["text"] == LONG_TEXT
+
+
+def test_compact_text_migration(dynamodb_table):
+    quote_id = "legacy01"
+    dynamodb_table.put_item(
+        Item=build_item(quote_id, LONG_TEXT + " Again.", "A", "history", "s", "t")
+    )
+    migrate.run(dynamodb_table, "compact-text", segments=1)
+
+    item = stored(dynamodb_table, quote_id)
+    assert "text" not in item
+    assert decode_item(item)["text"] == LONG_TEXT + " Again."
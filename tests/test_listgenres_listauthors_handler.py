@@ -16,6 +16,7 @@ os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
 # Import the lambdas
 from listgenres_handler import lambda_handler as genres_lambda
 from listauthors_handler import lambda_handler as authors_lambda
+from facets import record_pair
 
 TABLE_NAME = "NovaMuseQuotes"
 
@@ -93,6 +94,29 @@ def test_list_authors(dynamodb_table, monkeypatch):
     assert len(body) == 2  # duplicates removed
 
 
+def test_filtered_lists_query_adjacency_items(dynamodb_table, monkeypatch):
+    record_pair(dynamodb_table, "fantasy", "Terry Goodkind", 2)
+    record_pair(dynamodb_table, "fantasy", "Isaac Asimov")
+    record_pair(dynamodb_table, "sci-fi", "Isaac Asimov")
+    # Every quote of this pair was moved or deleted
+    record_pair(dynamodb_table, "fantasy", "Isaac Asimov", -1)
+
+    def no_scan(**kwargs):
+        raise AssertionError("filtered lists must not scan")
+
+    monkeypatch.setattr("listauthors_handler.table.scan", no_scan)
+    monkeypatch.setattr("listgenres_handler.table.scan", no_scan)
+
+    response = authors_lambda({"queryStringParameters": {"genre": "fantasy"}}, None)
+    assert json.loads(response["body"]) == ["Terry Goodkind"]
+    response = genres_lambda(
+        {"queryStringParameters": {"author": "Isaac Asimov"}}, None
+    )
+    assert json.loads(response["body"]) == ["sci-fi"]
+    response = genres_lambda({"queryStringParameters": {"author": "Nobody"}}, None)
+    assert json.loads(response["body"]) == []
+
+
 def test_empty_table(monkeypatch):
     with mock_dynamodb():
         dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
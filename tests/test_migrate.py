@@ -0,0 +1,149 @@
+import os
+import sys
+import pytest
+from moto import mock_dynamodb
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import migrate
+from migrate import REMOVE, TokenBucket, register, run, status
+from sources import list_sources
+
+TABLE_NAME = "NovaMuseQuotes"
+
+
+@pytest.fixture
+def dynamodb_table():
+    with mock_dynamodb():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        for i in range(12):
+            table.put_item(
+                Item={
+                    "PK": f"QUOTE#q{i:02d}",
+                    "SK": "METADATA",
+                    "quoteId": f"q{i:02d}",
+                    "text": f"Quote number {i}",
+                    "source": "Dune" if i % 2 else "Emma",
+                    "createdAt": f"2024-01-01T00:00:{i:02d}Z",
+                    "legacy": True,
+                }
+            )
+        yield table
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    # Test migrations register into a copy of the built-in registry
+    monkeypatch.setattr(migrate, "MIGRATIONS", dict(migrate.MIGRATIONS))
+
+
+def quotes(table):
+    items = table.scan()["Items"]
+    return [item for item in items if item["PK"].startswith("QUOTE#")]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_token_bucket_limits_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, burst=2, clock=clock, sleep=clock.sleep)
+    for _ in range(12):
+        bucket.acquire()
+    # Two from the initial burst, then one every 100 ms
+    assert clock.now == pytest.approx(1.0)
+
+
+def test_source_index_migration(dynamodb_table):
+    counts = run(dynamodb_table, "source-index", segments=1, page_size=5)
+    assert counts["updated"] == 12
+    assert all(item["GSI4PK"].startswith("SOURCE#") for item in quotes(dynamodb_table))
+    assert list_sources(dynamodb_table) == ["Dune", "Emma"]
+
+    # Finished segments are skipped; a restart finds nothing left to do
+    assert run(dynamodb_table, "source-index", segments=1)["scanned"] == 0
+    counts = run(dynamodb_table, "source-index", segments=1, restart=True)
+    assert counts == {"scanned": 12, "updated": 0, "unchanged": 12, "conflicts": 0}
+
+
+def test_parallel_segments_write_each_item_once(dynamodb_table):
+    # moto ignores Segment (each segment scans every item) and isn't
+    # thread-safe, so the segments take turns on one worker: every item is
+    # offered four times and must still be written and counted once
+    run(dynamodb_table, "source-index", segments=4, rate=1000, workers=1)
+    assert all("GSI4PK" in item for item in quotes(dynamodb_table))
+    # Registry counts follow successful writes only
+    sources = dynamodb_table.get_item(Key={"PK": "SOURCES", "SK": "SOURCE#Dune"})
+    assert sources["Item"]["quoteCount"] == 6
+    assert len(status(dynamodb_table, "source-index")) == 4
+
+
+def test_dry_run_writes_nothing(dynamodb_table):
+    counts = run(dynamodb_table, "source-index", segments=1, dry_run=True)
+    assert counts["updated"] == 12
+    assert not any("GSI4PK" in item for item in quotes(dynamodb_table))
+    assert status(dynamodb_table, "source-index") == []
+
+
+def test_interrupted_run_resumes(dynamodb_table, registry):
+    seen = []
+
+    @register("drop-legacy")
+    def drop_legacy(item):
+        seen.append(item["quoteId"])
+        if len(seen) == 7:
+            raise RuntimeError("interrupted")
+        return {"legacy": REMOVE}
+
+    with pytest.raises(RuntimeError):
+        run(dynamodb_table, "drop-legacy", segments=1, page_size=3)
+    # Two full pages were checkpointed before the failure
+    assert sum("legacy" not in item for item in quotes(dynamodb_table)) == 6
+
+    seen.clear()
+    counts = run(dynamodb_table, "drop-legacy", segments=1, page_size=3)
+    assert counts["scanned"] == 6
+    assert not any("legacy" in item for item in quotes(dynamodb_table))
+
+
+def test_concurrent_edit_is_not_clobbered(dynamodb_table, registry):
+    @register("retitle")
+    def retitle(item):
+        if item["quoteId"] == "q03":
+            # Someone edits the quote between the scan and the write
+            dynamodb_table.update_item(
+                Key={"PK": "QUOTE#q03", "SK": "METADATA"},
+                UpdateExpression="SET #t = :t",
+                ExpressionAttributeNames={"#t": "text"},
+                ExpressionAttributeValues={":t": "Edited"},
+            )
+        return {"text": item["text"].upper()}
+
+    counts = run(dynamodb_table, "retitle", segments=1)
+    assert counts["conflicts"] == 1
+    item = dynamodb_table.get_item(Key={"PK": "QUOTE#q03", "SK": "METADATA"})
+    assert item["Item"]["text"] == "Edited"
@@ -0,0 +1,220 @@
+import os
+import sys
+import json
+import socketserver
+import threading
+import pytest
+from moto import mock_dynamodb
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+import browsequotes_handler
+import quotes_handler
+from catalog_version import bump_version
+from page_cache import LRUCache, PageCache, RedisBackend
+
+TABLE_NAME = "NovaMuseQuotes"
+
+
+@pytest.fixture
+def dynamodb_table():
+    with mock_dynamodb():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+                {"AttributeName": "GSI1PK", "AttributeType": "S"},
+                {"AttributeName": "GSI1SK", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "GSI1-Genre",
+                    "KeySchema": [
+                        {"AttributeName": "GSI1PK", "KeyType": "HASH"},
+                        {"AttributeName": "GSI1SK", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        for i in range(5):
+            table.put_item(
+                Item={
+                    "PK": f"QUOTE#{i}",
+                    "SK": "METADATA",
+                    "quoteId": str(i),
+                    "text": f"Quote number {i}",
+                    "author": "Author A",
+                    "genre": "sci-fi",
+                    "source": "Test Source",
+                    "createdAt": f"2024-01-01T00:00:0{i}Z",
+                    "GSI1PK": "GENRE#sci-fi",
+                    "GSI1SK": f"CREATED#2024-01-01T00:00:0{i}Z",
+                }
+            )
+        yield table
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    # Just enough of the Redis protocol for GET and SET ... PX
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:-2])):
+                length = int(self.rfile.readline()[1:-2])
+                args.append(self.rfile.read(length + 2)[:-2])
+            command = args[0].upper()
+            if command == b"GET":
+                value = store.get(args[1])
+                if value is None:
+                    self.wfile.write(b"$-1\r\n")
+                else:
+                    self.wfile.write(b"$%d\r\n%s\r\n" % (len(value), value))
+            elif command == b"SET":
+                store[args[1]] = args[2]
+                self.wfile.write(b"+OK\r\n")
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+
+@pytest.fixture
+def redis_stand_in():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), RespHandler)
+    server.daemon_threads = True
+    server.store = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_lru_evicts_by_size():
+    cache = LRUCache(max_bytes=10, clock=FakeClock())
+    cache.set("a", "12345", 60)
+    cache.set("b", "12345", 60)
+    cache.get("a")  # a is now most recently used
+    cache.set("c", "12345", 60)
+
+    assert cache.get("a") == "12345"
+    assert cache.get("b") is None
+    assert cache.size == 10
+
+
+def test_lru_expires_entries():
+    clock = FakeClock()
+    cache = LRUCache(max_bytes=100, clock=clock)
+    cache.set("a", "value", 30)
+    clock.now = 29
+    assert cache.get("a") == "value"
+    clock.now = 31
+    assert cache.get("a") is None
+    assert cache.size == 0
+
+
+def test_read_through_hits_and_version_invalidation(dynamodb_table):
+    cache = PageCache(60, LRUCache(1024 * 1024))
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return {"Items": [{"text": "hello"}]}
+
+    parts = ("GSI1-Genre", "sci-fi", None, 10, "text")
+    assert cache.read_through(dynamodb_table, parts, loader)["Items"][0]["text"] == "hello"
+    cache.read_through(dynamodb_table, parts, loader)
+    assert len(loads) == 1
+    assert cache.hits == 1
+
+    bump_version(dynamodb_table)
+    cache.read_through(dynamodb_table, parts, loader)
+    assert len(loads) == 2
+
+
+def test_shared_tier_serves_other_containers(dynamodb_table, redis_stand_in):
+    url = f"redis://127.0.0.1:{redis_stand_in.server_address[1]}"
+    first = PageCache(60, LRUCache(1024), RedisBackend(url, timeout=1))
+    second = PageCache(60, LRUCache(1024), RedisBackend(url, timeout=1))
+    parts = ("GSI1-Genre", "sci-fi", None, 10, "text")
+
+    first.read_through(dynamodb_table, parts, lambda: {"Items": [1, 2]})
+    value = second.read_through(
+        dynamodb_table, parts, lambda: pytest.fail("should come from shared tier")
+    )
+    assert value == {"Items": [1, 2]}
+    assert second.shared_hits == 1
+
+
+def test_unreachable_shared_tier_falls_back_to_loader(dynamodb_table):
+    cache = PageCache(60, LRUCache(1024), RedisBackend("redis://127.0.0.1:1"))
+    value = cache.read_through(dynamodb_table, ("x",), lambda: {"Items": []})
+    assert value == {"Items": []}
+
+
+def test_browse_serves_cached_page(dynamodb_table, monkeypatch, capsys):
+    monkeypatch.setattr(
+        browsequotes_handler, "cache", PageCache(60, LRUCache(1024 * 1024))
+    )
+    event = {"queryStringParameters": {"genre": "sci-fi", "limit": "3"}}
+    body1 = json.loads(browsequotes_handler.lambda_handler(event, None)["body"])
+
+    def fake_query(**kwargs):
+        raise Exception("Dynamo error")
+
+    monkeypatch.setattr("browsequotes_handler.table.query", fake_query)
+    response = browsequotes_handler.lambda_handler(event, None)
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == body1
+
+    metrics = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert metrics[-1]["PageCacheHits"] == 1
+
+
+def test_handlers_sharing_a_tier_keep_apart(dynamodb_table, monkeypatch):
+    # One store standing in for the shared Redis tier
+    shared = LRUCache(1024 * 1024)
+    monkeypatch.setattr(
+        quotes_handler, "page_cache", PageCache(60, shared, namespace="quotes")
+    )
+    monkeypatch.setattr(
+        browsequotes_handler, "cache", PageCache(60, shared, namespace="browse")
+    )
+    monkeypatch.setattr(quotes_handler, "warm", None)
+    event = {"queryStringParameters": {"genre": "sci-fi", "limit": "20"}}
+    quotes = json.loads(quotes_handler.lambda_handler(event, None)["body"])
+    assert isinstance(quotes, list) and len(quotes) == 5
+
+    response = browsequotes_handler.lambda_handler(event, None)
+    assert response["statusCode"] == 200
+    assert len(json.loads(response["body"])["items"]) == 5
+    # and again, now that both are cached
+    quotes_again = json.loads(quotes_handler.lambda_handler(event, None)["body"])
+    assert sorted(q["quoteId"] for q in quotes_again) == sorted(
+        q["quoteId"] for q in quotes
+    )
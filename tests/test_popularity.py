@@ -0,0 +1,164 @@
+import os
+import sys
+import json
+import pytest
+from moto import mock_dynamodb
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+import browsequotes_handler
+import quotes_handler
+import sharequote_handler
+from popularity import CounterBuffer
+from topquotes_handler import lambda_handler as top_lambda
+
+TABLE_NAME = "NovaMuseQuotes"
+
+
+@pytest.fixture
+def dynamodb_table(monkeypatch):
+    monkeypatch.setattr(quotes_handler, "counters", CounterBuffer())
+    monkeypatch.setattr(quotes_handler, "GENRE_CACHE", None)
+    monkeypatch.setattr(sharequote_handler, "counters", CounterBuffer())
+    with mock_dynamodb():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+                {"AttributeName": "GSI1PK", "AttributeType": "S"},
+                {"AttributeName": "GSI1SK", "AttributeType": "S"},
+                {"AttributeName": "GSI3PK", "AttributeType": "S"},
+                {"AttributeName": "score", "AttributeType": "N"},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "GSI1-Genre",
+                    "KeySchema": [
+                        {"AttributeName": "GSI1PK", "KeyType": "HASH"},
+                        {"AttributeName": "GSI1SK", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+                {
+                    "IndexName": "GSI3-Top",
+                    "KeySchema": [
+                        {"AttributeName": "GSI3PK", "KeyType": "HASH"},
+                        {"AttributeName": "score", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        for i in range(4):
+            table.put_item(
+                Item={
+                    "PK": f"QUOTE#q{i}",
+                    "SK": "METADATA",
+                    "quoteId": f"q{i}",
+                    "text": f"Quote number {i}",
+                    "author": "Author A",
+                    "genre": "sci-fi",
+                    "source": "Test Source",
+                    "createdAt": f"2024-01-01T00:00:0{i}Z",
+                    "GSI1PK": "GENRE#sci-fi",
+                    "GSI1SK": f"CREATED#2024-01-01T00:00:0{i}Z",
+                }
+            )
+        yield table
+
+
+def test_buffer_coalesces_increments(dynamodb_table):
+    counters = CounterBuffer()
+    for _ in range(5):
+        counters.record_views([{"quoteId": "q1", "genre": "sci-fi"}])
+    counters.record_share("q1", "sci-fi")
+
+    assert counters.flush(dynamodb_table, force=True) == 1
+    assert counters.flush(dynamodb_table, force=True) == 0  # nothing left over
+
+    item = dynamodb_table.get_item(Key={"PK": "QUOTE#q1", "SK": "METADATA"})["Item"]
+    assert item["views"] == 5
+    assert item["shares"] == 1
+    assert item["score"] == 10
+    assert item["GSI3PK"] == "TOP#sci-fi"
+
+
+def test_missing_quote_is_not_created(dynamodb_table):
+    counters = CounterBuffer()
+    counters.record_views([{"quoteId": "gone", "genre": "sci-fi"}])
+    assert counters.flush(dynamodb_table, force=True) == 0
+    assert "Item" not in dynamodb_table.get_item(
+        Key={"PK": "QUOTE#gone", "SK": "METADATA"}
+    )
+
+
+def test_buffer_flushes_when_due(dynamodb_table):
+    now = [0.0]
+    counters = CounterBuffer(flush_size=3, flush_interval=30, clock=lambda: now[0])
+    counters.record_views([{"quoteId": "q0", "genre": "sci-fi"}])
+    assert counters.flush(dynamodb_table) == 0  # neither full nor old
+
+    now[0] = 31.0
+    assert counters.flush(dynamodb_table) == 1
+
+    counters.record_views(
+        [{"quoteId": f"q{i}", "genre": "sci-fi"} for i in range(1, 4)]
+    )
+    assert counters.flush(dynamodb_table) == 3  # written concurrently
+    for i in range(4):
+        key = {"PK": f"QUOTE#q{i}", "SK": "METADATA"}
+        assert dynamodb_table.get_item(Key=key)["Item"]["views"] == 1
+
+
+def test_random_quote_is_a_view_but_browse_pages_are_not(dynamodb_table):
+    event = {"queryStringParameters": {"genre": "sci-fi", "fields": "text"}}
+    body = json.loads(browsequotes_handler.lambda_handler(event, None)["body"])
+    assert all(set(item) == {"text"} for item in body["items"])
+
+    event = {"queryStringParameters": {"fields": "text"}}
+    body = json.loads(quotes_handler.lambda_handler(event, None)["body"])
+    assert set(body[0]) == {"text"}
+
+    # One buffered view, written once the buffer is due
+    pending = quotes_handler.counters.pending
+    assert [views for _, views, _ in pending.values()] == [1]
+    assert quotes_handler.counters.flush(dynamodb_table, force=True) == 1
+
+
+def test_share_and_leaderboard(dynamodb_table):
+    for quote_id, shares in (("q2", 3), ("q3", 1)):
+        for _ in range(shares):
+            event = {"pathParameters": {"quoteId": quote_id}}
+            response = sharequote_handler.lambda_handler(event, None)
+            assert response["statusCode"] == 202
+    assert sharequote_handler.counters.pending == {}
+
+    response = top_lambda({"queryStringParameters": {"genre": "sci-fi"}}, None)
+    body = json.loads(response["body"])
+    assert [item["quoteId"] for item in body["items"]] == ["q2", "q3"]
+    assert body["items"][0]["shares"] == 3
+
+
+def test_share_unknown_quote(dynamodb_table):
+    response = sharequote_handler.lambda_handler(
+        {"pathParameters": {"quoteId": "nope"}}, None
+    )
+    assert response["statusCode"] == 404
+
+
+def test_top_requires_genre(dynamodb_table):
+    response = top_lambda({"queryStringParameters": {}}, None)
+    assert response["statusCode"] == 400
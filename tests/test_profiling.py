@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+from unittest.mock import patch
+import pytest
+from moto import mock_dynamodb
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+import profile_handler
+import profiling
+from profiling import package_of, profiled
+
+TABLE_NAME = "NovaMuseQuotes"
+
+
+@pytest.fixture
+def dynamodb_table():
+    with mock_dynamodb():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        for n, genre in enumerate(["fantasy", "sci-fi", "fantasy"]):
+            table.put_item(
+                Item={"PK": f"QUOTE#{n}", "SK": "METADATA", "GSI1PK": f"GENRE#{genre}"}
+            )
+        yield table
+
+
+@profiled
+def encode_handler(event, context):
+    # A stand-in handler with a recognisable json share
+    body = json.dumps([{"text": "x" * 100, "n": n} for n in range(2000)])
+    return {"statusCode": 200, "body": body}
+
+
+def profile_records(output):
+    return [
+        json.loads(line)
+        for line in output.splitlines()
+        if line.startswith("{") and '"Profile"' in line
+    ]
+
+
+def test_off_by_default(monkeypatch, capsys):
+    monkeypatch.setattr(profiling, "PROFILE", False)
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 0.0)
+    assert encode_handler({}, None)["statusCode"] == 200
+    assert profile_records(capsys.readouterr().out) == []
+
+
+def test_sampled_invocation_logs_record(monkeypatch, capsys):
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(profiling, "PROFILE_MEMORY", True)
+    monkeypatch.setattr(profiling, "PROFILE_TOP_N", 5)
+    response = encode_handler({"headers": {"Authorization": "secret"}}, None)
+    assert response["statusCode"] == 200
+
+    [record] = profile_records(capsys.readouterr().out)
+    assert record["Profile"] == __name__
+    assert record["durationMs"] > 0
+    assert len(record["top"]) == 5
+    assert {"function", "calls", "ownMs", "cumulativeMs"} <= set(record["top"][0])
+    assert "json" in record["byPackage"]
+    assert "app" not in record["byPackage"]  # this test module isn't in lambda/
+    assert record["peakKB"] > 0
+    assert record["topAllocations"]
+    assert "event" not in record
+
+
+def test_captured_event_is_redacted(monkeypatch, capsys):
+    monkeypatch.setattr(profiling, "PROFILE", True)
+    monkeypatch.setattr(profiling, "PROFILE_CAPTURE_EVENT", True)
+    claims = {"cognito:groups": "admins", "email": "admin@example.com"}
+    event = {
+        "headers": {"Authorization": "Bearer secret", "Accept": "application/json"},
+        "multiValueHeaders": {"cookie": ["session=1"], "Accept": ["text/html"]},
+        "requestContext": {"authorizer": {"claims": claims}, "stage": "prod"},
+        "queryStringParameters": {"genre": "sci-fi"},
+    }
+    encode_handler(event, None)
+    [record] = profile_records(capsys.readouterr().out)
+    assert record["event"]["headers"] == {
+        "Authorization": "<redacted>",
+        "Accept": "application/json",
+    }
+    assert record["event"]["multiValueHeaders"] == {
+        "cookie": "<redacted>",
+        "Accept": ["text/html"],
+    }
+    assert record["event"]["requestContext"] == {
+        "authorizer": "<redacted>",
+        "stage": "prod",
+    }
+    assert record["event"]["queryStringParameters"] == {"genre": "sci-fi"}
+    assert event["headers"]["Authorization"] == "Bearer secret"
+    assert event["requestContext"]["authorizer"]["claims"] == claims
+
+
+def test_package_of():
+    app_file = os.path.join(profiling.APP_DIR, "quotes_handler.py")
+    assert package_of(app_file, "lambda_handler") == "app"
+    assert package_of("/var/runtime/botocore/client.py", "_make_api_call") == "botocore"
+    assert (
+        package_of("/opt/venv/lib/python3.11/site-packages/boto3/x.py", "f") == "boto3"
+    )
+    assert package_of("/usr/lib/python3.11/json/encoder.py", "encode") == "json"
+    assert package_of("~", "<built-in method _json.encode_basestring>") == "json"
+    assert package_of("~", "<built-in method builtins.len>") == "builtins"
+
+
+def test_replays_captured_event(dynamodb_table, tmp_path, capsys):
+    record = {"Profile": "listgenres_handler", "event": {"queryStringParameters": {}}}
+    path = tmp_path / "record.json"
+    path.write_text(json.dumps(record))
+
+    calls = []
+    handler = profile_handler.importlib.import_module("listgenres_handler")
+    real = handler.lambda_handler.__wrapped__
+    with patch.object(
+        handler.lambda_handler,
+        "__wrapped__",
+        lambda *args: calls.append(1) or real(*args),
+    ):
+        records = profile_handler.main(
+            ["listgenres_handler", str(path), "--repeat", "2", "--top", "5"]
+        )
+    # Each repeat runs the handler once; the listing reuses the last run
+    assert len(calls) == 2
+    assert len(records) == 2
+    assert all(record["Profile"] == "listgenres_handler" for record in records)
+    assert "app" in records[0]["byPackage"]
+    output = capsys.readouterr().out
+    assert "status 200" in output
+    assert "function calls" in output  # the pstats listing
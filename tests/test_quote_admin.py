@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import pytest
+from moto import mock_dynamodb
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+from createquotes_handler import lambda_handler as create_lambda
+from deletequote_handler import lambda_handler as delete_lambda
+from updatequote_handler import lambda_handler as update_lambda
+from quote_text import find_quote_id
+from sources import list_sources
+from tags import query_tags, tag_counts
+
+TABLE_NAME = "NovaMuseQuotes"
+ADMIN = {"authorizer": {"claims": {"cognito:groups": "admins"}}}
+TEXT = "Fear is the mind-killer."
+
+
+@pytest.fixture
+def dynamodb_table():
+    with mock_dynamodb():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        event = {
+            "requestContext": ADMIN,
+            "body": json.dumps(
+                {
+                    "text": TEXT,
+                    "author": "Paul Atreides",
+                    "genre": "fantasy",
+                    "source": "Dune",
+                    "tags": ["fear", "courage"],
+                }
+            ),
+        }
+        assert create_lambda(event, None)["statusCode"] == 201
+        yield table
+
+
+def update(quote_id, body, context=ADMIN):
+    event = {
+        "requestContext": context,
+        "pathParameters": {"quoteId": quote_id},
+        "body": json.dumps(body),
+    }
+    response = update_lambda(event, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def get_quote(table, quote_id):
+    return table.get_item(Key={"PK": f"QUOTE#{quote_id}", "SK": "METADATA"}).get(
+        "Item"
+    )
+
+
+def listing_count(table, partition):
+    meta = table.get_item(Key={"PK": f"CHECKPOINTS#{partition}", "SK": "META"})
+    return int(meta.get("Item", {}).get("itemCount", 0))
+
+
+def test_change_genre_updates_in_place(dynamodb_table):
+    quote_id = find_quote_id(dynamodb_table, TEXT)
+    status, body = update(quote_id, {"genre": "sci-fi"})
+    assert (status, body["quoteId"]) == (200, quote_id)
+
+    item = get_quote(dynamodb_table, quote_id)
+    assert item["genre"] == "sci-fi"
+    assert item["GSI1PK"] == "GENRE#sci-fi"
+    assert item["GSI2PK"] == "AUTHOR#Paul Atreides"
+    assert listing_count(dynamodb_table, "GENRE#fantasy") == 0
+    assert listing_count(dynamodb_table, "GENRE#sci-fi") == 1
+    assert listing_count(dynamodb_table, "AUTHOR#Paul Atreides") == 1
+
+
+def test_reworded_text_keeps_id(dynamodb_table):
+    quote_id = find_quote_id(dynamodb_table, TEXT)
+    dynamodb_table.update_item(
+        Key={"PK": f"QUOTE#{quote_id}", "SK": "METADATA"},
+        UpdateExpression="SET #views = :v, GSI3PK = :top",
+        ExpressionAttributeNames={"#views": "views"},
+        ExpressionAttributeValues={":v": 7, ":top": "TOP#fantasy"},
+    )
+    before = get_quote(dynamodb_table, quote_id)
+
+    status, body = update(quote_id, {"text": "Fear is the little-death."})
+    assert (status, body["quoteId"]) == (200, quote_id)
+
+    item = get_quote(dynamodb_table, quote_id)
+    assert item["text"] == "Fear is the little-death."
+    assert item["createdAt"] == before["createdAt"]
+    assert item["views"] == 7
+    assert item["GSI3PK"] == "TOP#fantasy"
+
+    # The text guard moved with the wording
+    assert find_quote_id(dynamodb_table, TEXT) is None
+    assert find_quote_id(dynamodb_table, "fear is the LITTLE-DEATH.") == quote_id
+    # so the old wording can be added again
+    event = {
+        "requestContext": ADMIN,
+        "body": json.dumps(
+            {"text": TEXT, "author": "Paul", "genre": "fantasy", "source": "s"}
+        ),
+    }
+    assert create_lambda(event, None)["statusCode"] == 201
+
+    items, _ = query_tags(dynamodb_table, ["courage", "fear"], 10)
+    assert [i["quoteId"] for i in items] == [quote_id]
+    assert tag_counts(dynamodb_table, ["courage", "fear"]) == {"courage": 1, "fear": 1}
+
+
+def test_whitespace_fix_keeps_id(dynamodb_table):
+    quote_id = find_quote_id(dynamodb_table, TEXT)
+    status, body = update(quote_id, {"text": "Fear  is the MIND-killer."})
+    assert (status, body["quoteId"]) == (200, quote_id)
+    assert get_quote(dynamodb_table, quote_id)["text"] == "Fear  is the MIND-killer."
+
+
+def test_text_collision_is_rejected(dynamodb_table):
+    event = {
+        "requestContext": ADMIN,
+        "body": json.dumps(
+            {"text": "I must not fear.", "author": "A", "genre": "g", "source": "s"}
+        ),
+    }
+    create_lambda(event, None)
+
+    quote_id = find_quote_id(dynamodb_table, TEXT)
+    status, _ = update(quote_id, {"text": "I must not fear."})
+    assert status == 409
+    assert get_quote(dynamodb_table, quote_id)["text"] == TEXT
+
+
+def test_tag_and_source_changes_touch_only_the_diff(dynamodb_table):
+    quote_id = find_quote_id(dynamodb_table, TEXT)
+    status, _ = update(quote_id, {"tags": ["courage", "hope"], "source": "Dune II"})
+    assert status == 200
+
+    assert tag_counts(dynamodb_table, ["courage", "fear", "hope"]) == {
+        "courage": 1,
+        "fear": 0,
+        "hope": 1,
+    }
+    assert list_sources(dynamodb_table) == ["Dune II"]
+    assert get_quote(dynamodb_table, quote_id)["GSI4PK"] == "SOURCE#Dune II"
+
+    # Nothing left to change
+    status, body = update(quote_id, {"source": "Dune II"})
+    assert body["message"] == "No changes"
+
+
+def test_delete_removes_quote_and_bookkeeping(dynamodb_table):
+    quote_id = find_quote_id(dynamodb_table, TEXT)
+    event = {"requestContext": ADMIN, "pathParameters": {"quoteId": quote_id}}
+    assert delete_lambda(event, None)["statusCode"] == 200
+
+    assert get_quote(dynamodb_table, quote_id) is None
+    assert find_quote_id(dynamodb_table, TEXT) is None
+    assert query_tags(dynamodb_table, ["fear"], 10) == ([], None)
+    assert list_sources(dynamodb_table) == []
+    assert listing_count(dynamodb_table, "GENRE#fantasy") == 0
+
+    assert delete_lambda(event, None)["statusCode"] == 404
+
+
+def test_admin_only_and_validation(dynamodb_table):
+    quote_id = find_quote_id(dynamodb_table, TEXT)
+    status, _ = update(
+        quote_id, {"genre": "x"}, {"authorizer": {"claims": {"cognito:groups": ""}}}
+    )
+    assert status == 403
+    assert update(quote_id, {"quoteId": "abc"})[0] == 400
+    assert update(quote_id, {"genre": ""})[0] == 400
+    assert update("missing", {"genre": "x"})[0] == 404
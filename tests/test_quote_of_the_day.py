@@ -0,0 +1,155 @@
+import os
+import sys
+import json
+from datetime import datetime, timezone
+import pytest
+from moto import mock_dynamodb
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+import quote_of_the_day
+import quoteoftheday_handler
+from quoteoftheday_handler import lambda_handler
+from buildquoteoftheday_handler import lambda_handler as build_lambda
+from build_checkpoints import build_all
+
+TABLE_NAME = "NovaMuseQuotes"
+
+
+@pytest.fixture
+def dynamodb_table(monkeypatch):
+    monkeypatch.setattr(quoteoftheday_handler, "TODAY_CACHE", None)
+    with mock_dynamodb():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+                {"AttributeName": "GSI1PK", "AttributeType": "S"},
+                {"AttributeName": "GSI1SK", "AttributeType": "S"},
+                {"AttributeName": "GSI2PK", "AttributeType": "S"},
+                {"AttributeName": "GSI2SK", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "GSI1-Genre",
+                    "KeySchema": [
+                        {"AttributeName": "GSI1PK", "KeyType": "HASH"},
+                        {"AttributeName": "GSI1SK", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+                {
+                    "IndexName": "GSI2-Author",
+                    "KeySchema": [
+                        {"AttributeName": "GSI2PK", "KeyType": "HASH"},
+                        {"AttributeName": "GSI2SK", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        for i in range(30):
+            genre = "sci-fi" if i % 3 else "fantasy"
+            created_at = f"2024-01-01T00:00:{i:02d}Z"
+            table.put_item(
+                Item={
+                    "PK": f"QUOTE#{i:03d}",
+                    "SK": "METADATA",
+                    "quoteId": f"q{i:03d}",
+                    "text": f"Quote number {i}",
+                    "author": "Author A",
+                    "genre": genre,
+                    "source": "Test Source",
+                    "createdAt": created_at,
+                    "GSI1PK": f"GENRE#{genre}",
+                    "GSI1SK": f"CREATED#{created_at}",
+                    "GSI2PK": "AUTHOR#Author A",
+                    "GSI2SK": f"CREATED#{created_at}",
+                }
+            )
+        yield table
+
+
+def test_selection_is_deterministic(dynamodb_table):
+    first = quote_of_the_day.select_for_date(dynamodb_table, "2024-05-01")
+    second = quote_of_the_day.select_for_date(dynamodb_table, "2024-05-01")
+    assert first == second
+    assert set(first) == {"sci-fi", "fantasy"}
+    assert first["fantasy"]["genre"] == "fantasy"
+
+
+def test_checkpoint_and_fallback_paths_agree(dynamodb_table):
+    walked = quote_of_the_day.select_for_date(dynamodb_table, "2024-05-02")
+    build_all(dynamodb_table, every=4)
+    via_checkpoints = quote_of_the_day.select_for_date(dynamodb_table, "2024-05-02")
+    assert walked == via_checkpoints
+
+
+def test_build_job_stores_one_item(dynamodb_table):
+    result = build_lambda({"date": "2024-05-03"}, None)
+    assert result == {"date": "2024-05-03", "genres": 2}
+
+    item = quote_of_the_day.load(dynamodb_table, "2024-05-03")
+    assert set(item["quotes"]) == {"sci-fi", "fantasy"}
+
+
+def test_endpoint_serves_with_cache_headers(dynamodb_table):
+    build_lambda({}, None)
+    response = lambda_handler({"queryStringParameters": {"genre": "sci-fi"}}, None)
+    body = json.loads(response["body"])
+    assert response["statusCode"] == 200
+    assert body["genre"] == "sci-fi"
+    assert body["date"] == quote_of_the_day.today()
+
+    max_age = int(response["headers"]["Cache-Control"].split("max-age=")[1])
+    assert 0 < max_age <= 86400
+
+    # Served from the container afterwards
+    dynamodb_table.delete_item(Key={"PK": "QOTD", "SK": body["date"]})
+    again = lambda_handler({"queryStringParameters": {"genre": "sci-fi"}}, None)
+    assert json.loads(again["body"]) == body
+
+
+def test_endpoint_never_builds_on_a_miss(dynamodb_table):
+    response = lambda_handler({"queryStringParameters": {}}, None)
+    assert response["statusCode"] == 503
+    assert "Retry-After" in response["headers"]
+    assert quote_of_the_day.load(dynamodb_table, quote_of_the_day.today()) is None
+
+    # Yesterday's picks stand in, briefly cached, until the build runs
+    yesterday = quote_of_the_day.previous_day(quote_of_the_day.today())
+    build_lambda({"date": yesterday}, None)
+    response = lambda_handler({"queryStringParameters": {}}, None)
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["date"] == yesterday
+    max_age = int(response["headers"]["Cache-Control"].split("max-age=")[1])
+    assert max_age <= quoteoftheday_handler.STALE_MAX_AGE
+
+    build_lambda({}, None)
+    response = lambda_handler({"queryStringParameters": {}}, None)
+    assert json.loads(response["body"])["date"] == quote_of_the_day.today()
+
+
+def test_unknown_genre_404(dynamodb_table):
+    build_lambda({}, None)
+    response = lambda_handler({"queryStringParameters": {"genre": "romance"}}, None)
+    assert response["statusCode"] == 404
+
+
+def test_seconds_until_midnight():
+    now = datetime(2024, 5, 1, 23, 59, 0, tzinfo=timezone.utc)
+    assert quote_of_the_day.seconds_until_midnight(now) == 60
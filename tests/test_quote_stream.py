@@ -0,0 +1,170 @@
+import os
+import sys
+import json
+import base64
+import zlib
+import pytest
+from moto import mock_dynamodb
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+import checkpoints
+import quotes_handler
+from quotes_handler import lambda_handler
+from seen_filter import MAX_TOKEN_BITS, SeenFilter, TOKEN_VERSION, _HEADER
+
+TABLE_NAME = "NovaMuseQuotes"
+
+
+@pytest.fixture
+def dynamodb_table(monkeypatch):
+    monkeypatch.setattr(quotes_handler, "GENRE_CACHE", None)
+    with mock_dynamodb():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+                {"AttributeName": "GSI1PK", "AttributeType": "S"},
+                {"AttributeName": "GSI1SK", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "GSI1-Genre",
+                    "KeySchema": [
+                        {"AttributeName": "GSI1PK", "KeyType": "HASH"},
+                        {"AttributeName": "GSI1SK", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        for i in range(10):
+            genre = "sci-fi" if i % 2 else "fantasy"
+            table.put_item(
+                Item={
+                    "PK": f"QUOTE#{i}",
+                    "SK": "METADATA",
+                    "quoteId": f"q{i}",
+                    "text": f"Quote number {i}",
+                    "author": "Author A",
+                    "genre": genre,
+                    "source": "Test Source",
+                    "createdAt": f"2024-01-01T00:00:0{i}Z",
+                    "GSI1PK": f"GENRE#{genre}",
+                    "GSI1SK": f"CREATED#2024-01-01T00:00:0{i}Z",
+                }
+            )
+        yield table
+
+
+def test_seen_filter_roundtrip():
+    seen = SeenFilter.for_capacity(100)
+    for i in range(50):
+        seen.add(f"q{i}")
+
+    restored = SeenFilter.decode(seen.encode())
+    assert restored.count == 50
+    assert all(f"q{i}" in restored for i in range(50))
+    false_positives = sum(f"other{i}" in restored for i in range(1000))
+    assert false_positives < 50
+
+
+def test_seen_filter_rejects_garbage():
+    with pytest.raises(ValueError):
+        SeenFilter.decode("not-a-token")
+
+
+def test_seen_filter_rejects_oversized_tokens():
+    def token(bits, payload):
+        raw = _HEADER.pack(TOKEN_VERSION, 7, 0, bits) + zlib.compress(payload)
+        return base64.urlsafe_b64encode(raw).decode()
+
+    assert SeenFilter.decode(token(64, bytes(8))).bits == 64
+    with pytest.raises(ValueError):
+        SeenFilter.decode(token(MAX_TOKEN_BITS + 8, bytes(8)))
+    with pytest.raises(ValueError):
+        SeenFilter.decode(token(0, b""))
+    # A small token inflating far past its header's size
+    with pytest.raises(ValueError):
+        SeenFilter.decode(token(64, bytes(10_000_000)))
+
+
+def test_stream_cycles_through_every_quote(dynamodb_table):
+    served = []
+    token = None
+    for _ in range(10):
+        params = {"mode": "stream", "fields": "text"}
+        if token:
+            params["token"] = token
+        response = lambda_handler({"queryStringParameters": params}, None)
+        body = json.loads(response["body"])
+        assert list(body["items"][0].keys()) == ["text"]
+        served.append(body["items"][0]["text"])
+        token = body["token"]
+
+    assert len(set(served)) == 10
+
+    # Corpus exhausted: the next call starts a new cycle
+    params = {"mode": "stream", "token": token}
+    response = lambda_handler({"queryStringParameters": params}, None)
+    body = json.loads(response["body"])
+    assert len(body["items"]) == 1
+    assert SeenFilter.decode(body["token"]).count == 1
+
+
+def test_stream_looks_past_served_pools(dynamodb_table, monkeypatch):
+    # Every pool is the genre's oldest two quotes; the other three are only
+    # reached by looking further
+    monkeypatch.setattr(checkpoints, "CHECKPOINT_EVERY", 2)
+    monkeypatch.setattr(checkpoints, "random_position", lambda *args: (None, 0))
+    dynamodb_table.put_item(
+        Item={
+            "PK": checkpoints.checkpoint_pk("GENRE#sci-fi"),
+            "SK": "META",
+            "itemCount": 5,
+        }
+    )
+    served, token = [], None
+    for _ in range(5):
+        params = {"mode": "stream", "genre": "sci-fi"}
+        if token:
+            params["token"] = token
+        response = lambda_handler({"queryStringParameters": params}, None)
+        body = json.loads(response["body"])
+        served.append(body["items"][0]["quoteId"])
+        token = body["token"]
+    assert sorted(served) == ["q1", "q3", "q5", "q7", "q9"]
+    assert SeenFilter.decode(token).count == 5
+
+
+def test_stream_within_genre(dynamodb_table):
+    token = None
+    genres = set()
+    for _ in range(5):
+        params = {"mode": "stream", "genre": "sci-fi"}
+        if token:
+            params["token"] = token
+        response = lambda_handler({"queryStringParameters": params}, None)
+        body = json.loads(response["body"])
+        genres.add(body["items"][0]["genre"])
+        token = body["token"]
+    assert genres == {"sci-fi"}
+
+
+def test_stream_invalid_token(dynamodb_table):
+    params = {"mode": "stream", "token": "AAAA"}
+    response = lambda_handler({"queryStringParameters": params}, None)
+    assert response["statusCode"] == 400
@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import pytest
+from moto import mock_dynamodb
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+import migrate
+from createquotes_handler import lambda_handler as create_lambda
+from quote_items import build_item
+from quote_text import (
+    GUARD_GRACE_SECONDS,
+    TEXT_HASH_ATTR,
+    claim_text,
+    find_quote_id,
+    legacy_quote_id,
+    new_quote_id,
+    text_hash,
+    text_key,
+)
+
+TABLE_NAME = "NovaMuseQuotes"
+ADMIN = {"authorizer": {"claims": {"cognito:groups": "admins"}}}
+TEXT = "Fear is the mind-killer."
+
+
+@pytest.fixture
+def dynamodb_table():
+    with mock_dynamodb():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield table
+
+
+def create(text):
+    event = {
+        "requestContext": ADMIN,
+        "body": json.dumps(
+            {"text": text, "author": "Paul", "genre": "sci-fi", "source": "Dune"}
+        ),
+    }
+    response = create_lambda(event, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def quote_ids(table):
+    return [i["quoteId"] for i in table.scan()["Items"] if i["PK"].startswith("QUOTE#")]
+
+
+def test_ids_are_random_and_duplicates_normalized(dynamodb_table):
+    status, body = create(TEXT)
+    assert status == 201
+    quote_id = body["quoteId"]
+    assert len(quote_id) == 16 and quote_id != legacy_quote_id(TEXT)
+    assert find_quote_id(dynamodb_table, TEXT) == quote_id
+
+    status, body = create("  fear IS the   mind-killer. ")
+    assert status == 409
+    assert body == {"error": "Quote already exists", "quoteId": quote_id}
+    assert quote_ids(dynamodb_table) == [quote_id]
+
+
+def test_claim_is_idempotent_and_keeps_fresh_guards(dynamodb_table):
+    digest = text_hash(TEXT)
+    assert claim_text(dynamodb_table, digest, "a" * 16) == "a" * 16
+    # A retried claim by the same create
+    assert claim_text(dynamodb_table, digest, "a" * 16) == "a" * 16
+    # Quote "a" isn't written yet, but it may still be on its way
+    assert claim_text(dynamodb_table, digest, "b" * 16) == "a" * 16
+
+
+def test_dangling_guard_is_taken_over(dynamodb_table):
+    digest = text_hash(TEXT)
+    dynamodb_table.put_item(
+        Item={**text_key(digest), "quoteId": "gone", "claimedAt": 0}
+    )
+    assert claim_text(dynamodb_table, digest, "b" * 16) == "b" * 16
+
+    # Not once the quote exists
+    dynamodb_table.put_item(Item=build_item("b" * 16, TEXT, "A", "g", "s", "t"))
+    dynamodb_table.update_item(
+        Key=text_key(digest),
+        UpdateExpression="SET claimedAt = :old",
+        ExpressionAttributeValues={":old": -GUARD_GRACE_SECONDS},
+    )
+    assert claim_text(dynamodb_table, digest, new_quote_id()) == "b" * 16
+
+
+def test_text_hash_migration_reports_duplicates(dynamodb_table, capsys):
+    # seed_quotes.py used to hash the raw text, so the same quote could be
+    # seeded under one id and added through the API under another
+    for quote_id, text in (("legacy01", TEXT), ("legacy02", TEXT.upper())):
+        item = build_item(quote_id, text, "A", "g", "s", "t")
+        del item[TEXT_HASH_ATTR]
+        dynamodb_table.put_item(Item=item)
+
+    migrate.run(dynamodb_table, "text-hash", segments=1)
+
+    owner = find_quote_id(dynamodb_table, TEXT)
+    assert owner in ("legacy01", "legacy02")
+    hashed = [
+        i["quoteId"]
+        for i in dynamodb_table.scan()["Items"]
+        if i["PK"].startswith("QUOTE#") and TEXT_HASH_ATTR in i
+    ]
+    assert hashed == [owner]
+    duplicate = [q for q in quote_ids(dynamodb_table) if q != owner][0]
+    assert f"{duplicate}: duplicate of {owner}" in capsys.readouterr().out
+
+
+def test_text_hash_migration_adopts_its_own_guard(dynamodb_table, capsys):
+    # A guard already naming the quote (say, from an interrupted claim)
+    item = build_item("legacy01", TEXT, "A", "g", "s", "t")
+    del item[TEXT_HASH_ATTR]
+    dynamodb_table.put_item(Item=item)
+    claim_text(dynamodb_table, text_hash(TEXT), "legacy01")
+
+    counts = migrate.run(dynamodb_table, "text-hash", segments=1)
+    assert counts["updated"] == 1
+    stored = dynamodb_table.get_item(Key={"PK": "QUOTE#legacy01", "SK": "METADATA"})
+    assert stored["Item"][TEXT_HASH_ATTR] == text_hash(TEXT)
+    assert "duplicate" not in capsys.readouterr().out
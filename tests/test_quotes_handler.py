@@ -13,7 +13,10 @@ sys.path.insert(
 # Set environment variable **before importing**
 os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
 # Import your lambda handler
+import quotes_handler
 from quotes_handler import lambda_handler
+from quote_items import build_item
+from quote_text import new_quote_id
 
 TABLE_NAME = "NovaMuseQuotes"
 
@@ -62,6 +65,7 @@ def dynamodb_table():
             Item={
                 "PK": "QUOTE#1",
                 "SK": "METADATA",
+                "quoteId": "1",
                 "text": "Do or do not. There is no try.",
                 "author": "Yoda",
                 "genre": "sci-fi",
@@ -76,6 +80,7 @@ def dynamodb_table():
             Item={
                 "PK": "QUOTE#2",
                 "SK": "METADATA",
+                "quoteId": "2",
                 "text": "Fear is the mind-killer.",
                 "author": "Paul Atreides",
                 "genre": "sci-fi",
@@ -118,3 +123,126 @@ def test_random_quote(dynamodb_table):
     assert len(body) == 1
     assert "text" in body[0]
     assert "author" in body[0]
+
+
+def test_default_fields_hide_internal_keys(dynamodb_table):
+    event = {"queryStringParameters": {"genre": "sci-fi"}}
+    response = lambda_handler(event, None)
+    body = json.loads(response["body"])
+    for quote in body:
+        assert "PK" not in quote
+        assert "GSI1PK" not in quote
+        assert "text" in quote
+
+
+def test_sparse_fields(dynamodb_table):
+    event = {"queryStringParameters": {"author": "Yoda", "fields": "author,text"}}
+    response = lambda_handler(event, None)
+    body = json.loads(response["body"])
+    assert body == [{"text": "Do or do not. There is no try.", "author": "Yoda"}]
+
+
+def test_sparse_fields_random_quote(dynamodb_table):
+    event = {"queryStringParameters": {"fields": "text"}}
+    response = lambda_handler(event, None, test_genre="sci-fi")
+    body = json.loads(response["body"])
+    assert list(body[0].keys()) == ["text"]
+
+
+def test_unknown_field_rejected(dynamodb_table):
+    event = {"queryStringParameters": {"genre": "sci-fi", "fields": "text,PK"}}
+    response = lambda_handler(event, None)
+    assert response["statusCode"] == 400
+    assert "PK" in json.loads(response["body"])["error"]
+
+
+def add_genres(table, per_genre=4):
+    for genre in ("fantasy", "horror", "mystery"):
+        for n in range(per_genre):
+            text = f"A {genre} quote, number {n}."
+            item = build_item(
+                new_quote_id(), text, "A", genre, "s", f"2024-01-0{n + 1}"
+            )
+            table.put_item(Item=item)
+
+
+def test_random_count_distinct_across_genres(dynamodb_table, monkeypatch):
+    monkeypatch.setattr(quotes_handler, "GENRE_CACHE", None)
+    add_genres(dynamodb_table)
+    for _ in range(5):
+        event = {"queryStringParameters": {"count": "8", "fields": "quoteId,genre"}}
+        body = json.loads(lambda_handler(event, None)["body"])
+        assert len(body) == 8
+        assert len({quote["quoteId"] for quote in body}) == 8
+        # Dealt out over the four genres, at most 2 each
+        assert len({quote["genre"] for quote in body}) == 4
+
+    # Asking for more than there are returns each quote once
+    event = {"queryStringParameters": {"count": "25"}}
+    body = json.loads(lambda_handler(event, None)["body"])
+    assert len(body) == len({quote["quoteId"] for quote in body}) == 14
+    assert all("text" in quote and "PK" not in quote for quote in body)
+
+
+def test_genres_ignore_bookkeeping_items(dynamodb_table, monkeypatch):
+    monkeypatch.setattr(quotes_handler, "GENRE_CACHE", None)
+    add_genres(dynamodb_table)
+    # A facet pair whose quotes were all moved away, as older writers left
+    # them (with a bare genre attribute)
+    dynamodb_table.put_item(
+        Item={
+            "PK": "FACETS#GENRE#poetry",
+            "SK": "AUTHOR#A",
+            "genre": "poetry",
+            "author": "A",
+            "quoteCount": 0,
+        }
+    )
+    assert quotes_handler.get_all_genres(dynamodb_table) == [
+        "fantasy",
+        "horror",
+        "mystery",
+        "sci-fi",
+    ]
+
+def test_random_count_one_batched_read(dynamodb_table, monkeypatch):
+    monkeypatch.setattr(quotes_handler, "GENRE_CACHE", None)
+    add_genres(dynamodb_table)
+    client = quotes_handler.table.meta.client
+    calls = []
+    original = client.batch_get_item
+
+    def counting(**kwargs):
+        calls.append(kwargs)
+        return original(**kwargs)
+
+    monkeypatch.setattr(client, "batch_get_item", counting)
+    event = {"queryStringParameters": {"count": "6", "genre": "horror"}}
+    body = json.loads(lambda_handler(event, None)["body"])
+    assert len(body) == 4  # the genre only has 4
+    assert {quote["genre"] for quote in body} == {"horror"}
+    assert len(calls) == 1
+
+
+def test_random_count_samples_on_per_thread_tables(dynamodb_table, monkeypatch):
+    monkeypatch.setattr(quotes_handler, "GENRE_CACHE", None)
+    add_genres(dynamodb_table)
+    # The shared resource isn't thread-safe; the pool threads leave it alone
+    client = quotes_handler.table.meta.client
+    queries = []
+    original = client.query
+
+    def counting(**kwargs):
+        queries.append(kwargs)
+        return original(**kwargs)
+
+    monkeypatch.setattr(client, "query", counting)
+    event = {"queryStringParameters": {"count": "8"}}
+    assert len(json.loads(lambda_handler(event, None)["body"])) == 8
+    assert queries == []
+
+
+def test_random_count_validated(dynamodb_table):
+    for count in ("0", "26", "ten"):
+        event = {"queryStringParameters": {"count": count}}
+        assert lambda_handler(event, None)["statusCode"] == 400
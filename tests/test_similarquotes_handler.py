@@ -0,0 +1,197 @@
+import os
+import sys
+import json
+from unittest.mock import patch
+import pytest
+from moto import mock_dynamodb
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+import build_similar
+import similarquotes_handler
+from build_similar import build
+from createquotes_handler import lambda_handler as create_lambda
+from deletequote_handler import lambda_handler as delete_lambda
+from quote_items import apply_changes, build_item
+from quote_text import find_quote_id, new_quote_id
+from similarquotes_handler import lambda_handler
+
+TABLE_NAME = "NovaMuseQuotes"
+ADMIN = {"authorizer": {"claims": {"cognito:groups": "admins"}}}
+QUOTES = [
+    ("Fear is the mind-killer.", "Paul Atreides", "sci-fi"),
+    ("Fear is the little death that brings total obliteration.", "Paul", "sci-fi"),
+    ("All we have to decide is what to do with the time given us.", "Gandalf", "epic"),
+    ("Time is an illusion. Lunchtime doubly so.", "Ford Prefect", "sci-fi"),
+    ("Not all those who wander are lost.", "Bilbo Baggins", "fantasy"),
+    ("I am Groot.", "Groot", "sci-fi"),
+]
+QUOTES_TEXTS = [text for text, _, _ in QUOTES]
+
+
+@pytest.fixture
+def dynamodb_table(monkeypatch):
+    # Runs in a test are seconds apart; don't re-read the feed behind them
+    monkeypatch.setattr(build_similar, "SYNC_OVERLAP_SECONDS", 0)
+    with mock_dynamodb():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": name, "AttributeType": "S"}
+                for name in ("PK", "SK", "GSI5PK", "GSI5SK")
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "GSI5-Changes",
+                    "KeySchema": [
+                        {"AttributeName": "GSI5PK", "KeyType": "HASH"},
+                        {"AttributeName": "GSI5SK", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        for text, author, genre in QUOTES:
+            create(text, author, genre)
+        yield table
+
+
+def create(text, author, genre):
+    event = {
+        "requestContext": ADMIN,
+        "body": json.dumps(
+            {"text": text, "author": author, "genre": genre, "source": "s"}
+        ),
+    }
+    response = create_lambda(event, None)
+    assert response["statusCode"] == 201
+    return json.loads(response["body"])["quoteId"]
+
+
+def ids_of(table, *texts):
+    return [find_quote_id(table, text) for text in texts]
+
+
+def similar(quote_id, **params):
+    event = {"pathParameters": {"quoteId": quote_id}, "queryStringParameters": params}
+    return lambda_handler(event, None)
+
+
+def similar_ids(quote_id, **params):
+    response = similar(quote_id, **params)
+    assert response["statusCode"] == 200, response["body"]
+    return [item["quoteId"] for item in json.loads(response["body"])["items"]]
+
+
+def test_full_build_serves_nearest_first(dynamodb_table):
+    fear, death, decide, illusion = ids_of(dynamodb_table, *QUOTES_TEXTS[:4])
+    assert build(dynamodb_table, k=2) == (len(QUOTES), len(QUOTES))
+    assert similar_ids(fear)[0] == death
+    assert similar_ids(decide)[0] == illusion
+
+    response = similar(fear, fields="text,author", limit="1")
+    assert response["headers"]["Cache-Control"].startswith("public")
+    body = json.loads(response["body"])
+    assert body == {
+        "quoteId": fear,
+        "items": [{"text": QUOTES[1][0], "author": "Paul"}],
+    }
+    # Nothing changed: a second full run computes everything, writes nothing
+    assert build(dynamodb_table, full=True, k=2) == (len(QUOTES), 0)
+
+
+def test_incremental_refresh(dynamodb_table):
+    fear, death = ids_of(dynamodb_table, *QUOTES_TEXTS[:2])
+    build(dynamodb_table, k=2)
+    face = create(
+        "I will face my fear. I will permit it to pass over me.", "Paul", "sci-fi"
+    )
+
+    computed, written = build(dynamodb_table, k=2)
+    # The new quote and the lists it beats, not the whole catalog
+    assert 0 < computed < len(QUOTES) + 1
+    assert similar_ids(face)[0] in (fear, death)
+    assert face in similar_ids(fear) + similar_ids(death)
+
+    # Deleted neighbours are skipped at once and replaced by the next run
+    event = {"requestContext": ADMIN, "pathParameters": {"quoteId": death}}
+    assert delete_lambda(event, None)["statusCode"] == 200
+    assert death not in similar_ids(fear)
+    build(dynamodb_table, k=2)
+    listed = dynamodb_table.get_item(
+        Key={"PK": f"QUOTE#{fear}", "SK": "METADATA"}
+    )["Item"]["similar"]
+    assert death not in listed
+    assert listed[0] == face
+
+
+def test_cached_runs_read_only_the_changes(dynamodb_table, tmp_path):
+    cache = str(tmp_path / "similar.json")
+    fear, death = ids_of(dynamodb_table, *QUOTES_TEXTS[:2])
+    build(dynamodb_table, k=2, cache=cache)
+    face = create(
+        "I will face my fear. I will permit it to pass over me.", "Paul", "sci-fi"
+    )
+    event = {"requestContext": ADMIN, "pathParameters": {"quoteId": death}}
+    assert delete_lambda(event, None)["statusCode"] == 200
+
+    scan = AssertionError("scanned the table")
+    with patch.object(build_similar, "load_quotes", side_effect=scan):
+        computed, written = build(dynamodb_table, k=2, cache=cache)
+    assert 0 < computed < len(QUOTES)
+    assert similar_ids(face)[0] == fear
+    listed = dynamodb_table.get_item(
+        Key={"PK": f"QUOTE#{fear}", "SK": "METADATA"}
+    )["Item"]["similar"]
+    assert listed[0] == face and death not in listed
+
+    # Another run moved the sync point on; the cache no longer matches
+    build(dynamodb_table, k=2)
+    with patch.object(
+        build_similar, "load_quotes", wraps=build_similar.load_quotes
+    ) as mock_load:
+        build(dynamodb_table, k=2, cache=cache)
+    mock_load.assert_called_once()
+
+
+def test_ids_only_is_one_read(dynamodb_table):
+    [fear] = ids_of(dynamodb_table, QUOTES_TEXTS[0])
+    build(dynamodb_table, k=2)
+    expected = similar_ids(fear)
+    with patch.object(similarquotes_handler, "batch_get") as mock_batch_get:
+        assert similar_ids(fear, fields="quoteId") == expected
+    mock_batch_get.assert_not_called()
+
+
+def test_errors_and_unbuilt_lists(dynamodb_table):
+    [fear] = ids_of(dynamodb_table, QUOTES_TEXTS[0])
+    assert similar("nope")["statusCode"] == 404
+    assert similar(fear, fields="bogus")["statusCode"] == 400
+    assert similar(fear, limit="0")["statusCode"] == 400
+    assert lambda_handler({}, None)["statusCode"] == 400
+    # Before the first job run
+    assert similar_ids(fear) == []
+
+
+def test_rewording_drops_the_old_list():
+    old = build_item(new_quote_id(), "Old words.", "A", "sci-fi", "s", "2024-01-01")
+    old["similar"], old["similarFloor"] = ["deadbeef"], 0.5
+    assert "similar" in apply_changes(old, {"genre": "fantasy"})
+    new = apply_changes(old, {"text": "New words."})
+    assert new["quoteId"] == old["quoteId"]
+    assert "similar" not in new and "similarFloor" not in new
+    # Case and spacing aren't a new wording
+    assert "similar" in apply_changes(old, {"text": "old  WORDS."})
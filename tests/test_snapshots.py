@@ -0,0 +1,164 @@
+import os
+import sys
+import gzip
+import json
+from unittest.mock import patch
+import pytest
+from moto import mock_dynamodb, mock_s3
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+import catalog_version
+import listgenres_handler
+import publishsnapshots_handler
+import snapshots
+from catalog_version import bump_version
+from listauthors_handler import lambda_handler as authors_lambda
+from listgenres_handler import lambda_handler as genres_lambda
+
+TABLE_NAME = "NovaMuseQuotes"
+BUCKET = "novamuse-frontend"
+
+
+@pytest.fixture
+def dynamodb_table(monkeypatch):
+    monkeypatch.setattr(catalog_version, "VERSION_TTL", 0)
+    monkeypatch.setattr(snapshots, "SNAPSHOT_BUCKET", BUCKET)
+    monkeypatch.setattr(publishsnapshots_handler, "SNAPSHOT_BUCKET", BUCKET)
+    monkeypatch.setattr(snapshots, "_bodies", {})
+    # S3 stand-in; the handlers' clients are intercepted as well
+    with mock_dynamodb(), mock_s3():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+                {"AttributeName": "GSI1PK", "AttributeType": "S"},
+                {"AttributeName": "GSI1SK", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "GSI1-Genre",
+                    "KeySchema": [
+                        {"AttributeName": "GSI1PK", "KeyType": "HASH"},
+                        {"AttributeName": "GSI1SK", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        for i in range(5):
+            genre = "sci-fi" if i < 3 else "fantasy"
+            table.put_item(
+                Item={
+                    "PK": f"QUOTE#{i}",
+                    "SK": "METADATA",
+                    "quoteId": str(i),
+                    "text": f"Quote number {i}",
+                    "author": f"Author {i % 2}",
+                    "genre": genre,
+                    "source": "Test Source",
+                    "createdAt": f"2024-01-01T00:00:0{i}Z",
+                    "GSI1PK": f"GENRE#{genre}",
+                    "GSI1SK": f"CREATED#2024-01-01T00:00:0{i}Z",
+                    "GSI2PK": f"AUTHOR#Author {i % 2}",
+                    "GSI2SK": f"CREATED#2024-01-01T00:00:0{i}Z",
+                }
+            )
+        bump_version(table)
+        yield table
+
+
+def read_object(key):
+    resp = boto3.client("s3", region_name="us-east-1").get_object(
+        Bucket=BUCKET, Key=key
+    )
+    body = resp["Body"].read()
+    if body[:2] == snapshots.GZIP_MAGIC:
+        body = gzip.decompress(body)
+    return resp, json.loads(body)
+
+
+def test_publish_writes_versioned_snapshots(dynamodb_table):
+    assert publishsnapshots_handler.lambda_handler({}, None) == {
+        "published": True,
+        "version": 1,
+    }
+
+    resp, genres = read_object("catalog/v1/genres.json")
+    assert genres == ["fantasy", "sci-fi"]
+    assert resp["CacheControl"] == snapshots.IMMUTABLE
+    assert read_object("catalog/v1/authors.json")[1] == ["Author 0", "Author 1"]
+
+    # Newest first, shaped like a /quote/browse?genre= response
+    _, first_page = read_object("catalog/v1/genres/sci-fi.json")
+    assert [item["quoteId"] for item in first_page["items"]] == ["2", "1", "0"]
+    assert "GSI1PK" not in first_page["items"][0]
+    assert first_page["nextCursor"] is None
+
+    _, manifest = read_object("catalog/latest.json")
+    assert manifest["version"] == 1
+    assert "genres/fantasy" in manifest["files"]
+
+    # The stream record for our own marker write is a no-op
+    assert publishsnapshots_handler.lambda_handler({}, None)["published"] is False
+
+
+def test_handlers_serve_current_snapshot(dynamodb_table):
+    publishsnapshots_handler.lambda_handler({}, None)
+
+    with patch.object(listgenres_handler.table, "scan") as mock_scan:
+        response = genres_lambda({}, None)
+    mock_scan.assert_not_called()
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == ["fantasy", "sci-fi"]
+    assert json.loads(authors_lambda({}, None)["body"]) == ["Author 0", "Author 1"]
+
+
+def test_stale_snapshot_falls_back_to_scan(dynamodb_table):
+    publishsnapshots_handler.lambda_handler({}, None)
+    dynamodb_table.put_item(
+        Item={"PK": "QUOTE#9", "SK": "METADATA", "GSI1PK": "GENRE#horror"}
+    )
+    bump_version(dynamodb_table)
+
+    assert json.loads(genres_lambda({}, None)["body"]) == [
+        "fantasy",
+        "horror",
+        "sci-fi",
+    ]
+    publishsnapshots_handler.lambda_handler({}, None)
+    assert read_object("catalog/v2/genres.json")[1] == ["fantasy", "horror", "sci-fi"]
+
+
+def test_redirect_to_cdn(dynamodb_table, monkeypatch):
+    monkeypatch.setattr(
+        snapshots, "SNAPSHOT_BASE_URL", "https://novamusequotes.c3devs.com/"
+    )
+    publishsnapshots_handler.lambda_handler({}, None)
+
+    response = genres_lambda({}, None)
+    assert response["statusCode"] == 302
+    assert response["headers"]["Location"] == (
+        "https://novamusequotes.c3devs.com/catalog/v1/genres.json"
+    )
+
+
+def test_older_publish_does_not_move_marker_back(dynamodb_table):
+    s3 = boto3.client("s3", region_name="us-east-1")
+    snapshots.publish(s3, dynamodb_table, BUCKET, version=3)
+    snapshots.publish(s3, dynamodb_table, BUCKET, version=2)
+    assert catalog_version.published_version(dynamodb_table) == 3
@@ -0,0 +1,119 @@
+import os
+import sys
+import json
+import pytest
+from moto import mock_dynamodb
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+from browsequotes_handler import lambda_handler as browse_lambda
+from createquotes_handler import lambda_handler as create_lambda
+from listsources_handler import lambda_handler as sources_lambda
+from migrate import run
+
+TABLE_NAME = "NovaMuseQuotes"
+
+
+@pytest.fixture
+def dynamodb_table():
+    with mock_dynamodb():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+                {"AttributeName": "GSI4PK", "AttributeType": "S"},
+                {"AttributeName": "GSI4SK", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "GSI4-Source",
+                    "KeySchema": [
+                        {"AttributeName": "GSI4PK", "KeyType": "HASH"},
+                        {"AttributeName": "GSI4SK", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        # Quotes from before the source index existed
+        for i in range(6):
+            source = "The Hobbit" if i % 2 else "Dune Messiah"
+            table.put_item(
+                Item={
+                    "PK": f"QUOTE#q{i}",
+                    "SK": "METADATA",
+                    "quoteId": f"q{i}",
+                    "text": f"Quote number {i}",
+                    "author": "Author A",
+                    "genre": "fantasy",
+                    "source": source,
+                    "createdAt": f"2024-01-01T00:00:0{i}Z",
+                }
+            )
+        yield table
+
+
+def test_backfill_indexes_existing_quotes(dynamodb_table):
+    assert run(dynamodb_table, "source-index", segments=1)["updated"] == 6
+    # idempotent
+    counts = run(dynamodb_table, "source-index", segments=1, restart=True)
+    assert counts["updated"] == 0
+
+    body = json.loads(sources_lambda({}, None)["body"])
+    assert body == ["Dune Messiah", "The Hobbit"]
+
+
+def test_browse_by_source_pages_with_cursor(dynamodb_table):
+    run(dynamodb_table, "source-index", segments=1)
+
+    event = {"queryStringParameters": {"source": "The Hobbit", "limit": "2"}}
+    body1 = json.loads(browse_lambda(event, None)["body"])
+    assert len(body1["items"]) == 2
+    assert body1["nextCursor"]
+
+    event["queryStringParameters"]["cursor"] = body1["nextCursor"]
+    body2 = json.loads(browse_lambda(event, None)["body"])
+    texts = {i["text"] for i in body1["items"] + body2["items"]}
+    assert texts == {"Quote number 1", "Quote number 3", "Quote number 5"}
+    assert all(i["source"] == "The Hobbit" for i in body2["items"])
+
+
+def test_source_with_genre_rejected(dynamodb_table):
+    event = {"queryStringParameters": {"source": "The Hobbit", "genre": "fantasy"}}
+    assert browse_lambda(event, None)["statusCode"] == 400
+
+
+def test_create_registers_source(dynamodb_table):
+    event = {
+        "requestContext": {"authorizer": {"claims": {"cognito:groups": "admins"}}},
+        "body": json.dumps(
+            {
+                "text": "Even the smallest person can change the course of the future.",
+                "author": "Galadriel",
+                "genre": "fantasy",
+                "source": "The Fellowship of the Ring",
+            }
+        ),
+    }
+    assert create_lambda(event, None)["statusCode"] == 201
+
+    assert json.loads(sources_lambda({}, None)["body"]) == [
+        "The Fellowship of the Ring"
+    ]
+    event = {"queryStringParameters": {"source": "The Fellowship of the Ring"}}
+    body = json.loads(browse_lambda(event, None)["body"])
+    assert body["items"][0]["author"] == "Galadriel"
@@ -0,0 +1,161 @@
+import os
+import sys
+from decimal import Decimal
+import pytest
+from moto import mock_dynamodb
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+
+from item_format import COMPRESSED_TEXT, decode_item, encode_item
+from storage import ConditionFailed, DynamoStorage, SqliteStorage, Storage
+
+TABLE_NAME = "NovaMuseQuotes"
+
+
+def dynamo_storage():
+    dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+    table = dynamodb.create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[
+            {"AttributeName": "PK", "KeyType": "HASH"},
+            {"AttributeName": "SK", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "PK", "AttributeType": "S"},
+            {"AttributeName": "SK", "AttributeType": "S"},
+            {"AttributeName": "GSI2PK", "AttributeType": "S"},
+            {"AttributeName": "GSI2SK", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": "GSI2-Author",
+                "KeySchema": [
+                    {"AttributeName": "GSI2PK", "KeyType": "HASH"},
+                    {"AttributeName": "GSI2SK", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            },
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    return DynamoStorage(table)
+
+
+# Every test runs against both engines: same calls, same answers
+@pytest.fixture(params=["dynamodb", "sqlite"])
+def storage(request):
+    if request.param == "sqlite":
+        yield SqliteStorage(":memory:")
+        return
+    with mock_dynamodb():
+        yield dynamo_storage()
+
+
+def quote(i, author="Author A"):
+    return {
+        "PK": f"QUOTE#q{i:02d}",
+        "SK": "METADATA",
+        "quoteId": f"q{i:02d}",
+        "text": f"Quote number {i}",
+        "author": author,
+        "views": Decimal(i),
+        "GSI2PK": f"AUTHOR#{author}",
+        "GSI2SK": f"CREATED#2024-01-01T00:00:{i:02d}Z",
+    }
+
+
+def test_put_get_and_condition(storage):
+    storage.put(quote(1))
+    assert storage.get("QUOTE#q01", "METADATA")["views"] == 1
+    assert storage.get("QUOTE#q01", "METADATA", fields=["text"]) == {
+        "text": "Quote number 1"
+    }
+    assert storage.get("QUOTE#nope", "METADATA") is None
+
+    with pytest.raises(ConditionFailed):
+        storage.put(quote(1), if_not_exists=True)
+    storage.put({**quote(1), "text": "Replaced"})
+    assert storage.get("QUOTE#q01", "METADATA")["text"] == "Replaced"
+
+
+def test_query_pages_in_sort_key_order(storage):
+    storage.batch_write(puts=[quote(i) for i in range(7)])
+    storage.put(quote(9, author="Author B"))
+
+    # Ascending: moto pages descending index queries incorrectly
+    seen, start = [], None
+    while True:
+        items, start = storage.query("GSI2-Author", "AUTHOR#Author A", 3, start=start)
+        seen.extend(item["quoteId"] for item in items)
+        if not start:
+            break
+    assert seen == [f"q{i:02d}" for i in range(7)]
+
+
+def test_sqlite_pages_newest_first():
+    storage = SqliteStorage(":memory:")
+    storage.batch_write(puts=[quote(i) for i in range(7)])
+    seen, start = [], None
+    while True:
+        items, start = storage.query(
+            "GSI2-Author", "AUTHOR#Author A", 3, forward=False, start=start
+        )
+        seen.extend(item["quoteId"] for item in items)
+        if not start:
+            break
+    assert seen == [f"q{i:02d}" for i in reversed(range(7))]
+
+
+def test_scan_filters_prefix_and_sort_key(storage):
+    storage.batch_write(
+        puts=[quote(i) for i in range(5)]
+        + [{"PK": "SOURCES", "SK": "SOURCE#x", "quoteCount": Decimal(1)}]
+    )
+    seen, start = [], None
+    while True:
+        items, start = storage.scan(
+            2, start=start, pk_prefix="QUOTE#", sk="METADATA", fields=["quoteId"]
+        )
+        seen.extend(item["quoteId"] for item in items)
+        if not start:
+            break
+    assert sorted(seen) == [f"q{i:02d}" for i in range(5)]
+
+
+def test_batch_get_and_delete(storage):
+    storage.batch_write(puts=[quote(i) for i in range(4)])
+    keys = [("QUOTE#q01", "METADATA"), ("QUOTE#q03", "METADATA"), ("QUOTE#x", "M")]
+    found = storage.batch_get(keys, fields=["quoteId"])
+    assert sorted(item["quoteId"] for item in found) == ["q01", "q03"]
+
+    storage.batch_write(deletes=[("QUOTE#q01", "METADATA")])
+    assert storage.get("QUOTE#q01", "METADATA") is None
+
+
+def test_projection_keeps_compressed_text(storage):
+    text = "Long " * 100
+    stored = encode_item({**quote(1), "text": text})
+    assert COMPRESSED_TEXT in stored
+    storage.put(stored)
+
+    key = ("QUOTE#q01", "METADATA")
+    found = [
+        storage.get(*key, fields=["quoteId", "text"]),
+        storage.batch_get([key], fields=["quoteId", "text"])[0],
+        storage.query("GSI2-Author", "AUTHOR#Author A", 1, fields=["text"])[0][0],
+        storage.scan(1, pk_prefix="QUOTE#", fields=["text"])[0][0],
+    ]
+    for item in found:
+        assert decode_item(item)["text"] == text
+
+
+def test_engines_must_implement_every_pattern():
+    class Partial(Storage):
+        def put(self, item, if_not_exists=False):
+            pass
+
+    with pytest.raises(TypeError):
+        Partial()
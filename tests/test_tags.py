@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import pytest
+from moto import mock_dynamodb
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+import tags
+from browsequotes_handler import lambda_handler as browse_lambda
+from createquotes_handler import lambda_handler as create_lambda
+
+TABLE_NAME = "NovaMuseQuotes"
+
+
+@pytest.fixture
+def dynamodb_table():
+    with mock_dynamodb():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        # q0..q19 are all "courage"; every 3rd is "fantasy", every 4th "time"
+        for i in range(20):
+            quote_tags = ["courage"]
+            if i % 3 == 0:
+                quote_tags.append("fantasy")
+            if i % 4 == 0:
+                quote_tags.append("time")
+            quote_id = f"q{i:02d}"
+            table.put_item(
+                Item={
+                    "PK": f"QUOTE#{quote_id}",
+                    "SK": "METADATA",
+                    "quoteId": quote_id,
+                    "text": f"Quote number {i}",
+                    "author": "Author A",
+                    "genre": "sci-fi" if i % 2 else "fantasy",
+                    "source": "Test Source",
+                    "tags": quote_tags,
+                    "createdAt": f"2024-01-01T00:00:{i:02d}Z",
+                }
+            )
+            tags.add_tags(table, quote_id, quote_tags)
+        yield table
+
+
+def browse(params):
+    response = browse_lambda({"queryStringParameters": params}, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_parse_tags():
+    assert tags.parse_tags(" Courage ,time,courage") == ["courage", "time"]
+    assert tags.parse_tags(None) == []
+    with pytest.raises(ValueError):
+        tags.parse_tags([1, 2])
+    with pytest.raises(ValueError):
+        tags.parse_tags(["#nope"])
+
+
+def test_intersection_pages_without_duplicates(dynamodb_table, monkeypatch):
+    # Small probe batches force several round trips per page
+    monkeypatch.setattr(tags, "PROBE_BATCH", 4)
+    expected = {f"q{i:02d}" for i in range(20) if i % 3 == 0}
+
+    seen, cursor = [], None
+    while True:
+        params = {"tags": "courage,fantasy", "limit": "3"}
+        if cursor:
+            params["cursor"] = cursor
+        status, body = browse(params)
+        assert status == 200
+        seen.extend(item["quoteId"] for item in body["items"])
+        cursor = body["nextCursor"]
+        if not cursor:
+            break
+
+    assert len(seen) == len(set(seen))
+    assert set(seen) == expected
+
+
+def test_rarest_list_drives(dynamodb_table, monkeypatch):
+    queried = []
+    original = dynamodb_table.query
+
+    def spy(**kwargs):
+        queried.append(kwargs["KeyConditionExpression"]._values[1])
+        return original(**kwargs)
+
+    monkeypatch.setattr(dynamodb_table, "query", spy)
+    items, _ = tags.query_tags(dynamodb_table, ["courage", "fantasy", "time"], 10)
+    assert {item["quoteId"] for item in items} == {"q00", "q12"}
+    assert set(queried) == {"TAG#time"}
+
+
+def test_tags_with_genre(dynamodb_table):
+    status, body = browse({"tags": "fantasy", "genre": "sci-fi", "fields": "text"})
+    assert status == 200
+    assert [item["text"] for item in body["items"]] == [
+        "Quote number 3",
+        "Quote number 9",
+        "Quote number 15",
+    ]
+
+
+def test_unknown_tag_is_empty(dynamodb_table):
+    status, body = browse({"tags": "courage,nonexistent"})
+    assert status == 200
+    assert body == {"items": [], "nextCursor": None}
+
+
+def test_tags_with_author_rejected(dynamodb_table):
+    status, _ = browse({"tags": "courage", "author": "Author A"})
+    assert status == 400
+
+
+def test_create_with_tags(dynamodb_table):
+    event = {
+        "requestContext": {"authorizer": {"claims": {"cognito:groups": "admins"}}},
+        "body": json.dumps(
+            {
+                "text": "Courage is found in unlikely places.",
+                "author": "Gildor",
+                "genre": "fantasy",
+                "source": "The Fellowship of the Ring",
+                "tags": ["Hope", "courage"],
+            }
+        ),
+    }
+    assert create_lambda(event, None)["statusCode"] == 201
+
+    status, body = browse({"tags": "hope,courage"})
+    assert [item["author"] for item in body["items"]] == ["Gildor"]
+    assert body["items"][0]["tags"] == ["courage", "hope"]
+
+
+def test_create_with_invalid_tags(dynamodb_table):
+    event = {
+        "requestContext": {"authorizer": {"claims": {"cognito:groups": "admins"}}},
+        "body": json.dumps(
+            {
+                "text": "x",
+                "author": "a",
+                "genre": "g",
+                "source": "s",
+                "tags": 5,
+            }
+        ),
+    }
+    assert create_lambda(event, None)["statusCode"] == 400
@@ -0,0 +1,165 @@
+import os
+import sys
+import json
+from unittest.mock import patch
+import pytest
+from moto import mock_dynamodb, mock_s3
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../lambda"))
+)
+
+# MUST be set before importing lambda
+os.environ["QUOTES_TABLE"] = "NovaMuseQuotes"
+
+import catalog_version
+import quotes_handler
+import snapshots
+import warm_start
+from catalog_version import bump_version
+from warm_start import WarmStart
+
+TABLE_NAME = "NovaMuseQuotes"
+BUCKET = "novamuse-frontend"
+
+
+@pytest.fixture
+def dynamodb_table(monkeypatch):
+    monkeypatch.setattr(catalog_version, "VERSION_TTL", 0)
+    monkeypatch.setattr(quotes_handler, "GENRE_CACHE", None)
+    with mock_dynamodb():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+                {"AttributeName": "GSI1PK", "AttributeType": "S"},
+                {"AttributeName": "GSI1SK", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "GSI1-Genre",
+                    "KeySchema": [
+                        {"AttributeName": "GSI1PK", "KeyType": "HASH"},
+                        {"AttributeName": "GSI1SK", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        for i in range(6):
+            genre = "sci-fi" if i % 2 else "fantasy"
+            table.put_item(
+                Item={
+                    "PK": f"QUOTE#{i}",
+                    "SK": "METADATA",
+                    "quoteId": str(i),
+                    "text": f"Quote number {i}",
+                    "author": "Author A",
+                    "genre": genre,
+                    "createdAt": f"2024-01-01T00:00:0{i}Z",
+                    "GSI1PK": f"GENRE#{genre}",
+                    "GSI1SK": f"CREATED#2024-01-01T00:00:0{i}Z",
+                }
+            )
+        bump_version(table)
+        yield table
+
+
+def snapshot(table, per_genre=2):
+    return warm_start.build(table, ["fantasy", "sci-fi"], ["Author A"], 1, per_genre)
+
+
+def test_build_and_load_bundled_file(dynamodb_table, tmp_path):
+    data = snapshot(dynamodb_table)
+    assert data["genres"] == ["fantasy", "sci-fi"]
+    assert [len(quotes) for quotes in data["samples"].values()] == [2, 2]
+    assert "GSI1PK" not in data["samples"]["fantasy"][0]
+
+    path = tmp_path / "warm_start.json"
+    path.write_text(json.dumps(data))
+    warm = warm_start.load(path=str(path))
+    assert warm.version == 1
+    assert warm.authors == ["Author A"]
+
+    assert warm_start.load(path=str(tmp_path / "missing.json")) is None
+    path.write_text(json.dumps({**data, "format": 99}))
+    assert warm_start.load(path=str(path)) is None
+
+
+def test_cold_request_served_without_dynamodb(dynamodb_table, monkeypatch):
+    warm = WarmStart(snapshot(dynamodb_table))
+    monkeypatch.setattr(quotes_handler, "warm", warm)
+
+    with patch.object(quotes_handler.table, "scan") as mock_scan, patch.object(
+        quotes_handler.table, "query"
+    ) as mock_query:
+        response = quotes_handler.lambda_handler({}, None)
+    mock_scan.assert_not_called()
+    mock_query.assert_not_called()
+    quote = json.loads(response["body"])[0]
+    assert quote["text"].startswith("Quote number")
+    # Served copies are trimmed, the sample itself is not
+    assert all("genre" in q for q in warm.samples[quote["genre"]])
+
+
+def test_cold_count_request_served_from_sample(dynamodb_table, monkeypatch):
+    warm = WarmStart(snapshot(dynamodb_table))
+    monkeypatch.setattr(quotes_handler, "warm", warm)
+
+    event = {"queryStringParameters": {"count": "4", "fields": "quoteId,genre"}}
+    with patch.object(quotes_handler.table, "query") as mock_query:
+        body = json.loads(quotes_handler.lambda_handler(event, None)["body"])
+    mock_query.assert_not_called()
+    assert len({quote["quoteId"] for quote in body}) == 4
+    assert sorted(quote["genre"] for quote in body) == ["fantasy"] * 2 + ["sci-fi"] * 2
+    # More than the sample holds goes live
+    assert warm.random_quotes(5) and len(warm.random_quotes(5)) == 4
+
+
+def test_current_snapshot_keeps_genres_after_reconcile(dynamodb_table, monkeypatch):
+    warm = WarmStart(snapshot(dynamodb_table))
+    monkeypatch.setattr(quotes_handler, "warm", warm)
+    warm.reconcile_in_background(dynamodb_table)
+    warm.thread.join()
+    assert warm.current is True
+
+    # Random quotes go live again, but without the genre scan
+    assert warm.random_quote() is None
+    with patch.object(quotes_handler.table, "scan") as mock_scan:
+        response = quotes_handler.lambda_handler({}, None)
+    mock_scan.assert_not_called()
+    assert len(json.loads(response["body"])) == 1
+
+
+def test_stale_snapshot_is_dropped(dynamodb_table, monkeypatch):
+    warm = WarmStart(snapshot(dynamodb_table))
+    monkeypatch.setattr(quotes_handler, "warm", warm)
+    bump_version(dynamodb_table)
+
+    warm.reconcile(dynamodb_table)
+    assert not warm.usable()
+    assert sorted(quotes_handler.get_all_genres(dynamodb_table)) == [
+        "fantasy",
+        "sci-fi",
+    ]
+
+
+def test_load_from_published_snapshots(dynamodb_table, monkeypatch):
+    monkeypatch.setattr(snapshots, "SNAPSHOT_BUCKET", BUCKET)
+    monkeypatch.setattr(snapshots, "_bodies", {})
+    with mock_s3():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=BUCKET)
+        snapshots.publish(s3, dynamodb_table, BUCKET)
+
+        warm = warm_start.load(s3, path="")
+    assert warm.version == 1
+    assert warm.genres == ["fantasy", "sci-fi"]